@@ -20,6 +20,12 @@ $PYTHON_BIN -m pip install torch torchvision torchaudio --index-url https://down
 # Install Whisper if not present
 $PYTHON_BIN -m pip install openai-whisper
 
+# Install pure-Python D-Bus client (in-process MPRIS media control)
+$PYTHON_BIN -m pip install jeepney
+
+# Install in-process Piper voices (voice pool) and onnx for memory-mapped voice weights
+$PYTHON_BIN -m pip install piper-tts onnx
+
 # Download Whisper Model
 echo "Downloading Whisper Base Model..."
 $PYTHON_BIN -c "import whisper; whisper.load_model('base')"
@@ -29,6 +35,8 @@ echo "Compiling voice-command.py..."
 $PYTHON_BIN -m PyInstaller --clean --onefile --name voice-assistant \
     --collect-all vosk \
     --collect-all openai-whisper \
+    --collect-all piper \
+    --collect-all onnxruntime \
     --add-data "voiceassistant/.venv/lib/python3.12/site-packages/whisper/assets:whisper/assets" \
     --hidden-import=whisper \
     voiceassistant/voice-command.py
@@ -43,6 +51,12 @@ echo "Compiling startup-briefing.py..."
 $PYTHON_BIN -m PyInstaller --clean --onefile --name startup-briefing \
     voiceassistant/startup-briefing.py
 
+# Build shared recognition server
+echo "Compiling vosk_server.py..."
+$PYTHON_BIN -m PyInstaller --clean --onefile --name vosk-server \
+    --collect-all vosk \
+    voiceassistant/vosk_server.py
+
 # Prepare dist folder
 echo "Preparing distribution folder..."
 rm -rf voiceassistant/dist
@@ -51,6 +65,7 @@ mkdir -p voiceassistant/dist
 mv dist/voice-assistant voiceassistant/dist/
 mv dist/calendar-agent voiceassistant/dist/
 mv dist/startup-briefing voiceassistant/dist/
+mv dist/vosk-server voiceassistant/dist/
 
 # Update commands.json to use executables
 echo "Updating commands.json..."
@@ -79,6 +94,6 @@ cp voiceassistant/*.sh voiceassistant/dist/
 
 # Cleanup
 echo "Cleaning up..."
-rm -rf build dist voice-assistant.spec calendar-agent.spec startup-briefing.spec
+rm -rf build dist voice-assistant.spec calendar-agent.spec startup-briefing.spec vosk-server.spec
 
 echo "Build Complete!"
@@ -3,6 +3,7 @@ const path = require('path');
 const fs = require('fs');
 const os = require('os');
 const { fork, spawn } = require('child_process');
+const { changedSettings, isLiveChange } = require('./voice-settings');
 
 let serverProcess;
 let voiceProcess;
@@ -292,6 +293,72 @@ function runStartupBriefing() {
     return spawn(BRIEFING_EXECUTABLE, [], { stdio: 'ignore', env });
 }
 
+// Renders the cacheable part of the next startup briefing in the background,
+// so it starts playing immediately at the next launch.
+function prerenderBriefing() {
+    if (!fs.existsSync(BRIEFING_EXECUTABLE)) return;
+    const p = spawn(BRIEFING_EXECUTABLE, ['--prerender'], {
+        stdio: 'ignore',
+        detached: true,
+        env: {
+            ...process.env,
+            LCARS_SETTINGS_PATH: USER_SETTINGS_PATH,
+            LCARS_WORKSPACE: LCARS_ROOT
+        }
+    });
+    p.unref();
+}
+
+// --- VOICE MESSAGE CHANNEL ---
+// Each message is a 4-byte big-endian length followed by UTF-8 JSON; frames
+// are reassembled here however the socket splits them.
+const VOICE_MAX_FRAME = 1024 * 1024;
+
+function readVoiceChannel(channel) {
+    if (!channel) return;
+    let pending = Buffer.alloc(0);
+    channel.on('data', (chunk) => {
+        pending = pending.length ? Buffer.concat([pending, chunk]) : chunk;
+        while (pending.length >= 4) {
+            const length = pending.readUInt32BE(0);
+            if (length > VOICE_MAX_FRAME) {
+                console.error(`Voice channel: oversized frame (${length} bytes), closing`);
+                channel.destroy();
+                return;
+            }
+            if (pending.length < 4 + length) break;
+            const body = pending.subarray(4, 4 + length).toString('utf8');
+            pending = pending.subarray(4 + length);
+            try {
+                handleVoiceMessage(JSON.parse(body));
+            } catch (e) {
+                console.error('Voice channel: bad message:', e);
+            }
+        }
+    });
+    channel.on('error', (err) => console.error('Voice channel error:', err));
+}
+
+function handleVoiceMessage(message) {
+    if (message.type === 'state' && message.state !== 'starting') {
+        isVoiceReady = true;
+    }
+    if (mainWindow) {
+        mainWindow.webContents.send('voice-event', message);
+    }
+}
+
+// Settings the voice process reads each time it speaks, so saving them needs no restart.
+function sendVoiceMessage(message) {
+    const channel = voiceProcess && voiceProcess.stdio[3];
+    if (!channel || channel.destroyed) return false;
+    const body = Buffer.from(JSON.stringify(message), 'utf8');
+    const header = Buffer.alloc(4);
+    header.writeUInt32BE(body.length, 0);
+    channel.write(Buffer.concat([header, body]));
+    return true;
+}
+
 function startVoiceAssistant(isAppStart = false) {
     if (voiceProcess) return;
     
@@ -302,15 +369,16 @@ function startVoiceAssistant(isAppStart = false) {
 
             // Spawn detached to get a new process group, allowing us to kill the whole tree
             voiceProcess = spawn(VOICE_EXECUTABLE, [], {
-                // Pipe both streams so we can forward logs/markers to the renderer.
-                // (Python/pyinstaller stdout can be buffered when piped; force unbuffered via env below.)
-                stdio: ['ignore', 'pipe', 'pipe'],
+                // stdout/stderr are plain logs. State, transcripts, matches and timings
+                // arrive as length-prefixed JSON on fd 3 (see voiceassistant/ui_channel.py).
+                stdio: ['ignore', 'pipe', 'pipe', 'pipe'],
                 detached: true,
                 env: {
                     ...process.env,
                     LCARS_SETTINGS_PATH: USER_SETTINGS_PATH,
                     LCARS_WORKSPACE: LCARS_ROOT,
-                    // Ensure Python-based voice binary flushes prints promptly so the UI can react to markers.
+                    LCARS_IPC_FD: '3',
+                    // Python/pyinstaller stdout can be buffered when piped; keep the log prompt.
                     PYTHONUNBUFFERED: '1',
                     PYTHONIOENCODING: 'utf-8'
                 }
@@ -322,26 +390,15 @@ function startVoiceAssistant(isAppStart = false) {
                 mainWindow.webContents.send('voice-status-changed', true);
             }
 
+            readVoiceChannel(voiceProcess.stdio[3]);
+
             voiceProcess.stdout.on('data', (data) => {
-                const str = data.toString();
-                if (str.includes("<<VOICE_ACTIVE>>")) {
-                    isVoiceReady = true;
-                }
-                // Forward to renderer
-                if (mainWindow) {
-                    mainWindow.webContents.send('voice-output', str);
-                }
-                process.stdout.write(`[Voice] ${str}`);
+                process.stdout.write(`[Voice] ${data.toString()}`);
             });
 
             if (voiceProcess.stderr) {
                 voiceProcess.stderr.on('data', (data) => {
-                    const str = data.toString();
-                    // Forward to renderer as well (some libs write logs to stderr)
-                    if (mainWindow) {
-                        mainWindow.webContents.send('voice-output', str);
-                    }
-                    process.stderr.write(`[Voice:err] ${str}`);
+                    process.stderr.write(`[Voice:err] ${data.toString()}`);
                 });
             }
 
@@ -786,7 +843,20 @@ ipcMain.handle('write-settings', async (event, settings) => {
         settingsToSave.voice_path = dehydrate(settings.voice_path);
         settingsToSave.personality_file = dehydrate(settings.personality_file);
 
+        let previous = {};
+        try {
+            previous = JSON.parse(fs.readFileSync(USER_SETTINGS_PATH, 'utf8'));
+        } catch (e) {
+            // No earlier settings: treat everything as changed
+        }
         fs.writeFileSync(USER_SETTINGS_PATH, JSON.stringify(settingsToSave, null, 4));
+
+        // Voice and personality changes are picked up by the running assistant; anything else needs a restart.
+        const changed = changedSettings(previous, settingsToSave);
+        if (isLiveChange(changed) &&
+            sendVoiceMessage({ type: 'settings_changed', keys: changed })) {
+            return true;
+        }
         
         // Restart voice assistant if running to apply settings
         stopVoiceAssistant();
@@ -908,6 +978,11 @@ ipcMain.handle('get-voice-status', async () => {
     return isVoiceReady;
 });
 
+// Runtime log verbosity of the voice process ('debug' or 'info').
+ipcMain.handle('set-voice-log-level', async (event, level) => {
+    return sendVoiceMessage({ type: 'set_log_level', level });
+});
+
 ipcMain.handle('get-voices', async () => {
     try {
         if (!fs.existsSync(USER_VOICES_DIR)) return [];
@@ -1116,6 +1191,7 @@ app.on('before-quit', (event) => {
 
 app.on('will-quit', () => {
   globalShortcut.unregisterAll();
+  prerenderBriefing();
 });
 
 app.on('quit', () => {
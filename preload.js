@@ -30,7 +30,8 @@ contextBridge.exposeInMainWorld('electronAPI', {
   readPreset: (filename) => ipcRenderer.invoke('read-preset', filename),
   writePreset: (filename, content) => ipcRenderer.invoke('write-preset', filename, content),
   deletePreset: (filename) => ipcRenderer.invoke('delete-preset', filename),
-  onVoiceOutput: (callback) => ipcRenderer.on('voice-output', (_event, value) => callback(value)),
+  setVoiceLogLevel: (level) => ipcRenderer.invoke('set-voice-log-level', level),
+  onVoiceEvent: (callback) => ipcRenderer.on('voice-event', (_event, value) => callback(value)),
   onVoiceStatusChanged: (callback) => ipcRenderer.on('voice-status-changed', (_event, value) => callback(value)),
   testVoice: (text) => ipcRenderer.invoke('test-voice', text),
   
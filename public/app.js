@@ -688,10 +688,10 @@ socket.on('output', ({ id, data }) => {
     }
 });
 
-if (window.electronAPI && window.electronAPI.onVoiceOutput) {
-    window.electronAPI.onVoiceOutput((data) => {
-        // Check for voice active signal
-        if (data.includes("<<VOICE_ACTIVE>>")) {
+if (window.electronAPI && window.electronAPI.onVoiceEvent) {
+    window.electronAPI.onVoiceEvent((message) => {
+        // Any state after "starting" means the assistant is listening.
+        if (message.type === 'state' && message.state !== 'starting') {
             if (voiceActiveIndicator) {
                 voiceActiveIndicator.style.display = "block";
             }
@@ -715,7 +715,7 @@ if (window.electronAPI && window.electronAPI.getVoiceStatus) {
 
 if (window.electronAPI && window.electronAPI.onVoiceStatusChanged) {
     window.electronAPI.onVoiceStatusChanged((isActive) => {
-        // Only hide it immediately on stop. On start, wait for <<VOICE_ACTIVE>> signal.
+        // Only hide it immediately on stop. On start, wait for the voice process to report its state.
         if (!isActive) {
             setVoiceActiveIndicator(false);
         }
@@ -0,0 +1,25 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const { changedSettings, isLiveChange } = require('../voice-settings');
+
+const saved = { voice_path: 'voices/a.onnx', speaker_id: 0, voice_enabled: true, wake_words: ['leo'] };
+
+test('a voice change is applied without a restart', () => {
+    const changed = changedSettings(saved, { ...saved, voice_path: 'voices/b.onnx', speaker_id: 3 });
+    assert.deepStrictEqual(changed, ['voice_path', 'speaker_id']);
+    assert.ok(isLiveChange(changed));
+});
+
+test('any other change restarts the assistant', () => {
+    const changed = changedSettings(saved, { ...saved, voice_path: 'voices/b.onnx', wake_words: ['computer'] });
+    assert.deepStrictEqual(changed, ['voice_path', 'wake_words']);
+    assert.ok(!isLiveChange(changed));
+});
+
+test('first save with no earlier settings restarts', () => {
+    assert.ok(!isLiveChange(changedSettings({}, saved)));
+});
+
+test('saving unchanged settings needs no restart', () => {
+    assert.deepStrictEqual(changedSettings(saved, { ...saved, wake_words: ['leo'] }), []);
+});
@@ -0,0 +1,16 @@
+// Which settings changes the running voice assistant can take without a restart.
+// Voice and personality changes are picked up live (the voice process loads the
+// new voice in the background); anything else needs a restart.
+
+const LIVE_VOICE_SETTINGS = ['voice_path', 'speaker_id', 'personality_file', 'voice_volume', 'voice_ack_enabled'];
+
+function changedSettings(previous, next) {
+    return Object.keys({ ...previous, ...next })
+        .filter((key) => JSON.stringify(previous[key]) !== JSON.stringify(next[key]));
+}
+
+function isLiveChange(changed) {
+    return changed.every((key) => LIVE_VOICE_SETTINGS.includes(key));
+}
+
+module.exports = { LIVE_VOICE_SETTINGS, changedSettings, isLiveChange };
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Native actions for the built-in voice commands.
+
+commands.json maps phrases to shell command strings. The built-in entries
+(galactica-utils.sh verbs, calendar-agent modes, pactl mute/unmute) are
+recognised here and run in-process, or in the warm calendar worker,
+instead of through os.system. Anything else stays a shell command.
+"""
+import datetime
+import json
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+import speech
+import status_report
+import tracing
+
+ACTIONS = {}
+
+
+def action(name, needs=None):
+    """Registers a built-in. `needs` names an ActionContext attribute (e.g. "mpris") it cannot run without."""
+    def register(fn):
+        fn.needs = needs
+        ACTIONS[name] = fn
+        return fn
+    return register
+
+
+class ActionContext:
+    """What the actions need from the voice process."""
+    def __init__(self, speak, script_dir, mpris=None, calendar=None, tracer=None):
+        self.speak = speak
+        self.script_dir = script_dir
+        self.mpris = mpris
+        self.calendar = calendar
+        self.tracer = tracer or tracing.Tracer()
+
+
+# --- COMMAND STRING -> ACTION STEPS ---
+
+CALENDAR_MODES = {"today", "tomorrow", "next", "week", "monday", "tuesday", "wednesday",
+                  "thursday", "friday", "saturday", "sunday"}
+CALENDAR_QUERY_MODES = {"free", "busy"}
+
+
+def _resolve_segment(tokens):
+    if not tokens:
+        return None
+    head = tokens[0]
+
+    if head == "{base_dir}/galactica-utils.sh" and len(tokens) >= 2:
+        verb = tokens[1]
+        if verb == "play_playlist" and len(tokens) == 3:
+            return ("playlist", [tokens[2]])
+        if verb == "playlist_80s" and len(tokens) == 2:
+            return ("playlist", ["spotify:playlist:4NL0jkmwHxwat1797qV0JQ"])
+        if verb in ("time", "weather", "status_report", "music", "pause", "next") and len(tokens) == 2:
+            return (verb, [])
+        return None
+
+    if head == "{base_dir}/calendar-agent" and len(tokens) == 2 and tokens[1] in CALENDAR_MODES:
+        return ("calendar", [tokens[1]])
+    # free/busy take arguments, e.g. "free tomorrow 30 after 13:00"
+    if head == "{base_dir}/calendar-agent" and len(tokens) >= 2 and tokens[1] in CALENDAR_QUERY_MODES:
+        return ("calendar", tokens[1:])
+
+    if tokens[:3] == ["pactl", "set-sink-mute", "@DEFAULT_SINK@"] and len(tokens) == 4 and tokens[3] in ("0", "1"):
+        return ("mute" if tokens[3] == "1" else "unmute", [])
+
+    if head == "{base_dir}/ai-speak.sh" and len(tokens) == 2:
+        return ("say", [tokens[1]])
+
+    return None
+
+
+def resolve(command):
+    """Returns the built-in steps for a commands.json value, or None if it must run in a shell.
+
+    e.g. "{base_dir}/calendar-agent today && {base_dir}/calendar-agent tomorrow &"
+         -> [("calendar", ["today"]), ("calendar", ["tomorrow"])]
+    """
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        return None
+
+    # A trailing '&' only backgrounded the command; the worker already runs off-thread.
+    if tokens and tokens[-1] == "&":
+        tokens = tokens[:-1]
+
+    steps = []
+    segment = []
+    for token in tokens + ["&&"]:
+        if token == "&&":
+            step = _resolve_segment(segment)
+            if step is None:
+                return None
+            steps.append(step)
+            segment = []
+        else:
+            segment.append(token)
+    return steps or None
+
+
+def runnable(steps, ctx):
+    """True if every step can run in-process with what `ctx` has available."""
+    return all(getattr(ctx, ACTIONS[name].needs) is not None
+               for name, _ in steps if ACTIONS[name].needs)
+
+
+def run(steps, ctx, settings, fill, heard_at, label):
+    """Runs resolved steps. Returns False, before running any of them, if one cannot run
+    in-process (caller falls back to the shell for the whole command)."""
+    if not runnable(steps, ctx):
+        return False
+    started = time.monotonic()
+    print(f"LATENCY: '{label}' heard -> action {(started - heard_at) * 1000:.0f} ms")
+
+    for name, args in steps:
+        args = [fill(a) for a in args]
+        try:
+            ACTIONS[name](ctx, settings, *args, heard_at=heard_at, label=label)
+        except Exception as e:
+            print(f"Action error ({name}): {e}")
+
+    done = time.monotonic()
+    ctx.tracer.span("command", started, done, action="+".join(name for name, _ in steps))
+    print(f"LATENCY: '{label}' action {(done - started) * 1000:.0f} ms, total {(done - heard_at) * 1000:.0f} ms")
+    return True
+
+
+def in_background(name, fn):
+    """Runs a slow action body off the recognition thread."""
+    def target():
+        try:
+            fn()
+        except Exception as e:
+            print(f"Action error ({name}): {e}")
+    threading.Thread(target=target, name=f"action-{name}", daemon=True).start()
+
+
+# --- BUILT-IN ACTIONS ---
+
+@action("say")
+def action_say(ctx, settings, text, **_):
+    ctx.speak(text)
+
+
+@action("time")
+def action_time(ctx, settings, **_):
+    ctx.speak(f"It is currently {datetime.datetime.now().strftime('%H:%M')}")
+
+
+@action("weather")
+def action_weather(ctx, settings, **_):
+    ctx.speak("Checking long range sensors.")
+    location = settings.get("weather_location") or "Cape Town"
+    env = dict(os.environ)
+    env.setdefault("DISPLAY", ":0")
+    subprocess.Popen(["xdg-open", f"https://wttr.in/{location}"], env=env,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@action("status_report")
+def action_status_report(ctx, settings, heard_at=None, label="", **_):
+    calendar_report = None
+    if ctx.calendar:
+        calendar_report = lambda: ctx.calendar.call(["report_today"], timeout=20)
+    utt = ctx.tracer.utt
+
+    def report():
+        # Earlier sections are spoken while slow ones (calendar, network) resolve.
+        for chunk in status_report.stream_report(settings, calendar_report):
+            ctx.speak(chunk, priority=speech.BRIEFING)
+        if heard_at is not None:
+            ctx.tracer.span("command_async", heard_at, time.monotonic(), utt=utt, action="status_report")
+            print(f"LATENCY: '{label}' status report queued {(time.monotonic() - heard_at) * 1000:.0f} ms")
+
+    # Collecting the report can take seconds; the microphone keeps listening meanwhile.
+    in_background("status_report", report)
+
+
+@action("mute")
+def action_mute(ctx, settings, **_):
+    subprocess.run(["pactl", "set-sink-mute", "@DEFAULT_SINK@", "1"])
+
+
+@action("unmute")
+def action_unmute(ctx, settings, **_):
+    subprocess.run(["pactl", "set-sink-mute", "@DEFAULT_SINK@", "0"])
+
+
+@action("calendar", needs="calendar")
+def action_calendar(ctx, settings, mode, *args, heard_at=None, label="", **_):
+    utt = ctx.tracer.utt
+
+    def report(job):
+        if heard_at is not None:
+            ctx.tracer.span("command_async", heard_at, time.monotonic(), utt=utt, action=f"calendar {mode}")
+            print(f"LATENCY: '{label}' calendar {mode} ready {(time.monotonic() - heard_at) * 1000:.0f} ms")
+        # The worker returns the text; it is read out through the speech queue so it can be interrupted.
+        if job.output:
+            ctx.speak(job.output, priority=speech.BRIEFING)
+
+    ctx.calendar.submit([mode, *args], on_done=report, text_only=True)
+
+
+def ensure_player(ctx, name, timeout=20):
+    """MPRIS bus name for `name`, launching the player and waiting for it to register if needed."""
+    running = ctx.mpris.find(name)
+    if running:
+        return running[0]
+
+    print(f"Player {name} not running. Attempting to launch...")
+    env = dict(os.environ)
+    env.setdefault("DISPLAY", ":0")
+    try:
+        subprocess.Popen([name], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    except Exception as e:
+        print(f"Failed to launch {name}: {e}")
+        return None
+
+    bus_name = ctx.mpris.wait_for_player(name, timeout=timeout)
+    if not bus_name:
+        print(f"{name} did not register on D-Bus in time")
+    return bus_name
+
+
+def with_player(ctx, name, then, on_missing=None, on_launch=None):
+    """Calls then(bus_name) once `name` is on the bus.
+
+    A running player is used straight away; launching one and waiting for it
+    to register happens in the background so the microphone keeps listening.
+    on_launch() is called before a launch, on_missing() if it fails.
+    """
+    running = ctx.mpris.find(name)
+    if running:
+        then(running[0])
+        return
+
+    if on_launch:
+        on_launch()
+
+    def launch():
+        bus_name = ensure_player(ctx, name)
+        if bus_name:
+            then(bus_name)
+        elif on_missing:
+            on_missing()
+    in_background(f"launch {name}", launch)
+
+
+@action("music", needs="mpris")
+def action_music(ctx, settings, **_):
+    launched = threading.Event()
+
+    def launch():
+        launched.set()
+        ctx.speak("Launching Spotify. Stand by.")
+
+    def play(bus_name):
+        ctx.mpris.play(bus_name)
+        if not launched.is_set():  # a fresh launch was already announced
+            ctx.speak("Resuming playback.")
+    with_player(ctx, "spotify", play, on_missing=lambda: ctx.speak("Unable to launch spotify."), on_launch=launch)
+
+
+@action("pause", needs="mpris")
+def action_pause(ctx, settings, **_):
+    ctx.mpris.pause_all()
+
+
+@action("next", needs="mpris")
+def action_next(ctx, settings, **_):
+    for bus_name in ctx.mpris.find("spotify"):
+        ctx.mpris.next(bus_name)
+    ctx.speak("Skipping track.")
+
+
+@action("playlist", needs="mpris")
+def action_playlist(ctx, settings, uri, **_):
+    ctx.speak("Loading playlist.")
+    ctx.mpris.pause_all()
+
+    def load(bus_name):
+        ctx.mpris.open_uri(bus_name, uri)
+        ctx.mpris.play(bus_name)
+    with_player(ctx, "spotify", load, on_missing=lambda: ctx.speak("Unable to launch spotify."))
+
+
+# --- WARM CALENDAR WORKER ---
+
+class CalendarJob:
+    def __init__(self, args, on_done=None, text_only=False):
+        self.args = args
+        self.on_done = on_done
+        self.text_only = text_only
+        self.output = ""
+        self.done = threading.Event()
+
+
+class CalendarWorker:
+    """Keeps one `calendar-agent serve` process alive and feeds it requests in order."""
+    def __init__(self, script_dir):
+        self.script_dir = script_dir
+        self.proc = None
+        self.jobs = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _command(self):
+        binary = os.path.join(self.script_dir, "calendar-agent")
+        if os.path.exists(binary):
+            return [binary, "serve"]
+        return ["python3", os.path.join(self.script_dir, "calendar-agent.py"), "serve"]
+
+    def _ensure_process(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(self._command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        return self.proc
+
+    def start(self):
+        """Spawns the worker ahead of the first command so its imports are already done."""
+        self.jobs.put(None)
+
+    def _loop(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                proc = self._ensure_process()
+                if job is None:
+                    continue
+                proc.stdin.write(json.dumps({"args": job.args, "text_only": job.text_only}) + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+                if line:
+                    job.output = json.loads(line).get("output", "")
+            except Exception as e:
+                print(f"Calendar worker error: {e}")
+                self.proc = None
+            if job is None:
+                continue
+            job.done.set()
+            if job.on_done:
+                job.on_done(job)
+
+    def submit(self, args, on_done=None, text_only=False):
+        """Queues a calendar mode. With `text_only` the worker returns the text instead of speaking it."""
+        job = CalendarJob(args, on_done, text_only)
+        self.jobs.put(job)
+        return job
+
+    def call(self, args, timeout=None):
+        job = self.submit(args)
+        job.done.wait(timeout)
+        return job.output
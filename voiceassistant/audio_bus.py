@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""One microphone capture shared by every consumer in the voice process.
+
+A capture thread reads the PyAudio stream into a ring buffer of recent
+chunks. Each consumer (the recognizer, the captain's log writer, ...) gets
+its own reader with its own position, so a slow consumer never blocks the
+capture or the others; if it falls more than the ring's length behind it
+skips ahead and counts the dropped chunks.
+"""
+import threading
+import time
+import wave
+from collections import deque
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # paInt16
+
+
+class AudioBus:
+    def __init__(self, stream, chunk_frames=4000, capacity_s=16):
+        self.stream = stream
+        self.chunk_frames = chunk_frames
+        capacity = max(16, int(capacity_s * SAMPLE_RATE / chunk_frames))
+        self._ring = deque(maxlen=capacity)  # (seq, arrival monotonic, bytes)
+        self._next_seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._capture, name="audio-bus", daemon=True)
+        self._thread.start()
+        return self
+
+    def _capture(self):
+        while not self._closed:
+            try:
+                data = self.stream.read(self.chunk_frames, exception_on_overflow=False)
+            except Exception:
+                time.sleep(0.01)
+                continue
+            if len(data) == 0:
+                break
+            self.publish(data)
+        self.close()
+
+    def publish(self, data):
+        with self._cond:
+            self._ring.append((self._next_seq, time.monotonic(), data))
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reader(self):
+        """A new consumer, starting at the next chunk captured."""
+        with self._cond:
+            return BusReader(self, self._next_seq)
+
+
+class BusReader:
+    def __init__(self, bus, seq):
+        self.bus = bus
+        self.seq = seq
+        self.dropped = 0
+
+    def read(self, timeout=None):
+        """Next chunk as (arrival monotonic, bytes); None once the bus is closed and drained.
+
+        Returns (None, b"") if `timeout` elapses first.
+        """
+        cond = self.bus._cond
+        with cond:
+            if not cond.wait_for(lambda: self.bus._next_seq > self.seq or self.bus._closed, timeout):
+                return None, b""
+            if self.bus._next_seq <= self.seq:
+                return None
+            oldest = self.bus._ring[0][0]
+            if self.seq < oldest:
+                self.dropped += oldest - self.seq
+                self.seq = oldest
+            _seq, arrived, data = self.bus._ring[self.seq - oldest]
+            self.seq += 1
+            return arrived, data
+
+
+# --- SELF-SPEECH GATE ---
+
+class OutputGate:
+    """Remembers when our own TTS / sound effects were audible.
+
+    Captured chunks that arrived while something was playing (plus a short
+    room-echo tail) are kept away from the command recognizer. A barge-in
+    closes the open intervals early and interrupts whatever is playing.
+    """
+    def __init__(self, tail_s=0.3, keep_s=30):
+        self.tail_s = tail_s
+        self.keep_s = keep_s
+        self._intervals = []  # [start, end or None]; end None while still playing
+        self._on_interrupt = []
+        self._rewind = None
+        self._lock = threading.Lock()
+
+    def begin(self, on_interrupt=None):
+        """Marks output as started. Returns a token for end()."""
+        interval = [time.monotonic(), None]
+        with self._lock:
+            self._prune()
+            self._intervals.append(interval)
+            if on_interrupt:
+                self._on_interrupt.append(on_interrupt)
+        return interval, on_interrupt
+
+    def end(self, token):
+        interval, on_interrupt = token
+        with self._lock:
+            if interval[1] is None:
+                interval[1] = time.monotonic() + self.tail_s
+            if on_interrupt in self._on_interrupt:
+                self._on_interrupt.remove(on_interrupt)
+
+    def add(self, duration_s):
+        """Output that plays on its own for a known duration (sound effects)."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune()
+            self._intervals.append([now, now + duration_s + self.tail_s])
+
+    def active(self):
+        return self.is_gated(time.monotonic())
+
+    def is_gated(self, at):
+        with self._lock:
+            return any(start <= at and (end is None or at <= end) for start, end in self._intervals)
+
+    def barge_in(self, at, rewind=False):
+        """Ends every interval at `at` and stops playback in progress.
+
+        With `rewind` the audio from `at` on is meant for the command
+        recognizer, which has already dropped it as gated; take_rewind()
+        tells it where to re-feed from.
+        """
+        with self._lock:
+            for interval in self._intervals:
+                if interval[1] is None or interval[1] > at:
+                    interval[1] = max(at, interval[0])
+            if rewind:
+                self._rewind = at
+            callbacks, self._on_interrupt = self._on_interrupt, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Barge-in error: {e}")
+
+    def take_rewind(self):
+        """Where the last barge-in by name rewound to, once; None if there was none since."""
+        with self._lock:
+            at, self._rewind = self._rewind, None
+        return at
+
+    def _prune(self):
+        horizon = time.monotonic() - self.keep_s
+        self._intervals = [i for i in self._intervals if i[1] is None or i[1] > horizon]
+
+
+# --- CAPTAIN'S LOG WRITER ---
+
+class LogWriter:
+    """Streams bus audio into a WAV file; pausing just stops appending chunks."""
+    def __init__(self, bus, path):
+        self.path = path
+        self.paused = False
+        self._reader = bus.reader()
+        self._stop = threading.Event()
+        self._wav = wave.open(path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(SAMPLE_WIDTH)
+        self._wav.setframerate(SAMPLE_RATE)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            chunk = self._reader.read(timeout=0.5)
+            if chunk is None:
+                break
+            _arrived, data = chunk
+            if data and not self.paused:
+                self._wav.writeframes(data)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def stop(self):
+        """Finishes the file (the header is patched on close) and returns its path."""
+        self._stop.set()
+        self._thread.join()
+        self._wav.close()
+        if self._reader.dropped:
+            print(f"Captain's log: dropped {self._reader.dropped} audio chunks")
+        return self.path
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""One persistent output stream for everything the voice process plays.
+
+Sound effects are decoded once at startup into PCM (SoundBank) and TTS is
+streamed from piper's raw output straight into the mixer, so neither an
+acknowledgement nor a sentence pays for a decoder or an aplay process.
+The mixer sums all active sources every block, ducking sound effects under
+speech; stopping a source takes effect at the next block.
+"""
+import os
+import subprocess
+import threading
+from collections import deque
+
+import numpy as np
+import pyaudio
+
+RATE = 22050        # piper's usual voice rate, so most speech needs no resampling
+BLOCK = 512         # ~23 ms per callback: also the worst-case stop latency
+SOUND_EXTENSIONS = (".mp3", ".wav", ".ogg", ".flac")
+
+
+def decode(path, rate=RATE):
+    """Any audio file -> mono float32 samples at `rate`, via ffmpeg."""
+    pcm = subprocess.run(["ffmpeg", "-v", "quiet", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(rate), "-"],
+                         stdout=subprocess.PIPE, check=True).stdout
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class SoundBank:
+    """Every file in sounds/ decoded once, keyed by file name."""
+    def __init__(self, directory, rate=RATE):
+        self.rate = rate
+        self.sounds = {}
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if name.lower().endswith(SOUND_EXTENSIONS):
+                try:
+                    self.sounds[name] = decode(os.path.join(directory, name), rate)
+                except (OSError, subprocess.CalledProcessError) as e:
+                    print(f"SFX decode failed for {name}: {e}")
+        print(f"Loaded {len(self.sounds)} sound effects")
+
+    def get(self, path):
+        return self.sounds.get(os.path.basename(path))
+
+
+class Resampler:
+    """Streaming linear-interpolation resampler (speech only, so linear is enough)."""
+    def __init__(self, src_rate, dst_rate):
+        self.step = src_rate / dst_rate
+        self.t = 0.0
+        self.prev = None
+
+    def process(self, x):
+        if self.step == 1.0 or not len(x):
+            return x
+        if self.prev is not None:
+            x = np.concatenate(([self.prev], x))
+        last = len(x) - 1
+        positions = np.arange(self.t, last + 1e-9, self.step) if last > 0 else np.empty(0)
+        self.prev = x[-1]
+        if not len(positions):
+            self.t -= last
+            return positions.astype(np.float32)
+        self.t = positions[-1] + self.step - last
+        return np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+
+
+class Source:
+    def __init__(self, kind, gain, samples=None):
+        self.kind = kind            # "voice" or "sfx"
+        self.gain = gain
+        self.done = threading.Event()
+        self.stopped = False
+        self.finished = samples is not None   # no more samples will be appended
+        self._chunks = deque([samples] if samples is not None and len(samples) else [])
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, samples):
+        if len(samples):
+            with self._lock:
+                self._chunks.append(samples)
+
+    def close(self):
+        self.finished = True
+
+    def stop(self):
+        self.stopped = True
+
+    def read(self, n):
+        out = []
+        with self._lock:
+            while n and self._chunks:
+                head = self._chunks[0]
+                take = head[self._offset:self._offset + n]
+                out.append(take)
+                n -= len(take)
+                self._offset += len(take)
+                if self._offset >= len(head):
+                    self._chunks.popleft()
+                    self._offset = 0
+            drained = not self._chunks
+        data = np.concatenate(out) if out else np.empty(0, dtype=np.float32)
+        return data, drained and self.finished
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+def stream_pcm(pipe, src_rate, source, dst_rate=RATE, read_size=4096):
+    """Copies raw 16-bit mono PCM from a pipe into a streaming source until EOF, then closes it."""
+    resampler = Resampler(src_rate, dst_rate)
+    pending = b""
+    fd = pipe.fileno()
+    while not source.stopped:
+        data = os.read(fd, read_size)
+        if not data:
+            break
+        data = pending + data
+        cut = len(data) - len(data) % 2
+        pending = data[cut:]
+        samples = np.frombuffer(data[:cut], dtype=np.int16).astype(np.float32) / 32768.0
+        source.append(resampler.process(samples))
+    source.close()
+
+
+def stream_samples(chunks, src_rate, source, dst_rate=RATE):
+    """Copies float32 sample arrays (e.g. one per synthesized sentence) into a streaming source, then closes it."""
+    resampler = Resampler(src_rate, dst_rate)
+    for samples in chunks:
+        if source.stopped:
+            break
+        source.append(resampler.process(samples))
+    source.close()
+
+
+class Mixer:
+    def __init__(self, pa, rate=RATE, block=BLOCK, duck=0.35):
+        self.rate = rate
+        self.duck = duck
+        self._sources = []
+        self._lock = threading.Lock()
+        self.stream = pa.open(format=pyaudio.paInt16, channels=1, rate=rate, output=True,
+                              frames_per_buffer=block, stream_callback=self._callback)
+        self.stream.start_stream()
+
+    def play(self, samples, kind="sfx", gain=1.0):
+        """Plays already-decoded samples; returns the Source."""
+        return self._add(Source(kind, gain, samples))
+
+    def open_stream(self, kind="voice", gain=1.0):
+        """A source fed with append() while it plays; close() it after the last samples."""
+        return self._add(Source(kind, gain))
+
+    def _add(self, source):
+        with self._lock:
+            self._sources.append(source)
+        return source
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        with self._lock:
+            sources = list(self._sources)
+        out = np.zeros(frame_count, dtype=np.float32)
+        speaking = any(s.kind == "voice" and not s.stopped for s in sources)
+        finished = []
+        for source in sources:
+            if source.stopped:
+                finished.append(source)
+                continue
+            data, drained = source.read(frame_count)
+            gain = source.gain * (self.duck if speaking and source.kind == "sfx" else 1.0)
+            out[:len(data)] += data * gain
+            if drained:
+                finished.append(source)
+        if finished:
+            with self._lock:
+                self._sources = [s for s in self._sources if s not in finished]
+            for source in finished:
+                source.done.set()
+        pcm = (np.clip(out, -1.0, 1.0) * 32767).astype(np.int16)
+        return pcm.tobytes(), pyaudio.paContinue
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
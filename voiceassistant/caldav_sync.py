@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Incremental CalDAV sync for calendar-agent.py.
+
+The first sync lists the whole collection; after that a sync-collection
+REPORT (RFC 6578) with the stored sync token returns only the members
+that changed or were deleted since, and just the changed ones are
+downloaded with a calendar-multiget REPORT (RFC 4791). Events are kept in
+a small SQLite store (href -> etag, iCalendar text) from which the agent's
+calendar file is rebuilt. If the server no longer accepts the token the
+collection is listed in full again and members it no longer has are
+dropped.
+"""
+import sqlite3
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlsplit
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+MULTIGET_BATCH = 100
+MAX_ROUNDS = 50   # truncated (507) sync responses followed before giving up
+
+SYNC_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop><d:getetag/></d:prop>
+</d:sync-collection>"""
+
+MULTIGET_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+{hrefs}
+</c:calendar-multiget>"""
+
+
+class SyncTokenInvalid(Exception):
+    pass
+
+
+def _tag(ns, name):
+    return f"{{{ns}}}{name}"
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _status_code(status_text):
+    # "HTTP/1.1 404 Not Found" -> 404
+    parts = (status_text or "").split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 200
+
+
+def parse_multistatus(body):
+    """[(href, status, {"etag", "data"})] plus the sync token (if any)."""
+    root = ET.fromstring(body)
+    results = []
+    for response in root.findall(_tag(DAV, "response")):
+        href = (response.findtext(_tag(DAV, "href")) or "").strip()
+        status = _status_code(response.findtext(_tag(DAV, "status")))
+        props = {}
+        for propstat in response.findall(_tag(DAV, "propstat")):
+            if _status_code(propstat.findtext(_tag(DAV, "status"))) != 200:
+                continue
+            prop = propstat.find(_tag(DAV, "prop"))
+            if prop is None:
+                continue
+            etag = prop.findtext(_tag(DAV, "getetag"))
+            data = prop.findtext(_tag(CALDAV, "calendar-data"))
+            if etag is not None:
+                props["etag"] = etag.strip()
+            if data is not None:
+                props["data"] = data
+        results.append((href, status, props))
+    return results, root.findtext(_tag(DAV, "sync-token"))
+
+
+class EventStore:
+    """Local copy of one collection: sync token plus href -> (etag, iCalendar text)."""
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS events (href TEXT PRIMARY KEY, etag TEXT, ics TEXT NOT NULL);
+        """)
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def etags(self):
+        return dict(self.db.execute("SELECT href, etag FROM events"))
+
+    def put(self, href, etag, ics):
+        self.db.execute("INSERT OR REPLACE INTO events (href, etag, ics) VALUES (?, ?, ?)", (href, etag, ics))
+
+    def delete(self, href):
+        self.db.execute("DELETE FROM events WHERE href = ?", (href,))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def to_ical(self):
+        """Every stored event in one VCALENDAR (bytes), time zones de-duplicated."""
+        seen_timezones = set()
+        out = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Galactica Voice//mxm.dk//"]
+        for (ics,) in self.db.execute("SELECT ics FROM events ORDER BY href"):
+            for kind, block in _components(ics):
+                if kind == "VTIMEZONE":
+                    if block in seen_timezones:
+                        continue
+                    seen_timezones.add(block)
+                out.append(block)
+        out.append("END:VCALENDAR")
+        return ("\r\n".join(out) + "\r\n").encode()
+
+
+def _components(ics):
+    """Top-level (name, text) components of one calendar object resource."""
+    lines = ics.replace("\r\n", "\n").split("\n")
+    depth = 0
+    current, name = [], None
+    for line in lines:
+        if line.startswith("BEGIN:") and line != "BEGIN:VCALENDAR":
+            if depth == 0:
+                name, current = line[6:].strip(), []
+            depth += 1
+        if depth:
+            current.append(line)
+        if line.startswith("END:") and line != "END:VCALENDAR" and depth:
+            depth -= 1
+            if depth == 0:
+                yield name, "\r\n".join(current)
+
+
+class CalDAVSync:
+    def __init__(self, session, url, store, timeout=10, auth=None):
+        self.session = session
+        self.url = url if url.endswith("/") else url + "/"
+        self.store = store
+        self.timeout = timeout
+        self.auth = auth
+        self.stats = {"changed": 0, "deleted": 0, "full": False, "truncated": False}
+
+    def _report(self, body, depth):
+        response = self.session.request(
+            "REPORT", self.url, data=body.encode(), auth=self.auth, timeout=self.timeout,
+            headers={"Content-Type": "application/xml; charset=utf-8", "Depth": depth})
+        # RFC 6578 answers 403 with a valid-sync-token precondition; some servers send 409 or 410 Gone.
+        if response.status_code == 410 or (response.status_code in (403, 409)
+                                           and b"valid-sync-token" in response.content):
+            raise SyncTokenInvalid()
+        if response.status_code != 207:
+            response.raise_for_status()
+            raise RuntimeError(f"unexpected status {response.status_code} from {self.url}")
+        return response.content
+
+    def _is_member(self, href):
+        path = urlsplit(urljoin(self.url, href)).path
+        return path.rstrip("/") != urlsplit(self.url).path.rstrip("/")
+
+    def _changes(self, token):
+        """Changed hrefs with their etags and deleted hrefs since `token`, the new token, and
+        whether the server was still truncating (507) the listing after MAX_ROUNDS."""
+        changed, deleted = {}, set()
+        for _ in range(MAX_ROUNDS):
+            results, new_token = parse_multistatus(self._report(SYNC_BODY.format(token=_escape(token)), "1"))
+            truncated = False
+            for href, status, props in results:
+                if not self._is_member(href):
+                    truncated = truncated or status == 507
+                    continue
+                if status == 404:
+                    deleted.add(href)
+                    changed.pop(href, None)
+                else:
+                    changed[href] = props.get("etag")
+                    deleted.discard(href)
+            token = new_token or token
+            if not truncated:
+                return changed, deleted, token, False
+        return changed, deleted, token, True
+
+    def _fetch(self, hrefs):
+        hrefs = list(hrefs)
+        for i in range(0, len(hrefs), MULTIGET_BATCH):
+            batch = "\n".join(f"  <d:href>{_escape(h)}</d:href>" for h in hrefs[i:i + MULTIGET_BATCH])
+            results, _ = parse_multistatus(self._report(MULTIGET_BODY.format(hrefs=batch), "1"))
+            for href, status, props in results:
+                if status == 200 and "data" in props:
+                    yield href, props.get("etag"), props["data"]
+
+    def sync(self):
+        """Brings the store up to date. Returns stats {"changed", "deleted", "full", "truncated"}.
+
+        A listing the server never finished is applied as far as it goes, but
+        neither implies deletions nor advances the stored token.
+        """
+        token = self.store.get_meta("sync_token") or ""
+        try:
+            changed, deleted, new_token, truncated = self._changes(token)
+        except SyncTokenInvalid:
+            token = ""
+            changed, deleted, new_token, truncated = self._changes(token)
+        self.stats["truncated"] = truncated
+
+        known = self.store.etags()
+        if not token:
+            # Full listing: anything we hold that the server did not list is gone.
+            self.stats["full"] = True
+            if not truncated:
+                deleted |= set(known) - set(changed)
+        # Only download members whose etag actually differs from our copy.
+        wanted = [href for href, etag in changed.items() if etag is None or known.get(href) != etag]
+
+        for href, etag, data in self._fetch(wanted):
+            self.store.put(href, etag, data)
+            self.stats["changed"] += 1
+        for href in deleted:
+            if href in known:
+                self.store.delete(href)
+                self.stats["deleted"] += 1
+        if new_token and not truncated:
+            self.store.set_meta("sync_token", new_token)
+        self.store.commit()
+        return self.stats
@@ -3,13 +3,22 @@ import sys
 import os
 import datetime
 import json
+import re
 import requests
+import requests.adapters
 import subprocess
 import time
 import sqlite3
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dateutil.relativedelta import relativedelta 
 from icalendar import Calendar
 import recurring_ical_events
+import caldav_sync
+import ics_stream
+import freebusy
 
 # --- CONFIG & PATHS ---
 if getattr(sys, 'frozen', False):
@@ -144,155 +153,275 @@ def speak(text):
     except Exception as e:
         log(f"Speak error: {e}")
 
-def fetch_calendar():
-    """ Downloads the latest ICS file with cache-busting or copies local file """
-    log("fetch_calendar: start")
-    settings = load_settings()
-    url = settings.get("calendar_url", "")
-    log(f"fetch_calendar: url={url}")
+# --- CALENDAR SOURCES ---
+# "calendar_url" is one source (an http(s) URL, a file path or "local") or a
+# list of them; "calendar_sources" may list them with per-source options:
+#     [{"url": "https://...", "timeout": 5}, "local",
+#      {"type": "caldav", "url": "https://dav.example.com/cal/", "username": "...", "password": "..."}]
+# Every source is fetched in parallel over one pooled HTTP session and its
+# last good copy is kept in calendar-sources/, so a slow or failing source
+# is served from that copy while the others update.
+SOURCE_CACHE_DIR = os.path.join(USER_DIR, "calendar-sources")
+DEFAULT_SOURCE_TIMEOUT = 10
+
+_http = None
+
+def http_session():
+    """One keep-alive session per process, reused by every fetch (and by the warm worker)."""
+    global _http
+    if _http is None:
+        _http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        _http.mount("https://", adapter)
+        _http.mount("http://", adapter)
+    return _http
+
+def calendar_sources(settings):
+    """[{"url": ..., "timeout": seconds, ...}] from the settings."""
+    sources = settings.get("calendar_sources") or settings.get("calendar_url", "")
+    if not isinstance(sources, list):
+        sources = [sources]
+    default_timeout = settings.get("calendar_timeout", DEFAULT_SOURCE_TIMEOUT)
+    result = []
+    for source in sources:
+        if isinstance(source, str):
+            source = {"url": source}
+        if source.get("url", "").strip():
+            result.append(dict(source, url=source["url"].strip(), timeout=source.get("timeout", default_timeout)))
+    return result
+
+def source_cache_path(url):
+    return os.path.join(SOURCE_CACHE_DIR, hashlib.sha1(url.encode()).hexdigest()[:16] + ".ics")
+
+# --- Local System Calendar Auto-Detection (Evolution/Gnome/Thunderbird/KDE) ---
+def fetch_local():
+    """Merges every local ICS file and Evolution cache.db into one calendar (bytes), or None."""
+    base_paths = [
+        # GNOME / Evolution
+        os.path.expanduser("~/.local/share/evolution/calendar"),
+        os.path.expanduser("~/.cache/evolution/calendar"),
+        os.path.expanduser("~/.var/app/org.gnome.Calendar/data/evolution/calendar"),
+        os.path.expanduser("~/.var/app/org.gnome.Calendar/cache/evolution/calendar"),
+        # Thunderbird
+        os.path.expanduser("~/.thunderbird"),
+        os.path.expanduser("~/.mozilla/thunderbird"), # Some distros use this
+        # KDE / Akonadi usually difficult, but check standard paths
+        os.path.expanduser("~/.local/share/akonadi"),
+        # Standard / Other
+        os.path.expanduser("~/.calendar"),
+        os.path.expanduser("~/Documents") # Common export location
+    ]
     
-    if not url:
-        return False
+    found_calendars = []
+    found_dbs = []
     
-    # --- Local System Calendar Auto-Detection (Evolution/Gnome/Thunderbird/KDE) ---
-    if url.lower() == "local":
-        base_paths = [
-            # GNOME / Evolution
-            os.path.expanduser("~/.local/share/evolution/calendar"),
-            os.path.expanduser("~/.cache/evolution/calendar"),
-            os.path.expanduser("~/.var/app/org.gnome.Calendar/data/evolution/calendar"),
-            os.path.expanduser("~/.var/app/org.gnome.Calendar/cache/evolution/calendar"),
-            # Thunderbird
-            os.path.expanduser("~/.thunderbird"),
-            os.path.expanduser("~/.mozilla/thunderbird"), # Some distros use this
-            # KDE / Akonadi usually difficult, but check standard paths
-            os.path.expanduser("~/.local/share/akonadi"),
-            # Standard / Other
-            os.path.expanduser("~/.calendar"),
-            os.path.expanduser("~/Documents") # Common export location
-        ]
-        
-        found_calendars = []
-        found_dbs = []
-        
-        for base in base_paths:
-            log(f"Scanning base: {base}")
-            if os.path.exists(base):
-                for root, dirs, files in os.walk(base):
-                    if "/trash" in root: continue
-                    for file in files:
-                        if file.endswith(".ics"):
-                            found_calendars.append(os.path.join(root, file))
-                        elif file == "cache.db":
-                            found_dbs.append(os.path.join(root, file))
-        
-        log(f"Found calendars: {len(found_calendars)} ICS, {len(found_dbs)} DBs")
-        if not found_calendars and not found_dbs:
-            log("No local calendars found")
-            return False
+    for base in base_paths:
+        log(f"Scanning base: {base}")
+        if os.path.exists(base):
+            for root, dirs, files in os.walk(base):
+                if "/trash" in root: continue
+                for file in files:
+                    if file.endswith(".ics"):
+                        found_calendars.append(os.path.join(root, file))
+                    elif file == "cache.db":
+                        found_dbs.append(os.path.join(root, file))
+    
+    log(f"Found calendars: {len(found_calendars)} ICS, {len(found_dbs)} DBs")
+    if not found_calendars and not found_dbs:
+        log("No local calendars found")
+        return None
 
-        try:
-            master_cal = Calendar()
-            master_cal.add('prodid', '-//Galactica Voice//mxm.dk//')
-            master_cal.add('version', '2.0')
-            events_found = 0
-            
-            # 1. Process ICS Files
-            for path in found_calendars:
-                try:
-                    with open(path, 'rb') as f:
-                        content = f.read()
-                        if b"BEGIN:VCALENDAR" in content:
-                            part_cal = Calendar.from_ical(content)
+    try:
+        master_cal = Calendar()
+        master_cal.add('prodid', '-//Galactica Voice//mxm.dk//')
+        master_cal.add('version', '2.0')
+        events_found = 0
+        
+        # 1. Process ICS Files
+        for path in found_calendars:
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                    if b"BEGIN:VCALENDAR" in content:
+                        part_cal = Calendar.from_ical(content)
+                        for component in part_cal.walk():
+                            if component.name == "VEVENT":
+                                master_cal.add_component(component)
+                                events_found += 1
+            except Exception as e:
+                log(f"Error reading ICS {path}: {e}")
+                continue
+
+        # 2. Process Evolution SQLite DBs
+        for db_path in found_dbs:
+            try:
+                conn = sqlite3.connect(db_path)
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ECacheObjects';")
+                if not cursor.fetchone():
+                    conn.close(); continue
+
+                cursor.execute("SELECT ECacheOBJ FROM ECacheObjects")
+                rows = cursor.fetchall()
+                for row in rows:
+                    raw_data = row[0]
+                    if raw_data:
+                        try:
+                            # --- FIX: DECODE BYTES & WRAP ---
+                            if isinstance(raw_data, bytes):
+                                ical_str_content = raw_data.decode('utf-8')
+                            else:
+                                ical_str_content = str(raw_data)
+                            
+                            if "BEGIN:VCALENDAR" in ical_str_content:
+                                final_ical_str = ical_str_content
+                            else:
+                                final_ical_str = f"BEGIN:VCALENDAR\n{ical_str_content}\nEND:VCALENDAR"
+
+                            part_cal = Calendar.from_ical(final_ical_str)
                             for component in part_cal.walk():
                                 if component.name == "VEVENT":
                                     master_cal.add_component(component)
                                     events_found += 1
-                except Exception as e:
-                    log(f"Error reading ICS {path}: {e}")
-                    continue
-
-            # 2. Process Evolution SQLite DBs
-            for db_path in found_dbs:
-                try:
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ECacheObjects';")
-                    if not cursor.fetchone():
-                        conn.close(); continue
-
-                    cursor.execute("SELECT ECacheOBJ FROM ECacheObjects")
-                    rows = cursor.fetchall()
-                    for row in rows:
-                        raw_data = row[0]
-                        if raw_data:
-                            try:
-                                # --- FIX: DECODE BYTES & WRAP ---
-                                if isinstance(raw_data, bytes):
-                                    ical_str_content = raw_data.decode('utf-8')
-                                else:
-                                    ical_str_content = str(raw_data)
-                                
-                                if "BEGIN:VCALENDAR" in ical_str_content:
-                                    final_ical_str = ical_str_content
-                                else:
-                                    final_ical_str = f"BEGIN:VCALENDAR\n{ical_str_content}\nEND:VCALENDAR"
-
-                                part_cal = Calendar.from_ical(final_ical_str)
-                                for component in part_cal.walk():
-                                    if component.name == "VEVENT":
-                                        master_cal.add_component(component)
-                                        events_found += 1
-                            except Exception as parsing_err:
-                                log(f"Parsing row error: {parsing_err}")
-                                pass
-                    conn.close()
-                except Exception as e:
-                    log(f"Error reading DB {db_path}: {e}")
-                    continue
-
-            if events_found > 0:
-                with open(CALENDAR_FILE, 'wb') as f:
-                    f.write(master_cal.to_ical())
-                log(f"Successfully merged {events_found} events to {CALENDAR_FILE}")
-                return True
-            
-            log("No events found in local sources")
-            return False
+                        except Exception as parsing_err:
+                            log(f"Parsing row error: {parsing_err}")
+                            pass
+                conn.close()
+            except Exception as e:
+                log(f"Error reading DB {db_path}: {e}")
+                continue
+
+        if events_found > 0:
+            log(f"Successfully merged {events_found} local events")
+            return master_cal.to_ical()
+        
+        log("No events found in local sources")
+        return None
 
-        except Exception as e:
-            log(f"Merge error: {e}")
+    except Exception as e:
+        log(f"Merge error: {e}")
+        return None
+
+def fetch_caldav(source, dest):
+    """Incremental sync of a CalDAV collection into its event store, then writes the whole
+    calendar to dest. Returns False, writing nothing, if the cached copy was rendered at
+    the same sync token and the sync changed nothing."""
+    cache_path = source_cache_path(source["url"])
+    store = caldav_sync.EventStore(os.path.splitext(cache_path)[0] + ".db")
+    try:
+        auth = (source["username"], source.get("password", "")) if source.get("username") else None
+        stats = caldav_sync.CalDAVSync(http_session(), source["url"], store, source["timeout"], auth).sync()
+        log(f"caldav: {source['url']} {'full' if stats['full'] else 'incremental'} sync, "
+            f"{stats['changed']} changed, {stats['deleted']} deleted"
+            f"{', listing truncated' if stats['truncated'] else ''}")
+        token = store.get_meta("sync_token", "")
+        if (not stats["changed"] and not stats["deleted"] and token
+                and store.get_meta("rendered_token") == token and os.path.exists(cache_path)):
             return False
+        with open(dest, 'wb') as f:
+            f.write(store.to_ical())
+        store.set_meta("rendered_token", token)
+        store.commit()
+        return True
+    finally:
+        store.close()
+
+def fetch_source(source, dest):
+    """Writes one source's raw ICS to dest; raises on failure. Returns False if the
+    source's cached copy is already current and nothing was written."""
+    url = source["url"]
+    if source.get("type") == "caldav":
+        return fetch_caldav(source, dest)
+
+    if url.lower() == "local":
+        data = fetch_local()
+        if data is None:
+            raise LookupError("no local calendars found")
+        with open(dest, 'wb') as f:
+            f.write(data)
+        return True
 
     # --- Direct File Path ---
     if url.startswith("/") or url.startswith("file://"):
         path = url.replace("file://", "")
-        if os.path.exists(path):
-            with open(path, 'rb') as src, open(CALENDAR_FILE, 'wb') as dst:
-                dst.write(src.read())
-            return True
-        log(f"File not found: {path}")
-        return False
+        with open(path, 'rb') as src, open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst, ics_stream.CHUNK_SIZE)
+        return True
 
-    # --- HTTP Download ---
+    # --- HTTP Download (streamed to disk, never held in memory whole) ---
     timestamp = int(time.time())
     final_url = f"{url}&t={timestamp}" if "?" in url else f"{url}?t={timestamp}"
+    ics_stream.download(http_session(), final_url, dest, source["timeout"])
+    return True
+
+def refresh_source(source):
+    """Fetches one source into its cache file. Returns the cache path if one is usable."""
+    cache_path = source_cache_path(source["url"])
+    # Per thread: a timed-out fetch may still be writing when the next sync starts.
+    tmp_path = f"{cache_path}.{threading.get_ident()}.part"
+    started = time.monotonic()
+    try:
+        if fetch_source(source, tmp_path):
+            os.replace(tmp_path, cache_path)
+            log(f"fetch_calendar: {source['url']} updated in {time.monotonic() - started:.2f}s")
+        else:
+            log(f"fetch_calendar: {source['url']} unchanged after {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        log(f"fetch_calendar: {source['url']} failed ({e}), using last good copy")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cache_path if os.path.exists(cache_path) else None
+
+def merge_sources(paths):
+    """Writes the given source caches into CALENDAR_FILE as one calendar."""
+    if len(paths) == 1:
+        shutil.copyfile(paths[0], CALENDAR_FILE)
+        return
+    ics_stream.merge(paths, CALENDAR_FILE)
 
+def fetch_calendar():
+    """Refreshes every calendar source concurrently and merges them into CALENDAR_FILE."""
+    log("fetch_calendar: start")
+    sources = calendar_sources(load_settings())
+    log(f"fetch_calendar: {len(sources)} sources")
+    
+    if not sources:
+        return False
+
+    os.makedirs(SOURCE_CACHE_DIR, exist_ok=True)
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=len(sources))
+    futures = [pool.submit(refresh_source, source) for source in sources]
+    # requests' timeout bounds each socket read, not the whole download, so
+    # a trickling server is cut off here; it keeps updating its cache copy in
+    # the background and this run uses the previous one.
+    done, _pending = wait(futures, timeout=max(source["timeout"] for source in sources) + 1)
+    pool.shutdown(wait=False)
+
+    paths = []
+    for source, future in zip(sources, futures):
+        path = future.result() if future in done else None
+        if path is None and future not in done:
+            log(f"fetch_calendar: {source['url']} timed out, using last good copy")
+            cached = source_cache_path(source["url"])
+            path = cached if os.path.exists(cached) else None
+        if path:
+            paths.append(path)
+    log(f"fetch_calendar: {len(paths)}/{len(sources)} sources usable after {time.monotonic() - started:.2f}s")
+
+    if not paths:
+        return False
     try:
-        response = requests.get(final_url, timeout=15)
-        response.raise_for_status()
-        with open(CALENDAR_FILE, 'wb') as f:
-            f.write(response.content)
-        log("Downloaded remote calendar successfully")
+        merge_sources(paths)
         return True
     except Exception as e:
-        log(f"Download error: {e}")
+        log(f"fetch_calendar: merge error: {e}")
         return False
 
 # --- LOGIC ---
 
-def get_calendar_object():
-    """Loads and returns the parsed calendar object."""
+def get_calendar_object(start=None, end=None):
+    """Loads and returns the parsed calendar, keeping only events that may fall in [start, end]."""
     fetch_calendar() # Always try to sync first
     
     if not os.path.exists(CALENDAR_FILE):
@@ -300,8 +429,9 @@ def get_calendar_object():
         sys.exit(1)
 
     try:
-        with open(CALENDAR_FILE, 'rb') as f:
-            return Calendar.from_ical(f.read())
+        cal, kept, dropped = ics_stream.load(CALENDAR_FILE, start, end)
+        log(f"get_calendar_object: {kept} events kept, {dropped} outside the horizon")
+        return cal
     except:
         speak("The calendar file is corrupted.")
         sys.exit(1)
@@ -310,11 +440,18 @@ def format_event_time(dt_start):
     """Converts datetime to readable 12h string."""
     return dt_start.strftime("%I:%M %p").lstrip("0")
 
+def event_sort_key(event):
+    """DTSTART as an aware datetime, so all-day, floating and zoned events sort together."""
+    start = event.get('DTSTART').dt
+    if not isinstance(start, datetime.datetime):
+        start = datetime.datetime.combine(start, datetime.time.min)
+    return start.astimezone()
+
 def get_events_range(calendar, start, end):
     """Wrapper for recurring_ical_events."""
     try:
         events = recurring_ical_events.of(calendar).between(start, end)
-        events.sort(key=lambda x: x.get('DTSTART').dt)
+        events.sort(key=event_sort_key)
         return events
     except:
         return []
@@ -322,7 +459,6 @@ def get_events_range(calendar, start, end):
 # --- MODES ---
 
 def mode_daily(target_date, label="Today"):
-    cal = get_calendar_object()
     now = datetime.datetime.now().astimezone()
     
     start_range = datetime.datetime.combine(target_date, datetime.time.min).replace(tzinfo=now.tzinfo)
@@ -331,6 +467,7 @@ def mode_daily(target_date, label="Today"):
     if label == "Today":
         start_range = now
 
+    cal = get_calendar_object(start_range, end_range)
     events = get_events_range(cal, start_range, end_range)
     
     if not events:
@@ -357,9 +494,9 @@ def mode_daily(target_date, label="Today"):
     speak(report)
 
 def mode_week():
-    cal = get_calendar_object()
     now = datetime.datetime.now().astimezone()
     end_range = now + datetime.timedelta(days=7)
+    cal = get_calendar_object(now, end_range)
     
     events = get_events_range(cal, now, end_range)
     
@@ -383,9 +520,9 @@ def mode_week():
     speak(report)
 
 def mode_next():
-    cal = get_calendar_object()
     now = datetime.datetime.now().astimezone()
     end_range = now + datetime.timedelta(days=30)
+    cal = get_calendar_object(now, end_range)
     
     events = get_events_range(cal, now, end_range)
     
@@ -428,9 +565,9 @@ def mode_next():
         speak(f"Next up is an all-day event: {summary}, tomorrow.")
 
 def mode_search(query):
-    cal = get_calendar_object()
     now = datetime.datetime.now().astimezone()
     end_range = now + datetime.timedelta(days=90)
+    cal = get_calendar_object(now, end_range)
     
     events = get_events_range(cal, now, end_range)
     matches = []
@@ -482,40 +619,190 @@ def mode_weekday_name(day_name):
     label = target_date.strftime("%A, %B %d")
     mode_daily(target_date, label)
 
-# --- MAIN DISPATCH ---
+# --- FREE / BUSY ---
+# "free [day] [minutes] [before|after HH:MM]" and "busy [day] ...", where day
+# is today (default), tomorrow, a weekday or YYYY-MM-DD. Only working hours
+# ("calendar_work_hours", default ["09:00", "17:00"]) are considered. Timed
+# events are busy unless marked TRANSP:TRANSPARENT; all-day events are free
+# unless marked TRANSP:OPAQUE; cancelled events are ignored.
 
-if __name__ == "__main__":
-    weekdays = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+def parse_day(word):
+    """(date, spoken label) for today/tomorrow/a weekday/YYYY-MM-DD, or None."""
+    today = datetime.date.today()
+    word = word.lower()
+    if word == "today":
+        return today, "today"
+    if word == "tomorrow":
+        return today + datetime.timedelta(days=1), "tomorrow"
+    if word in WEEKDAYS:
+        days_ahead = (WEEKDAYS.index(word) - today.weekday()) % 7
+        target = today + datetime.timedelta(days=days_ahead)
+        return target, f"on {target.strftime('%A')}"
+    try:
+        target = datetime.datetime.strptime(word, "%Y-%m-%d").date()
+        return target, f"on {target.strftime('%A, %B %d')}"
+    except ValueError:
+        return None
+
+def parse_clock(text):
+    """"15:00", "15", "3pm", "3:30pm" -> datetime.time, or None."""
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?", text.lower().strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if match.group(3):
+        hour = hour % 12 + (12 if match.group(3).startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return datetime.time(hour, minute)
+
+def parse_freebusy_args(args):
+    """-> (date, label, minutes or None, window start, window end) or an error message."""
+    settings = load_settings()
+    work_start, work_end = settings.get("calendar_work_hours", ["09:00", "17:00"])
+    day = parse_day("today")
+    minutes = None
+    not_before, not_after = parse_clock(work_start), parse_clock(work_end)
+    words = [a for arg in args for a in arg.split()]
+    i = 0
+    while i < len(words):
+        word = words[i].lower()
+        if word in ("before", "after") and i + 1 < len(words):
+            clock = parse_clock(words[i + 1])
+            if clock is None:
+                return f"I didn't understand the time {words[i + 1]}."
+            if word == "before":
+                not_after = clock
+            else:
+                not_before = clock
+            i += 2
+            continue
+        if word.isdigit():
+            minutes = int(word)
+        elif word not in ("minutes", "minute", "mins", "for", "a", "slot", "of"):
+            day = parse_day(word)
+            if day is None:
+                return f"I didn't understand {words[i]}."
+        i += 1
+
+    target, label = day
+    tz = datetime.datetime.now().astimezone().tzinfo
+    window_start = datetime.datetime.combine(target, not_before).replace(tzinfo=tz)
+    window_end = datetime.datetime.combine(target, not_after).replace(tzinfo=tz)
+    if target == datetime.date.today():
+        window_start = max(window_start, datetime.datetime.now().astimezone().replace(second=0, microsecond=0))
+    return target, label, minutes, window_start, window_end
+
+def occurrence_interval(event):
+    """(start, end) epoch seconds of a busy occurrence, or None if it does not block time."""
+    status = str(event.get('STATUS', '')).upper()
+    transp = str(event.get('TRANSP', '')).upper()
+    if status == "CANCELLED":
+        return None
+    start = event.get('DTSTART').dt
+    end_prop = event.get('DTEND')
+    if end_prop is not None:
+        end = end_prop.dt
+    elif event.get('DURATION') is not None:
+        end = start + event.get('DURATION').dt
+    else:
+        end = start + (datetime.timedelta(days=1) if not isinstance(start, datetime.datetime) else datetime.timedelta(0))
+
+    if not isinstance(start, datetime.datetime):
+        if transp != "OPAQUE":
+            return None
+        tz = datetime.datetime.now().astimezone().tzinfo
+        start = datetime.datetime.combine(start, datetime.time.min).replace(tzinfo=tz)
+        end = datetime.datetime.combine(end, datetime.time.min).replace(tzinfo=tz)
+    elif transp == "TRANSPARENT":
+        return None
+    start, end = start.astimezone(), end.astimezone()
+    return start.timestamp(), end.timestamp()
+
+def busy_index(events):
+    return freebusy.BusyIndex([i for i in map(occurrence_interval, events) if i])
+
+def spoken_clock(ts):
+    return format_event_time(datetime.datetime.fromtimestamp(ts).astimezone())
+
+def spoken_ranges(ranges):
+    parts = [f"from {spoken_clock(a)} to {spoken_clock(b)}" for a, b in ranges]
+    if len(parts) > 1:
+        parts[-1] = "and " + parts[-1]
+    return ", ".join(parts) if len(parts) > 2 else " ".join(parts)
+
+def mode_freebusy(kind, args):
+    parsed = parse_freebusy_args(args)
+    if isinstance(parsed, str):
+        speak(parsed)
+        return
+    target, label, minutes, window_start, window_end = parsed
+    if window_end <= window_start:
+        speak(f"There is no time left to check {label}.")
+        return
+
+    cal = get_calendar_object(window_start, window_end)
+    index = busy_index(get_events_range(cal, window_start, window_end))
+    start, end = window_start.timestamp(), window_end.timestamp()
+    span = f"between {spoken_clock(start)} and {spoken_clock(end)}"
 
-    if len(sys.argv) < 2:
-        mode = "today"
+    if kind == "busy":
+        busy = index.busy(start, end)
+        if not busy:
+            speak(f"You have nothing booked {label} {span}.")
+        else:
+            speak(f"{label.capitalize()} you are busy {spoken_ranges(busy)}.")
+        return
+
+    if minutes:
+        slot = index.first_free(start, end, minutes * 60)
+        if slot is None:
+            speak(f"You have no free {minutes} minute slot {label} {span}.")
+        else:
+            speak(f"Your first free {minutes} minute slot {label} starts at {spoken_clock(slot)}.")
+        return
+
+    free = index.free(start, end)
+    if not free:
+        speak(f"You are fully booked {label} {span}.")
+    elif free == [(start, end)]:
+        speak(f"You are free all {label} {span}." if label in ("today", "tomorrow") else f"You are free {label} {span}.")
     else:
-        mode = sys.argv[1].lower()
+        speak(f"{label.capitalize()} you are free {spoken_ranges(free)}.")
+
+# --- MAIN DISPATCH ---
 
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def run_mode(args):
+    """Runs one calendar mode, e.g. ["today"] or ["search", "dentist"]."""
+    mode = args[0].lower() if args else "today"
     today = datetime.date.today()
 
     if mode == "today":
         mode_daily(today, "Today")
     elif mode == "tomorrow":
         mode_daily(today + datetime.timedelta(days=1), "Tomorrow")
-    elif mode in weekdays:
+    elif mode in WEEKDAYS:
         mode_weekday_name(mode)
     elif mode == "week":
         mode_week()
+    elif mode in ("free", "busy"):
+        mode_freebusy(mode, args[1:])
     elif mode == "next":
         mode_next()
     elif mode == "search":
-        if len(sys.argv) < 3:
+        if len(args) < 2:
             speak("What should I search for?")
         else:
-            query = " ".join(sys.argv[2:])
+            query = " ".join(args[1:])
             mode_search(query)
     elif mode == "date":
-        if len(sys.argv) < 3:
+        if len(args) < 2:
             speak("Please provide a date in YYYY-MM-DD format.")
         else:
             try:
-                date_str = sys.argv[2]
+                date_str = args[1]
                 target = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
                 label = target.strftime("%A, %B %d")
                 mode_daily(target, label)
@@ -523,7 +810,60 @@ if __name__ == "__main__":
                 speak("I didn't understand that date format.")
     elif mode == "report_today":
         # Special internal mode for system report integration
+        previous = os.environ.get("CALENDAR_REPORT_MODE")
         os.environ["CALENDAR_REPORT_MODE"] = "1"
+        try:
+            mode_daily(today, "Today")
+        finally:
+            if previous is None:
+                os.environ.pop("CALENDAR_REPORT_MODE", None)
+            else:
+                os.environ["CALENDAR_REPORT_MODE"] = previous
+    else:
         mode_daily(today, "Today")
+
+def serve():
+    """Warm worker for the voice assistant.
+
+    Reads one JSON request per line from stdin ({"args": ["today"]}, plus
+    "text_only": true to get the text back instead of spoken) and answers
+    each with one JSON line ({"ok": true, "output": "..."}), so the
+    interpreter and libraries are loaded once instead of once per command.
+    """
+    import io
+    import contextlib
+
+    out = sys.stdout
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        buf = io.StringIO()
+        ok = True
+        previous = os.environ.get("CALENDAR_REPORT_MODE")
+        try:
+            request = json.loads(line)
+            if request.get("text_only"):
+                # Same as report mode: speak() prints instead of playing audio.
+                os.environ["CALENDAR_REPORT_MODE"] = "1"
+            with contextlib.redirect_stdout(buf):
+                run_mode(request.get("args", []))
+        except SystemExit:
+            # Modes exit on a missing/corrupt calendar file; keep serving.
+            ok = False
+        except Exception as e:
+            log(f"serve: error handling {line}: {e}")
+            ok = False
+        finally:
+            if previous is None:
+                os.environ.pop("CALENDAR_REPORT_MODE", None)
+            else:
+                os.environ["CALENDAR_REPORT_MODE"] = previous
+        out.write(json.dumps({"ok": ok, "output": buf.getvalue().strip()}) + "\n")
+        out.flush()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "serve":
+        serve()
     else:
-        mode_daily(today, "Today")
\ No newline at end of file
+        run_mode(sys.argv[1:])
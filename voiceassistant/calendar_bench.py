@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Synthetic benchmark for calendar-agent.py.
+
+Generates calendars at a chosen scale and times the agent against them in
+a throwaway workspace. Nothing touches the network or the real user's
+calendars. The inputs are:
+- an ICS feed (served from a local HTTP server and read as a file);
+- Evolution-style data under a temporary HOME (calendar.ics files and
+  cache.db with an ECacheObjects table) for the "local" source.
+Events mix timed, all-day and zoned ones, with recurring masters, EXDATEs
+and moved occurrences (RECURRENCE-ID overrides).
+
+Timed, each `--repeat` times:
+    fetch_calendar[file|http|local]   sync one source into calendar.ics
+    parse[full|day|week|month]        ics_stream.load() without / with a horizon
+    get_events_range[day|week|month]  recurrence expansion over a parsed month
+    mode[...]                         run_mode() end to end, speech stubbed by CALENDAR_REPORT_MODE
+
+Results (median/min/max ms per step plus the parameters, commit and peak
+RSS) go to stdout and, with --json, to a file; --compare OLD.json prints
+the change per step against an earlier run:
+
+    calendar_bench.py --scale large --json after.json --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import http.server
+import importlib.util
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from dateutil.rrule import rrulestr
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCALES = {
+    "small": 500,
+    "medium": 5000,
+    "large": 50000,
+}
+TIMEZONES = ["Europe/London", "America/New_York", "Europe/Berlin", "Asia/Tokyo",
+             "America/Los_Angeles", "Australia/Sydney", "Asia/Kolkata", "America/Sao_Paulo"]
+TITLES = ["Standup", "Design review", "Dentist", "1:1", "Planning", "Lunch with Sam",
+          "Gym", "Budget sync", "Release retro", "Interview", "School run", "Book club"]
+RRULES = ["FREQ=DAILY;COUNT=30", "FREQ=WEEKLY;BYDAY=MO,WE,FR", "FREQ=WEEKLY;INTERVAL=2",
+          "FREQ=MONTHLY;BYMONTHDAY=15", "FREQ=DAILY;UNTIL={until}", "FREQ=YEARLY"]
+MODES = [["today"], ["tomorrow"], ["week"], ["next"], ["search", "dentist"], ["monday"],
+         ["date", (datetime.date.today() + datetime.timedelta(days=3)).isoformat()],
+         ["free", "tomorrow", "30"], ["busy", "tomorrow"], ["report_today"]]
+
+
+# --- GENERATION ---
+
+def fmt(moment):
+    return moment.strftime("%Y%m%dT%H%M%S")
+
+
+def vtimezone(tzid):
+    """VTIMEZONE text for tzid, or None with icalendar versions that cannot build one."""
+    try:
+        from icalendar import Timezone
+        return Timezone.from_tzid(tzid).to_ical().decode().strip()
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+
+def generate(events, seed=1, recurring=0.2, all_day=0.05, timezones=3, exdates=0.3, overrides=0.2,
+             past_days=365, future_days=365):
+    """(VEVENT texts, VTIMEZONE texts) for `events` events around today.
+
+    `recurring` is the share of events with an RRULE; of those, `exdates`
+    get EXDATEs and `overrides` get a moved occurrence (an extra VEVENT
+    with the same UID and a RECURRENCE-ID). Timed events are split between
+    UTC and `timezones` named zones.
+    """
+    rng = random.Random(seed)
+    zones = TIMEZONES[:timezones]
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0))
+    blocks = []
+    for i in range(events):
+        uid = f"bench-{i}@lcars"
+        day = today + datetime.timedelta(days=rng.randint(-past_days, future_days))
+        title = rng.choice(TITLES)
+        lines = ["BEGIN:VEVENT", f"UID:{uid}", "DTSTAMP:20260101T000000Z", f"SUMMARY:{title} {i}"]
+        is_all_day = rng.random() < all_day
+        if is_all_day:
+            lines += [f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+                      f"DTEND;VALUE=DATE:{day + datetime.timedelta(days=1):%Y%m%d}"]
+            start, zone = day, None
+        else:
+            start = day + datetime.timedelta(minutes=rng.randrange(7 * 60, 19 * 60, 15))
+            end = start + datetime.timedelta(minutes=rng.choice((15, 30, 30, 45, 60, 90)))
+            zone = rng.choice(zones + [None]) if zones else None
+            if zone:
+                lines += [f"DTSTART;TZID={zone}:{fmt(start)}", f"DTEND;TZID={zone}:{fmt(end)}"]
+            else:
+                lines += [f"DTSTART:{fmt(start)}Z", f"DTEND:{fmt(end)}Z"]
+        if rng.random() < 0.1:
+            lines.append("TRANSP:TRANSPARENT")
+        moved = None
+        if rng.random() < recurring:
+            # UNTIL is a DATE for all-day events and UTC otherwise (RFC 5545 3.3.10).
+            last = today + datetime.timedelta(days=future_days)
+            until = f"{last:%Y%m%d}" if is_all_day else fmt(last) + "Z"
+            rule = rng.choice(RRULES).format(until=until)
+            lines.append(f"RRULE:{rule}")
+            # Real occurrences (wall-clock times, as DTSTART is written) to skip or move.
+            upcoming = list(itertools.islice(rrulestr(rule.replace("Z", ""), dtstart=start), 1, 6))
+            if upcoming and rng.random() < exdates:
+                lines.append(exdate_line(rng.choice(upcoming), zone, is_all_day))
+            if upcoming and rng.random() < overrides and not is_all_day:
+                moved = rng.choice(upcoming)
+        lines.append("END:VEVENT")
+        blocks.append("\r\n".join(lines))
+        if moved is not None:
+            new_start = moved + datetime.timedelta(hours=rng.choice((-2, -1, 1, 2)))
+            when = f";TZID={zone}:" if zone else ":"
+            suffix = "" if zone else "Z"
+            blocks.append("\r\n".join([
+                "BEGIN:VEVENT", f"UID:{uid}", "DTSTAMP:20260101T000000Z", f"SUMMARY:{title} {i} (moved)",
+                f"RECURRENCE-ID{when}{fmt(moved)}{suffix}",
+                f"DTSTART{when}{fmt(new_start)}{suffix}",
+                f"DTEND{when}{fmt(new_start + datetime.timedelta(minutes=30))}{suffix}",
+                "END:VEVENT"]))
+    return blocks, [tz for tz in map(vtimezone, zones) if tz]
+
+
+def exdate_line(moment, zone, all_day):
+    if all_day:
+        return f"EXDATE;VALUE=DATE:{moment:%Y%m%d}"
+    if zone:
+        return f"EXDATE;TZID={zone}:{fmt(moment)}"
+    return f"EXDATE:{fmt(moment)}Z"
+
+
+def write_ics(path, blocks, timezones):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//LCARS//calendar bench//EN\r\n")
+        for block in timezones + blocks:
+            f.write(block + "\r\n")
+        f.write("END:VCALENDAR\r\n")
+
+
+def write_evolution_db(path, blocks):
+    """An Evolution cache.db: one bare VEVENT per ECacheObjects row (overrides keyed uid\\nrid)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE ECacheObjects (ECacheUID TEXT PRIMARY KEY, ECacheREV TEXT, "
+               "ECacheOBJ TEXT, ECacheState INTEGER)")
+    rows = []
+    for n, block in enumerate(blocks):
+        uid = block.split("\r\n", 2)[1][4:]
+        rows.append((f"{uid}\n{n}", "1", block, 0))
+    db.executemany("INSERT INTO ECacheObjects VALUES (?, ?, ?, ?)", rows)
+    db.commit()
+    db.close()
+
+
+def build_fixtures(root, args):
+    """Writes the feed and the Evolution HOME. Returns {"feed", "home", "events"}."""
+    events = args.events or SCALES[args.scale]
+    blocks, timezones = generate(events, seed=args.seed, recurring=args.recurring, all_day=args.all_day,
+                                 timezones=args.timezones, exdates=args.exdates, overrides=args.overrides)
+    feed = os.path.join(root, "feed.ics")
+    write_ics(feed, blocks, timezones)
+
+    # Local source: half the events as Evolution ICS files, half in two cache.db files.
+    home = os.path.join(root, "home")
+    half = len(blocks) // 2
+    write_ics(os.path.join(home, ".local/share/evolution/calendar/system/calendar.ics"), blocks[:half], timezones)
+    quarter = half + (len(blocks) - half) // 2
+    write_evolution_db(os.path.join(home, ".cache/evolution/calendar/work/cache.db"), blocks[half:quarter])
+    write_evolution_db(os.path.join(home, ".cache/evolution/calendar/family/cache.db"), blocks[quarter:])
+    return {"feed": feed, "home": home, "events": events, "vevents": len(blocks),
+            "feed_mb": round(os.path.getsize(feed) / 1e6, 2)}
+
+
+# --- RUNNING ---
+
+def serve(path):
+    """Serves `path` on 127.0.0.1; returns its URL."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/feed.ics"
+
+
+def load_agent(workspace, home):
+    """Imports calendar-agent.py against the benchmark workspace (its paths are set at import)."""
+    os.environ["HOME"] = home
+    os.environ["LCARS_WORKSPACE"] = workspace
+    os.environ["LCARS_SETTINGS_PATH"] = os.path.join(workspace, "galactica_settings.json")
+    os.environ["CALENDAR_REPORT_MODE"] = "1"
+    spec = importlib.util.spec_from_file_location("calendar_agent", os.path.join(SCRIPT_DIR, "calendar-agent.py"))
+    agent = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, SCRIPT_DIR)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+def use_source(workspace, url):
+    with open(os.path.join(workspace, "galactica_settings.json"), "w") as f:
+        json.dump({"calendar_url": url, "calendar_timeout": 60}, f)
+
+
+def timed(fn, repeat):
+    """Runs fn `repeat` times; returns ({"median_ms", "min_ms", "max_ms", "runs"}, last result or error)."""
+    times = []
+    result = error = None
+    for _ in range(repeat):
+        out = io.StringIO()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(out):
+                result = fn()
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+        times.append((time.perf_counter() - started) * 1000)
+        if error:
+            break
+    stats = {"median_ms": round(statistics.median(times), 2), "min_ms": round(min(times), 2),
+             "max_ms": round(max(times), 2), "runs": len(times)}
+    if error:
+        stats["error"] = error
+    elif out.getvalue():
+        stats["output_chars"] = len(out.getvalue())
+    return stats, result
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="calendar-bench-")
+    try:
+        return measure(root, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def measure(root, args):
+    workspace = os.path.join(root, "workspace")
+    os.makedirs(workspace)
+    started = time.perf_counter()
+    fixtures = build_fixtures(root, args)
+    print(f"Generated {fixtures['events']} events ({fixtures['vevents']} VEVENTs, "
+          f"{fixtures['feed_mb']} MB feed) in {time.perf_counter() - started:.1f} s under {root}")
+
+    sources = {"file": fixtures["feed"], "http": serve(fixtures["feed"]), "local": "local"}
+    use_source(workspace, sources[args.mode_source])
+    agent = load_agent(workspace, fixtures["home"])
+    import ics_stream
+
+    results = {}
+
+    def record(name, fn, repeat=args.repeat):
+        stats, value = timed(fn, repeat)
+        results[name] = stats
+        note = f"  ({stats['error']})" if "error" in stats else ""
+        print(f"  {name:<28} {stats['median_ms']:>10.1f} ms median  {stats['min_ms']:>10.1f} min{note}")
+        return value
+
+    for name, url in sources.items():
+        use_source(workspace, url)
+        record(f"fetch_calendar[{name}]", agent.fetch_calendar)
+    use_source(workspace, sources[args.mode_source])
+    agent.fetch_calendar()
+
+    now = datetime.datetime.now().astimezone()
+    windows = {"day": datetime.timedelta(days=1), "week": datetime.timedelta(days=7),
+               "month": datetime.timedelta(days=30)}
+    record("parse[full]", lambda: ics_stream.load(agent.CALENDAR_FILE))
+    for name, span in windows.items():
+        record(f"parse[{name}]", lambda span=span: ics_stream.load(agent.CALENDAR_FILE, now, now + span))
+
+    month, _kept, _dropped = ics_stream.load(agent.CALENDAR_FILE, now, now + windows["month"])
+    for name, span in windows.items():
+        record(f"get_events_range[{name}]", lambda span=span: agent.get_events_range(month, now, now + span))
+
+    for mode in MODES:
+        record(f"mode[{' '.join(mode)}]", lambda mode=mode: agent.run_mode(mode))
+
+    return {
+        "version": 1,
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {"events": fixtures["events"], "vevents": fixtures["vevents"], "feed_mb": fixtures["feed_mb"],
+                   "recurring": args.recurring, "all_day": args.all_day, "timezones": args.timezones,
+                   "exdates": args.exdates, "overrides": args.overrides, "seed": args.seed,
+                   "repeat": args.repeat, "mode_source": args.mode_source},
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old, new, threshold=0.1):
+    """Prints each step's median against an earlier run; flags changes beyond `threshold`."""
+    print(f"\nvs {old.get('commit')} ({old.get('timestamp')}):")
+    changed = {k: (old.get("params", {}).get(k), v) for k, v in new["params"].items()
+               if k not in ("repeat", "vevents", "feed_mb") and old.get("params", {}).get(k) != v}
+    for name, (before, now) in changed.items():
+        print(f"  note: {name} differs ({before} vs {now})")
+    for name, stats in new["results"].items():
+        before = old.get("results", {}).get(name)
+        if not before or "error" in before or "error" in stats:
+            continue
+        ratio = stats["median_ms"] / max(before["median_ms"], 1e-6)
+        flag = "  slower" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        print(f"  {name:<28} {before['median_ms']:>10.1f} -> {stats['median_ms']:>10.1f} ms  x{ratio:.2f}{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark calendar-agent on synthetic calendars")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium",
+                        help="event count preset: " + ", ".join(f"{k}={v}" for k, v in SCALES.items()))
+    parser.add_argument("--events", type=int, help="event count (overrides --scale)")
+    parser.add_argument("--recurring", type=float, default=0.2, help="share of events with an RRULE")
+    parser.add_argument("--all-day", type=float, default=0.05, help="share of all-day events")
+    parser.add_argument("--timezones", type=int, default=3, help=f"named time zones used (0-{len(TIMEZONES)})")
+    parser.add_argument("--exdates", type=float, default=0.3, help="share of recurring events with an EXDATE")
+    parser.add_argument("--overrides", type=float, default=0.2, help="share of recurring events with a moved occurrence")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per step (median reported)")
+    parser.add_argument("--mode-source", choices=("file", "http", "local"), default="file",
+                        help="calendar source used for the parse, range and mode steps")
+    parser.add_argument("--keep", action="store_true", help="keep the generated calendars and workspace")
+    parser.add_argument("--json", metavar="OUT", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="OLD", help="compare with an earlier --json result")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"peak RSS {report['max_rss_mb']} MB")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
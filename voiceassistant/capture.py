@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Microphone capture at the device's native rate, converted to 16 kHz mono.
+
+Many USB and Bluetooth inputs only run at 44.1 or 48 kHz, often in stereo.
+Rather than asking PortAudio/PulseAudio for 16 kHz (which fails on some
+devices and silently resamples on others), the stream is opened at the
+device's own rate and channel count. Each captured block is then downmixed
+and resampled here with a polyphase FIR filter. The filter is a
+Kaiser-windowed sinc, with the same design as scipy's resample_poly. The
+whole block is done in a few NumPy operations, with no per-sample Python
+code. The capture thread's CPU time is counted, so the cost per second of
+audio can be checked (`stats()`, or `capture.py` for a benchmark).
+
+    capture.py --seconds 60      # CPU per audio second for common device rates
+"""
+import argparse
+import time
+from math import gcd
+
+import numpy as np
+
+TARGET_RATE = 16000
+HALF_WIDTH = 10     # filter half-length in zero crossings of the narrower band
+KAISER_BETA = 5.0
+
+
+def design_filter(up, down, half_width=HALF_WIDTH, beta=KAISER_BETA):
+    """Low-pass FIR for upsampling by `up` then decimating by `down`; gain `up`."""
+    max_rate = max(up, down)
+    n = np.arange(-half_width * max_rate, half_width * max_rate + 1)
+    return np.sinc(n / max_rate) / max_rate * np.kaiser(len(n), beta) * up
+
+
+class Resampler:
+    """Streaming rational resampler: float32 blocks in, float32 blocks out.
+
+    Output sample n is taken at upsampled position k = n * down. Only the
+    filter taps that land on real input samples (every `up`-th one) are
+    used. So each output is a dot product of `taps` input samples with one
+    of `up` filter phases, and a block's outputs are computed as one
+    gathered matrix product. The last taps - 1 inputs are carried over to
+    the next block.
+    """
+    def __init__(self, src_rate, dst_rate=TARGET_RATE):
+        g = gcd(int(src_rate), int(dst_rate))
+        self.up, self.down = int(dst_rate) // g, int(src_rate) // g
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+        h = design_filter(self.up, self.down)
+        self.taps = -(-len(h) // self.up)
+        h = np.pad(h, (0, self.taps * self.up - len(h)))
+        # phases[p] holds h[p], h[p + up], ... reversed, to line up with a forward input window.
+        self.phases = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.k = 0  # upsampled position of the next output, relative to the current block
+
+    def process(self, x):
+        if self.passthrough or not len(x):
+            return x
+        buf = np.concatenate((self.history, x))
+        # Outputs whose newest input sample is inside this block.
+        count = -(-(len(x) * self.up - self.k) // self.down) if len(x) * self.up > self.k else 0
+        k = self.k + self.down * np.arange(count)
+        windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)[k // self.up]
+        y = np.einsum("ij,ij->i", windows, self.phases[k % self.up])
+        self.k += count * self.down - len(x) * self.up
+        self.history = buf[len(buf) - (self.taps - 1):]
+        return y
+
+
+def to_mono(pcm, channels):
+    """Interleaved 16-bit PCM bytes -> mono float32 in [-1, 1)."""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples.astype(np.float32) / 32768.0
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768).round().astype(np.int16).tobytes()
+
+
+def convert(pcm, rate, channels):
+    """Whole recording (16-bit PCM bytes) -> 16 kHz mono 16-bit PCM bytes."""
+    if rate == TARGET_RATE and channels == 1:
+        return pcm
+    resampler = Resampler(rate)
+    # Flush the filter's delay with trailing silence so the end of the recording is kept.
+    tail = np.zeros(resampler.taps if not resampler.passthrough else 0, dtype=np.float32)
+    return to_pcm16(np.concatenate((resampler.process(to_mono(pcm, channels)), resampler.process(tail))))
+
+
+class ConvertingStream:
+    """Wraps a native-rate PyAudio input stream; read() returns 16 kHz mono 16-bit PCM.
+
+    `frames` in read() are 16 kHz frames, as for a stream opened at 16 kHz,
+    so callers (audio_bus.AudioBus) need not know the device's rate.
+    """
+    def __init__(self, stream, rate, channels, report_every_s=600):
+        self.stream = stream
+        self.rate = rate
+        self.channels = channels
+        self.resampler = Resampler(rate)
+        self.cpu_s = 0.0
+        self.audio_s = 0.0
+        self.report_every_s = report_every_s
+        self._next_report = report_every_s
+
+    def read(self, frames, exception_on_overflow=False):
+        native = self.stream.read(max(1, round(frames * self.rate / TARGET_RATE)),
+                                  exception_on_overflow=exception_on_overflow)
+        if not native:
+            return native
+        started = time.thread_time()
+        data = to_pcm16(self.resampler.process(to_mono(native, self.channels)))
+        self.cpu_s += time.thread_time() - started
+        self.audio_s += len(native) / 2 / self.channels / self.rate
+        if self.report_every_s and self.audio_s >= self._next_report:
+            self._next_report += self.report_every_s
+            print(f"Capture: {self.rate} Hz {self.channels} ch -> 16000 Hz mono, "
+                  f"{self.stats() * 1000:.2f} ms CPU per audio second")
+        return data
+
+    def stats(self):
+        """CPU seconds spent converting per second of audio captured."""
+        return self.cpu_s / self.audio_s if self.audio_s else 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+# --- DEVICE OPENING ---
+
+def device_format(p, index, max_channels=2):
+    """(native rate, channels, name) of an input device; index None means the default device."""
+    info = p.get_device_info_by_index(index) if index is not None else p.get_default_input_device_info()
+    channels = max(1, min(int(info.get("maxInputChannels", 1)), max_channels))
+    return int(info["defaultSampleRate"]), channels, info["name"]
+
+
+def open_stream(p, pa_format, index, chunk_frames, native=True, channels=None):
+    """Opens an input stream returning 16 kHz mono PCM. Returns (stream, description).
+
+    Tries the device's native format first, then 16 kHz mono on the same
+    device, so the chosen input is kept even where 16 kHz is not supported.
+    """
+    attempts = []
+    try:
+        rate, device_channels, name = device_format(p, index)
+        if native:
+            attempts.append((rate, channels or device_channels))
+    except (IOError, OSError, KeyError, ValueError):
+        name = "Default"
+    attempts.append((TARGET_RATE, 1))
+
+    error = None
+    for rate, ch in dict.fromkeys(attempts):
+        try:
+            stream = p.open(format=pa_format, channels=ch, rate=rate, input=True, input_device_index=index,
+                            frames_per_buffer=max(1, round(chunk_frames * rate / TARGET_RATE)))
+        except Exception as e:
+            error = e
+            continue
+        if rate == TARGET_RATE and ch == 1:
+            return stream, f"{name} (16000 Hz mono)"
+        return ConvertingStream(stream, rate, ch), f"{name} ({rate} Hz, {ch} ch -> 16000 Hz mono)"
+    raise error
+
+
+# --- BENCHMARK ---
+
+def benchmark(seconds, block_s):
+    rng = np.random.default_rng(1)
+    print(f"{seconds:g} s of audio per format, {block_s * 1000:.0f} ms blocks")
+    for rate, channels in ((48000, 2), (44100, 2), (48000, 1), (44100, 1), (32000, 1), (22050, 1)):
+        t = np.arange(int(seconds * rate)) / rate
+        # A 1 kHz tone that must survive, and an 11 kHz one (above the new 8 kHz Nyquist) that must not.
+        tone = 0.3 * np.sin(2 * np.pi * 1000 * t) + 0.02 * rng.standard_normal(len(t))
+        alias = 0.3 * np.sin(2 * np.pi * 11000 * t) if rate > 22000 else 0
+        frames = np.repeat((tone + alias)[:, None], channels, axis=1)
+        pcm = to_pcm16(frames.ravel())
+
+        resampler = Resampler(rate)
+        block = int(block_s * rate) * 2 * channels
+        out = []
+        started = time.process_time()
+        for offset in range(0, len(pcm), block):
+            out.append(resampler.process(to_mono(pcm[offset:offset + block], channels)))
+        cpu_s = time.process_time() - started
+        y = np.concatenate(out)
+
+        # Leakage of the 11 kHz tone: its alias lands at 5 kHz at 16 kHz.
+        spectrum = np.abs(np.fft.rfft(y * np.hanning(len(y))))
+        freqs = np.fft.rfftfreq(len(y), 1 / TARGET_RATE)
+        level = lambda f: spectrum[np.argmin(np.abs(freqs - f))]
+        rejection_db = 20 * np.log10(level(1000) / max(level(TARGET_RATE - 11000), 1e-12))
+        print(f"  {rate:>5} Hz {channels} ch: {cpu_s / seconds * 1000:6.2f} ms CPU per audio second, "
+              f"{len(y) / seconds:.0f} samples/s out, 11 kHz alias {rejection_db:.0f} dB below 1 kHz")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the capture conversion cost")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--block-ms", type=float, default=250, help="capture block length (balanced profile: 250)")
+    args = parser.parse_args()
+    benchmark(args.seconds, args.block_ms / 1000)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Merged busy intervals with fast free-slot queries, for calendar-agent.py.
+
+Event occurrences are sorted and merged into disjoint busy intervals
+(overlapping and back-to-back events become one). The gaps between them
+sit in a max segment tree, so "first free slot of at least N minutes
+between A and B" is two bisections plus one descent of the tree:
+O(log n) per query after the O(n log n) build.
+
+    freebusy.py --events 8000 --queries 20000   # benchmark on a dense calendar
+
+Times are plain numbers (epoch seconds), so the structure knows nothing
+about time zones or calendars.
+"""
+import argparse
+import random
+import time
+from bisect import bisect_left, bisect_right
+
+
+def merge(intervals):
+    """Sorted, disjoint (start, end) pairs covering the same time as `intervals`."""
+    merged = []
+    for start, end in sorted(i for i in intervals if i[1] > i[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+class MaxTree:
+    """Segment tree over a list of numbers answering "first index in [lo, hi] with value >= x"."""
+    def __init__(self, values):
+        self.n = len(values)
+        self.size = 1
+        while self.size < max(1, self.n):
+            self.size *= 2
+        self.tree = [float("-inf")] * (2 * self.size)
+        self.tree[self.size:self.size + self.n] = values
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def first_at_least(self, lo, hi, x):
+        if lo > hi or lo >= self.n:
+            return None
+        return self._descend(1, 0, self.size - 1, lo, min(hi, self.n - 1), x)
+
+    def _descend(self, node, node_lo, node_hi, lo, hi, x):
+        if node_hi < lo or node_lo > hi or self.tree[node] < x:
+            return None
+        if node_lo == node_hi:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self._descend(2 * node, node_lo, mid, lo, hi, x)
+        if found is None:
+            found = self._descend(2 * node + 1, mid + 1, node_hi, lo, hi, x)
+        return found
+
+
+class BusyIndex:
+    def __init__(self, intervals):
+        merged = merge(intervals)
+        self.starts = [s for s, _ in merged]
+        self.ends = [e for _, e in merged]
+        # gaps[k]: free time between busy interval k and k + 1.
+        self.gaps = MaxTree([self.starts[k + 1] - self.ends[k] for k in range(len(merged) - 1)])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _span(self, start, end):
+        """Indexes of the first and last busy intervals overlapping [start, end)."""
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end) - 1
+        return first, last
+
+    def busy(self, start, end):
+        """Busy intervals clipped to [start, end)."""
+        first, last = self._span(start, end)
+        return [(max(self.starts[k], start), min(self.ends[k], end)) for k in range(first, last + 1)]
+
+    def free(self, start, end):
+        """Free intervals in [start, end)."""
+        result = []
+        cursor = start
+        for busy_start, busy_end in self.busy(start, end):
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            result.append((cursor, end))
+        return result
+
+    def first_free(self, start, end, duration):
+        """Start of the first free slot of at least `duration` inside [start, end), or None."""
+        if end - start < duration:
+            return None
+        first, last = self._span(start, end)
+        if first > last:
+            return start  # nothing booked in the range
+        # Before the first busy interval.
+        if self.starts[first] - start >= duration:
+            return start
+        # Between busy intervals first..last (these gaps all lie inside the range).
+        k = self.gaps.first_at_least(first, last - 1, duration)
+        if k is not None:
+            return self.ends[k]
+        # After the last one.
+        if end - self.ends[last] >= duration:
+            return self.ends[last]
+        return None
+
+
+# --- BENCHMARK ---
+
+def dense_calendar(count, days, seed=1):
+    """`count` random meetings (15 min to 3 h, many overlapping) spread over `days` days."""
+    rng = random.Random(seed)
+    span = days * 86400
+    return [(start, start + rng.choice((15, 30, 30, 45, 60, 60, 90, 180)) * 60)
+            for start in (rng.randrange(0, span, 300) for _ in range(count))]
+
+
+def linear_first_free(merged, ends, start, end, duration):
+    """Reference answer: bisects to `start`, then walks the merged intervals one by one."""
+    cursor = start
+    for k in range(bisect_right(ends, start), len(merged)):
+        busy_start, busy_end = merged[k]
+        if busy_start >= end:
+            break
+        if busy_start - cursor >= duration:
+            return cursor
+        cursor = max(cursor, busy_end)
+    return cursor if end - cursor >= duration else None
+
+
+def benchmark(events, days, queries):
+    intervals = dense_calendar(events, days)
+    started = time.perf_counter()
+    index = BusyIndex(intervals)
+    build_s = time.perf_counter() - started
+    merged = list(zip(index.starts, index.ends))
+
+    rng = random.Random(2)
+    span = days * 86400
+    cases = []
+    for _ in range(queries):
+        start = rng.randrange(0, span)
+        cases.append((start, start + rng.choice((1, 7, 30)) * 86400, rng.choice((15, 30, 60, 120, 240)) * 60))
+
+    # Worst case for a scan: a slot longer than any gap, asked over the first half of the year.
+    longest = max(index.gaps.tree[1], 0)
+    worst = [(rng.randrange(0, 3600), span // 2, longest + 60) for _ in range(max(1, queries // 20))]
+
+    print(f"{events} events over {days} days -> {len(index)} busy intervals, built in {build_s * 1000:.1f} ms")
+    for name, batch in (("random", cases), ("no fit", worst)):
+        started = time.perf_counter()
+        fast = [index.first_free(*case) for case in batch]
+        fast_s = time.perf_counter() - started
+        started = time.perf_counter()
+        slow = [linear_first_free(merged, index.ends, *case) for case in batch]
+        slow_s = time.perf_counter() - started
+        if fast != slow:
+            raise SystemExit("BusyIndex disagrees with the linear scan")
+        print(f"first_free ({name}, {len(batch)} queries): {fast_s / len(batch) * 1e6:.1f} us indexed, "
+              f"{slow_s / len(batch) * 1e6:.1f} us linear scan, answers identical")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark free-slot queries on a synthetic dense calendar")
+    parser.add_argument("--events", type=int, default=8000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+    benchmark(args.events, args.days, args.queries)
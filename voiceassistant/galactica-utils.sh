@@ -9,12 +9,18 @@ else
     SETTINGS_FILE="$SCRIPT_DIR/galactica_settings.json"
 fi
 
-# Load Settings
-USER_NAME=$(python3 -c "import json; d=json.load(open('$SETTINGS_FILE')); print(d.get('user_name') or 'Bradly')")
-USER_RANK=$(python3 -c "import json; d=json.load(open('$SETTINGS_FILE')); print(d.get('user_rank') or 'Captain')")
-USER_SURNAME=$(python3 -c "import json; d=json.load(open('$SETTINGS_FILE')); print(d.get('user_surname') or 'User')")
-ASSISTANT_NAME=$(python3 -c "import json; d=json.load(open('$SETTINGS_FILE')); print(d.get('assistant_name') or 'Leo')")
-WEATHER_LOCATION=$(python3 -c "import json; d=json.load(open('$SETTINGS_FILE')); print(d.get('weather_location') or 'Cape Town')")
+# Load Settings (one interpreter start for all fields)
+eval "$(python3 -c "
+import json, shlex
+try:
+    d = json.load(open('$SETTINGS_FILE'))
+except Exception:
+    d = {}
+for var, key, default in [('USER_NAME', 'user_name', 'Bradly'), ('USER_RANK', 'user_rank', 'Captain'),
+                          ('USER_SURNAME', 'user_surname', 'User'), ('ASSISTANT_NAME', 'assistant_name', 'Leo'),
+                          ('WEATHER_LOCATION', 'weather_location', 'Cape Town')]:
+    print(var + '=' + shlex.quote(str(d.get(key) or default)))
+")"
 
 # Check what the user wants to do (passed as an argument)
 ACTION=$1
@@ -100,89 +106,9 @@ elif [ "$ACTION" == "play_playlist" ]; then
     else
         "$SCRIPT_DIR/ai-speak.sh" "Error. No playlist identifier provided."
     fi
-     
-elif [ "$ACTION" == "status_report" ]; then
-
-    # Get config
-    CONFIG_ITEMS=$(python3 -c "import json; 
-try:
-    d=json.load(open('$SETTINGS_FILE'))
-    print(' '.join(d.get('system_report_config', ['header', 'uptime', 'thermal', 'memory', 'disk', 'calendar', 'network'])))
-except:
-    print('header uptime thermal memory disk calendar network')
-")
-
-    REPORT=""
-
-    # 1. Header
-    if [[ " $CONFIG_ITEMS " =~ " header " ]]; then
-        SYSTEM_NAME=$(hostname)
-        REPORT="$SYSTEM_NAME Status Report. "
-    fi
-
-    # 2. Time
-    if [[ " $CONFIG_ITEMS " =~ " time " ]]; then
-        NOW=$(date +"%I:%M %p")
-        REPORT="$REPORT The time is $NOW. "
-    fi
-
-    # 3. Date
-    if [[ " $CONFIG_ITEMS " =~ " date " ]]; then
-        TODAY=$(date +"%A, %B %d")
-        REPORT="$REPORT Today is $TODAY. "
-    fi
-
-    # 4. Uptime
-    if [[ " $CONFIG_ITEMS " =~ " uptime " ]]; then
-        UPTIME=$(uptime -p | sed 's/up //')
-        REPORT="$REPORT System uptime is $UPTIME. "
-    fi
-    
-    # 5. Thermal
-    if [[ " $CONFIG_ITEMS " =~ " thermal " ]]; then
-        # Get CPU Temp (Targets 'Package id 0' or 'Core 0')
-        TEMP=$(sensors 2>/dev/null | grep -E "Package id 0|Core 0" | head -n 1 | awk '{print $4}' | tr -d '+°C' | cut -d'.' -f1)
-        # Fallback to sysfs if sensors is not installed
-        [ -z "$TEMP" ] && TEMP=$(cat /sys/class/thermal/thermal_zone0/temp 2>/dev/null | sed 's/.\{3\}$//')
-        [ -z "$TEMP" ] && TEMP="unknown"
-        REPORT="$REPORT Thermal core is at $TEMP degrees. "
-    fi
-
-    # 6. Memory
-    if [[ " $CONFIG_ITEMS " =~ " memory " ]]; then
-        RAM=$(free | grep Mem | awk '{printf "%.0f", $3/$2 * 100}')
-        REPORT="$REPORT Memory usage $RAM percent. "
-    fi
-
-    # 7. Disk
-    if [[ " $CONFIG_ITEMS " =~ " disk " ]]; then
-        DISK=$(df -h / | grep / | awk 'NR==1 || /^\// {print $5}' | tail -n 1 | tr -d '%')
-        REPORT="$REPORT Primary drive is $DISK percent full. "
-    fi
-
-    # 8. Calendar
-    if [[ " $CONFIG_ITEMS " =~ " calendar " ]]; then
-        # Check for binary first, then python script
-        if [ -f "$SCRIPT_DIR/calendar-agent" ]; then
-            CAL_TEXT=$("$SCRIPT_DIR/calendar-agent" report_today)
-        elif [ -f "$SCRIPT_DIR/calendar-agent.py" ]; then
-            CAL_TEXT=$(python3 "$SCRIPT_DIR/calendar-agent.py" report_today)
-        else
-            CAL_TEXT=""
-        fi
-        
-        if [ -n "$CAL_TEXT" ]; then
-            REPORT="$REPORT $CAL_TEXT"
-        fi
-    fi
-
-    # 9. Network
-    if [[ " $CONFIG_ITEMS " =~ " network " ]]; then
-        # Internet Latency (Ping Google DNS)
-        PING=$(ping -c 1 8.8.8.8 | grep 'time=' | awk -F'time=' '{print $2}' | cut -d' ' -f1 | cut -d'.' -f1)
-        if [ -z "$PING" ]; then PING_STATUS="offline"; else PING_STATUS="$PING milliseconds"; fi
-        REPORT="$REPORT Network latency is $PING_STATUS. "
-    fi
 
+elif [ "$ACTION" == "status_report" ]; then
+    # The same report as the built-in action (status_report.py), for commands run in a shell.
+    REPORT=$(python3 "$SCRIPT_DIR/status_report.py" "$SETTINGS_FILE" | tr '\n' ' ')
     "$SCRIPT_DIR/ai-speak.sh" "$REPORT"
 fi
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Bounded-memory reading of large iCalendar feeds.
+
+Feeds are downloaded to disk in chunks and read back one logical line at
+a time (folded lines are joined as they stream past), so only the
+component being read is ever held in memory. Events that cannot touch the
+query horizon are dropped before icalendar parses anything; recurrence
+masters (RRULE/RDATE) and overrides (RECURRENCE-ID) are always kept
+because they may produce occurrences inside it. Time zones are kept too.
+"""
+import datetime
+import os
+import re
+
+from icalendar import Calendar
+from icalendar.prop import vDuration
+
+CHUNK_SIZE = 64 * 1024
+HEADER = b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Galactica Voice//mxm.dk//\r\n"
+FOOTER = b"END:VCALENDAR\r\n"
+# Slack around the horizon: floating and zoned times are compared as naive local times.
+MARGIN = datetime.timedelta(days=1)
+WANTED = ("VEVENT", "VTIMEZONE")
+
+
+def download(session, url, path, timeout, chunk_size=CHUNK_SIZE):
+    """Streams an HTTP response body into `path`."""
+    with session.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+
+
+def unfold(raw_lines):
+    """Physical lines (bytes) -> logical content lines (str), joining RFC 5545 folds."""
+    parts = None
+    for raw in raw_lines:
+        line = raw.rstrip(b"\r\n")
+        if parts is not None and line[:1] in (b" ", b"\t"):
+            parts.append(line[1:])
+            continue
+        if parts is not None:
+            yield b"".join(parts).decode("utf-8", "replace")
+        parts = [line] if line else None
+    if parts is not None:
+        yield b"".join(parts).decode("utf-8", "replace")
+
+
+def components(lines, wanted=WANTED):
+    """Top-level components of one or more VCALENDARs as (name, [lines]), one at a time."""
+    depth = 0
+    name, buf = None, None
+    for line in lines:
+        key = line[:6].upper()
+        if key == "BEGIN:":
+            if line[6:].strip().upper() == "VCALENDAR":
+                depth = 1
+                continue
+            depth += 1
+            if depth == 2:
+                name = line[6:].strip().upper()
+                buf = [] if name in wanted else None
+        if buf is not None:
+            buf.append(line)
+        if key[:4] == "END:" and depth:
+            if line[4:].strip().upper() == "VCALENDAR":
+                depth = 0
+                continue
+            depth -= 1
+            if depth == 1 and buf is not None:
+                yield name, buf
+                buf = None
+
+
+def prop(lines, name):
+    """(params, value) of the first property `name` in a component's own lines, or None."""
+    prefix = name.upper()
+    for line in lines[1:]:
+        if line.startswith("BEGIN:"):
+            break  # nested VALARM etc.
+        upper = line[:len(prefix) + 1].upper()
+        if upper in (prefix + ":", prefix + ";"):
+            head, _, value = line.partition(":")
+            # A quoted parameter value may contain ':'.
+            while head.count('"') % 2 and value:
+                extra, _, value = value.partition(":")
+                head += ":" + extra
+            return head[len(prefix) + 1:], value.strip()
+    return None
+
+
+def parse_when(value):
+    """DATE or DATE-TIME text -> naive datetime (UTC 'Z' and TZID are ignored; see MARGIN)."""
+    match = re.match(r"(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})(\d{2})?)?", value or "")
+    if not match:
+        return None
+    y, m, d, hh, mm, ss = match.groups()
+    try:
+        return datetime.datetime(int(y), int(m), int(d), int(hh or 0), int(mm or 0), int(ss or 0))
+    except ValueError:
+        return None
+
+
+def in_horizon(lines, start, end):
+    """Whether a VEVENT may have an occurrence in [start, end] (naive local datetimes)."""
+    for line in lines:
+        upper = line[:14].upper()
+        if upper.startswith(("RRULE", "RDATE", "RECURRENCE-ID")):
+            return True
+    dtstart = prop(lines, "DTSTART")
+    first = parse_when(dtstart[1]) if dtstart else None
+    if first is None:
+        return True
+    dtend = prop(lines, "DTEND")
+    last = parse_when(dtend[1]) if dtend else None
+    if last is None:
+        duration = prop(lines, "DURATION")
+        try:
+            last = first + vDuration.from_ical(duration[1]) if duration else first
+        except Exception:
+            last = first + MARGIN
+    return first <= end + MARGIN and last >= start - MARGIN
+
+
+def _naive(moment):
+    if moment is None:
+        return None
+    if not isinstance(moment, datetime.datetime):
+        return datetime.datetime.combine(moment, datetime.time.min)
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def serialize(lines):
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def merge(paths, dest):
+    """Concatenates the events and (de-duplicated) time zones of several feeds into one file."""
+    tmp_path = dest + ".part"
+    seen_timezones = set()
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER)
+        for path in paths:
+            with open(path, "rb") as f:
+                for name, lines in components(unfold(f)):
+                    if name == "VTIMEZONE":
+                        tzid = prop(lines, "TZID")
+                        tzid = tzid[1] if tzid else None
+                        if tzid in seen_timezones:
+                            continue
+                        seen_timezones.add(tzid)
+                    out.write(serialize(lines))
+        out.write(FOOTER)
+    os.replace(tmp_path, dest)
+
+
+def load(path, start=None, end=None):
+    """Calendar with the time zones and the events of `path` that may fall in [start, end].
+
+    Returns (calendar, kept, dropped). Without a horizon every event is kept.
+    """
+    start, end = _naive(start), _naive(end)
+    kept = dropped = 0
+    pieces = [HEADER]
+    with open(path, "rb") as f:
+        for name, lines in components(unfold(f)):
+            if name == "VEVENT" and start is not None and end is not None and not in_horizon(lines, start, end):
+                dropped += 1
+                continue
+            if name == "VEVENT":
+                kept += 1
+            pieces.append(serialize(lines))
+    pieces.append(FOOTER)
+    return Calendar.from_ical(b"".join(pieces)), kept, dropped
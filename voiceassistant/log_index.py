@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Full-text index over captain's log transcripts.
+
+Transcripts are the .txt files written next to each log_YYYY-MM-DD_HH-MM.wav
+in logs_dir. They are indexed in an SQLite FTS5 table as they are written
+(add() costs only the new text); sync() picks up transcripts the index has
+not seen, comparing size and mtime only, so unchanged files are never
+re-read. Searches are ranked by relevance (bm25), newest first on ties.
+
+    log_index.py sync
+    log_index.py search warp core
+    log_index.py search "warp core" --limit 5 --json
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+DB_NAME = "captains-log-index.db"
+NAME_PATTERN = re.compile(r"log_(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    recorded_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts USING fts5(text, tokenize='porter unicode61');
+CREATE INDEX IF NOT EXISTS logs_recorded_at ON logs (recorded_at);
+"""
+
+
+def recorded_at(path):
+    """Recording start from the file name, else the file's mtime (ISO, minutes)."""
+    match = NAME_PATTERN.search(os.path.basename(path))
+    if match:
+        day, hour, minute = match.groups()
+        return f"{day}T{hour}:{minute}"
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%dT%H:%M")
+
+
+def fts_query(text, any_word=False):
+    """Spoken words -> an FTS5 query; every word is quoted so nothing is read as syntax."""
+    words = re.findall(r"[\w']+", text.lower())
+    return (" OR " if any_word else " ").join('"' + w.replace('"', '') + '"' for w in words)
+
+
+class LogIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, txt_path):
+        """Indexes (or re-indexes) one transcript. Returns True if the index changed."""
+        path = os.path.abspath(txt_path)
+        try:
+            stat = os.stat(path)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError as e:
+            print(f"Log index: cannot read {path}: {e}")
+            return False
+        with self._lock, self.db:
+            row = self.db.execute("SELECT id, size, mtime FROM logs WHERE path = ?", (path,)).fetchone()
+            if row and (row[1], row[2]) == (stat.st_size, stat.st_mtime):
+                return False
+            if row:
+                self.db.execute("UPDATE logs SET recorded_at = ?, size = ?, mtime = ? WHERE id = ?",
+                                (recorded_at(path), stat.st_size, stat.st_mtime, row[0]))
+                self.db.execute("UPDATE transcripts SET text = ? WHERE rowid = ?", (text, row[0]))
+            else:
+                cur = self.db.execute("INSERT INTO logs (path, recorded_at, size, mtime) VALUES (?, ?, ?, ?)",
+                                      (path, recorded_at(path), stat.st_size, stat.st_mtime))
+                self.db.execute("INSERT INTO transcripts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+        return True
+
+    def remove(self, path):
+        with self._lock, self.db:
+            row = self.db.execute("SELECT id FROM logs WHERE path = ?", (path,)).fetchone()
+            if row:
+                self.db.execute("DELETE FROM transcripts WHERE rowid = ?", (row[0],))
+                self.db.execute("DELETE FROM logs WHERE id = ?", (row[0],))
+
+    def sync(self, logs_dir):
+        """Indexes new or changed transcripts in logs_dir and forgets deleted ones.
+
+        Returns (added, removed).
+        """
+        logs_dir = os.path.abspath(logs_dir)
+        with self._lock:
+            known = {path: (size, mtime) for path, size, mtime in
+                     self.db.execute("SELECT path, size, mtime FROM logs WHERE path LIKE ?",
+                                     (os.path.join(logs_dir, "%"),))}
+        added = 0
+        seen = set()
+        if os.path.isdir(logs_dir):
+            for entry in os.scandir(logs_dir):
+                if not entry.name.endswith(".txt") or not entry.is_file():
+                    continue
+                seen.add(entry.path)
+                stat = entry.stat()
+                if known.get(entry.path) != (stat.st_size, stat.st_mtime) and self.add(entry.path):
+                    added += 1
+        removed = [path for path in known if os.path.dirname(path) == logs_dir and path not in seen]
+        for path in removed:
+            self.remove(path)
+        return added, len(removed)
+
+    def search(self, query, limit=5):
+        """[{"path", "recorded_at", "snippet", "score"}], best first.
+
+        All words must match; if nothing does, any word may.
+        """
+        for any_word in (False, True):
+            match = fts_query(query, any_word)
+            if not match:
+                return []
+            with self._lock:
+                rows = self.db.execute(
+                    "SELECT logs.path, logs.recorded_at, "
+                    "snippet(transcripts, 0, '', '', '...', 12), bm25(transcripts) AS score "
+                    "FROM transcripts JOIN logs ON logs.id = transcripts.rowid "
+                    "WHERE transcripts MATCH ? ORDER BY score, logs.recorded_at DESC LIMIT ?",
+                    (match, limit)).fetchall()
+            if rows:
+                return [{"path": p, "recorded_at": at, "snippet": snip, "score": score}
+                        for p, at, snip, score in rows]
+        return []
+
+    def count(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+
+def spoken_date(iso):
+    at = datetime.datetime.strptime(iso, "%Y-%m-%dT%H:%M")
+    return f"{at.strftime('%A')} {at.strftime('%B')} {at.day} at {at.strftime('%H:%M')}"
+
+
+def describe(results, query):
+    """A short spoken answer for a voice search."""
+    if not results:
+        return f"No logs found about {query}."
+    best = results[0]
+    others = len(results) - 1
+    text = f"Best match: the log from {spoken_date(best['recorded_at'])}. {best['snippet']}"
+    if others:
+        text += f" {others} more {'log mentions' if others == 1 else 'logs mention'} it."
+    return text
+
+
+def default_paths():
+    """Index and logs_dir for the CLI, resolved like calendar-agent.py does."""
+    user_dir = os.environ.get("LCARS_WORKSPACE") or os.path.expanduser("~/.config/lcars-terminal")
+    settings_path = os.environ.get("LCARS_SETTINGS_PATH") or os.path.join(user_dir, "galactica_settings.json")
+    try:
+        with open(settings_path) as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    logs_dir = os.path.expanduser(settings.get("logs_dir", "~/Documents/CaptainsLogs"))
+    return os.path.join(user_dir, DB_NAME), logs_dir
+
+
+if __name__ == "__main__":
+    db_default, logs_default = default_paths()
+    parser = argparse.ArgumentParser(description="Search captain's log transcripts")
+    parser.add_argument("--db", default=db_default, help=f"index file (default: {db_default})")
+    parser.add_argument("--logs-dir", default=logs_default, help=f"transcript directory (default: {logs_default})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="index new and changed transcripts")
+    search_parser = sub.add_parser("search", help="search transcripts")
+    search_parser.add_argument("query", nargs="+")
+    search_parser.add_argument("--limit", type=int, default=10)
+    search_parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    index = LogIndex(args.db)
+    added, removed = index.sync(args.logs_dir)
+    if args.command == "sync":
+        print(f"Indexed {added} new or changed transcripts, removed {removed}; {index.count()} in total")
+        sys.exit(0)
+
+    results = index.search(" ".join(args.query), args.limit)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif not results:
+        print("No matching logs")
+    for r in [] if args.json else results:
+        print(f"{r['recorded_at'].replace('T', ' ')}  {r['path']}")
+        print(f"    {r['snippet']}")
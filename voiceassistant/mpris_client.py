@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""In-process MPRIS media control over a single D-Bus connection.
+
+Replaces the playerctl subprocess calls in voice-command.py. Player
+appearance and playback status are tracked from D-Bus signals, so the
+current state is already known when a voice command arrives.
+"""
+import threading
+import time
+from queue import Queue
+
+try:
+    from jeepney import DBusAddress, MatchRule, Properties, message_bus, new_method_call
+    from jeepney.io.threading import DBusRouter, Proxy, open_dbus_connection
+    from jeepney.low_level import HeaderFields
+    from jeepney.wrappers import unwrap_msg
+except ImportError:
+    DBusRouter = None
+
+MPRIS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+PLAYER_IFACE = "org.mpris.MediaPlayer2.Player"
+
+
+def short_name(bus_name):
+    """org.mpris.MediaPlayer2.spotify -> spotify (same naming as playerctl -l)."""
+    return bus_name[len(MPRIS_PREFIX):]
+
+
+class MprisClient:
+    def __init__(self, timeout=2.0):
+        self.timeout = timeout
+        self.router = DBusRouter(open_dbus_connection(bus="SESSION"))
+        self.bus = Proxy(message_bus, self.router, timeout=timeout)
+
+        self._cond = threading.Condition()
+        self._owners = {}   # bus name -> unique connection name
+        self._status = {}   # bus name -> PlaybackStatus ("Playing", "Paused", "Stopped")
+        self._signals = Queue()
+
+        # Subscribe before the initial scan so no player can slip in between.
+        owner_rule = MatchRule(type="signal", sender="org.freedesktop.DBus",
+                               interface="org.freedesktop.DBus", member="NameOwnerChanged",
+                               path="/org/freedesktop/DBus")
+        owner_rule.add_arg_condition(0, "org.mpris.MediaPlayer2", kind="namespace")
+
+        props_rule = MatchRule(type="signal", interface="org.freedesktop.DBus.Properties",
+                               member="PropertiesChanged", path=MPRIS_PATH)
+        props_rule.add_arg_condition(0, PLAYER_IFACE)
+
+        self._filters = []
+        for rule in (owner_rule, props_rule):
+            self._filters.append(self.router.filter(rule, queue=self._signals))
+            self.bus.AddMatch(rule)
+
+        for name in self.bus.ListNames()[0]:
+            if name.startswith(MPRIS_PREFIX):
+                try:
+                    self._add_player(name, self.bus.GetNameOwner(name)[0])
+                except Exception as e:
+                    print(f"MPRIS: could not query {name}: {e}")
+
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    # --- STATE TRACKING ---
+
+    def _player_address(self, bus_name):
+        return DBusAddress(MPRIS_PATH, bus_name=bus_name, interface=PLAYER_IFACE)
+
+    def _add_player(self, bus_name, owner):
+        status = "Stopped"
+        try:
+            reply = self.router.send_and_get_reply(
+                Properties(self._player_address(bus_name)).get("PlaybackStatus"),
+                timeout=self.timeout)
+            status = unwrap_msg(reply)[0][1]
+        except Exception as e:
+            print(f"MPRIS: no PlaybackStatus from {bus_name}: {e}")
+
+        with self._cond:
+            self._owners[bus_name] = owner
+            self._status[bus_name] = status
+            self._cond.notify_all()
+
+    def _remove_player(self, bus_name):
+        with self._cond:
+            self._owners.pop(bus_name, None)
+            self._status.pop(bus_name, None)
+            self._cond.notify_all()
+
+    def _watch(self):
+        while True:
+            msg = self._signals.get()
+            if msg is None:
+                return
+            try:
+                if msg.header.fields.get(HeaderFields.member) == "NameOwnerChanged":
+                    name, _old_owner, new_owner = msg.body
+                    if not name.startswith(MPRIS_PREFIX):
+                        continue
+                    if new_owner:
+                        self._add_player(name, new_owner)
+                    else:
+                        self._remove_player(name)
+                else:
+                    _iface, changed, _invalidated = msg.body
+                    if "PlaybackStatus" not in changed:
+                        continue
+                    sender = msg.header.fields.get(HeaderFields.sender)
+                    with self._cond:
+                        for name, owner in self._owners.items():
+                            if owner == sender:
+                                self._status[name] = changed["PlaybackStatus"][1]
+                        self._cond.notify_all()
+            except Exception as e:
+                print(f"MPRIS: error handling signal: {e}")
+
+    # --- QUERIES ---
+
+    def players(self):
+        with self._cond:
+            return list(self._owners)
+
+    def status(self, bus_name):
+        with self._cond:
+            return self._status.get(bus_name)
+
+    def playing(self):
+        with self._cond:
+            return [name for name, status in self._status.items() if status == "Playing"]
+
+    def find(self, name):
+        """Bus names of running players whose name contains `name` (e.g. 'spotify')."""
+        name = name.lower()
+        return [bus for bus in self.players() if name in short_name(bus).lower()]
+
+    def wait_for_player(self, name, timeout=15.0):
+        """Block until a player matching `name` owns its bus name. Returns it, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                found = [bus for bus in self._owners if name.lower() in short_name(bus).lower()]
+                if found:
+                    return found[0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    # --- COMMANDS ---
+
+    def _call(self, bus_name, method, signature=None, body=()):
+        msg = new_method_call(self._player_address(bus_name), method, signature, body)
+        reply = self.router.send_and_get_reply(msg, timeout=self.timeout)
+        return unwrap_msg(reply)
+
+    def play(self, bus_name):
+        self._call(bus_name, "Play")
+
+    def pause(self, bus_name):
+        self._call(bus_name, "Pause")
+
+    def next(self, bus_name):
+        self._call(bus_name, "Next")
+
+    def open_uri(self, bus_name, uri):
+        self._call(bus_name, "OpenUri", "s", (uri,))
+
+    def pause_all(self):
+        for bus_name in self.players():
+            try:
+                self.pause(bus_name)
+            except Exception as e:
+                print(f"MPRIS: pause failed for {bus_name}: {e}")
+
+    def close(self):
+        self._signals.put(None)
+        for handle in self._filters:
+            handle.close()
+        self.router.close()
+        self.router.conn.close()
+
+
+def connect(timeout=2.0):
+    """Returns a connected MprisClient, or None if D-Bus is unavailable."""
+    if DBusRouter is None:
+        print("MPRIS: jeepney not installed, falling back to playerctl")
+        return None
+    try:
+        return MprisClient(timeout)
+    except Exception as e:
+        print(f"MPRIS: session bus unavailable ({e}), falling back to playerctl")
+        return None
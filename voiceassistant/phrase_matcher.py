@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Fuzzy matching of recognised text against the commands.json phrases.
+
+Used when no phrase is an exact substring of what Vosk heard, e.g.
+"leo lock work station" for "{assistant_name} lock workstation".
+
+Every phrase is expanded with each assistant name and indexed by its
+words, a crude phonetic key per word and character trigrams, so a lookup
+only scores phrases that share something with the utterance. Candidates
+are scored by a word-level alignment against the utterance (substitutions
+cost by spelling distance, and one word may stand in for two), optionally
+weighted by Vosk's per-word confidence. Scoring stops at a fixed time
+budget and returns the best candidate so far.
+"""
+import re
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+PHONETIC_MAP = str.maketrans("ckqzdbvgj", "kkkstpfkk")
+# Keys shorter than this (e.g. "say", "hi" and "sayhi" all reduce to one
+# letter) say too little about the sound to earn the phonetic discount.
+MIN_PHONETIC_KEY = 2
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(word):
+    """First letter plus consonant skeleton with look-alike sounds merged."""
+    word = word.replace("ph", "f").replace("'", "")
+    if not word:
+        return ""
+    rest = re.sub(r"[aeiouyhw]", "", word[1:].translate(PHONETIC_MAP))
+    rest = re.sub(r"(.)\1+", r"\1", rest)
+    return word[0].translate(PHONETIC_MAP) + rest
+
+
+def trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_keys(tokens):
+    keys = set()
+    for token in tokens:
+        keys.add(token)
+        keys.add("~" + phonetic_key(token))
+        keys.update("#" + t for t in trigrams(token))
+    return keys
+
+
+def levenshtein(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+@lru_cache(maxsize=65536)
+def word_distance(a, b):
+    """0.0 for identical words, 1.0 for nothing in common."""
+    if a == b:
+        return 0.0
+    spelling = levenshtein(a, b) / max(len(a), len(b))
+    # Words that sound alike are cheaper than their spelling suggests.
+    key = phonetic_key(a)
+    if len(key) >= MIN_PHONETIC_KEY and key == phonetic_key(b):
+        spelling *= 0.5
+    return min(spelling, 1.0)
+
+
+def align_cost(phrase, words, weights):
+    """Cheapest alignment of all phrase words onto a contiguous run of utterance words."""
+    m, n = len(phrase), len(words)
+    inf = float("inf")
+    # cost[i][j]: phrase[:i] aligned, ending just before words[j]; the run may start anywhere.
+    cost = [[0.0] * (n + 1)] + [[inf] * (n + 1) for _ in range(m)]
+    for i in range(1, m + 1):
+        for j in range(n + 1):
+            best = cost[i - 1][j] + 1.0                                   # phrase word missing
+            if j:
+                w = weights[j - 1]
+                best = min(best,
+                           cost[i - 1][j - 1] + w * word_distance(phrase[i - 1], words[j - 1]),
+                           cost[i][j - 1] + w if i < m else inf)          # extra word inside the run
+                if j >= 2:                                                # "work station" ~ "workstation"
+                    joined = words[j - 2] + words[j - 1]
+                    best = min(best, cost[i - 1][j - 2] + w * word_distance(phrase[i - 1], joined))
+            if i >= 2 and j:                                              # "lights off" ~ "lightsoff"
+                # Charged per phrase word consumed, so a merge cannot swallow a word cheaply.
+                joined = phrase[i - 2] + phrase[i - 1]
+                best = min(best, cost[i - 2][j - 1] + 2 * weights[j - 1] * word_distance(joined, words[j - 1]))
+            cost[i][j] = best
+    return min(cost[m])
+
+
+class PhraseMatcher:
+    def __init__(self, phrases, names, threshold=0.85, budget_ms=20, max_candidates=50):
+        """`phrases` are commands.json keys; `names` the assistant name and its phonetic alternatives."""
+        self.threshold = threshold
+        self.budget = budget_ms / 1000.0
+        self.max_candidates = max_candidates
+        self.entries = []                 # (phrase, tokens)
+        self.postings = defaultdict(list)
+        for phrase in phrases:
+            for name in names:
+                tokens = tokenize(phrase.replace("{assistant_name}", name))
+                if not tokens:
+                    continue
+                entry_id = len(self.entries)
+                self.entries.append((phrase, tokens))
+                for key in index_keys(tokens):
+                    self.postings[key].append(entry_id)
+
+    def candidates(self, tokens):
+        hits = Counter()
+        for key in index_keys(tokens):
+            for entry_id in self.postings.get(key, ()):
+                hits[entry_id] += 1
+        return [entry_id for entry_id, _ in hits.most_common(self.max_candidates)]
+
+    def match(self, text, words=None):
+        """Best (phrase, score) at or above the threshold, or None.
+
+        `words` is Vosk's word list ([{"word": ..., "conf": ...}], from
+        SetWords(True)); a low-confidence word costs less to be wrong.
+        """
+        deadline = time.monotonic() + self.budget
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        weights = [1.0] * len(tokens)
+        if words and [tokenize(w.get("word", "")) for w in words] == [[t] for t in tokens]:
+            weights = [0.5 + 0.5 * float(w.get("conf", 1.0)) for w in words]
+
+        best = None
+        for entry_id in self.candidates(tokens):
+            if time.monotonic() > deadline:
+                break
+            phrase, phrase_tokens = self.entries[entry_id]
+            score = 1.0 - align_cost(phrase_tokens, tokens, weights) / len(phrase_tokens)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (phrase, score)
+                if score >= 1.0:
+                    break
+        return best
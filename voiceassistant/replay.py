@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Offline replay benchmark for the recognition and dispatch path.
+
+Used by `voice-command.py --replay DIR`. Every 16-bit WAV in DIR
+(converted to 16 kHz mono if needed) is fed through a fresh Vosk
+recognizer in capture-sized chunks by the same chunk handler as the live
+microphone loop (final and, if enabled, early partial-result dispatch),
+with TTS, sound effects and commands stubbed out.
+
+The optional manifest is a JSON object mapping WAV file names to the label
+that should fire: a commands.json phrase such as
+"{assistant_name} status report", a built-in label such as "music:pause",
+or null when nothing should match.
+"""
+import json
+import os
+import time
+import wave
+
+from tracing import percentile
+
+SAMPLE_RATE = 16000
+
+
+def read_wav(path):
+    """Returns raw 16-bit mono PCM at 16 kHz, or raises ValueError.
+
+    16-bit recordings at other rates or channel counts are converted the
+    same way as live native-rate capture (capture.py, needs numpy).
+    """
+    with wave.open(path, "rb") as wf:
+        rate, channels = wf.getframerate(), wf.getnchannels()
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{os.path.basename(path)}: expected 16-bit, got {wf.getsampwidth() * 8}-bit")
+        pcm = wf.readframes(wf.getnframes())
+    if rate == SAMPLE_RATE and channels == 1:
+        return pcm
+    try:
+        import capture
+    except ImportError:
+        raise ValueError(f"{os.path.basename(path)}: {rate} Hz, {channels} ch needs numpy to convert to 16 kHz mono")
+    return capture.convert(pcm, rate, channels)
+
+
+def load_manifest(path):
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def replay_file(path, feed, chunk_frames):
+    """Feeds one WAV through a recognizer session. Returns a per-utterance result dict.
+
+    `feed(data, heard_at, flush=False)` is the live loop's chunk handler and
+    returns the label of whatever it dispatched.
+    """
+    pcm = read_wav(path)
+    chunk_bytes = chunk_frames * 2
+    audio_seconds = len(pcm) / 2 / SAMPLE_RATE
+
+    process_s = 0.0
+    cpu_start = time.process_time()
+    matched = None
+    latency_ms = None
+    dispatched_at = None
+
+    offsets = list(range(0, len(pcm), chunk_bytes))
+    # The final flush stands in for end-of-utterance silence.
+    for offset in offsets + [None]:
+        heard_at = time.monotonic()
+        if offset is None:
+            label = feed(b"", heard_at, flush=True)
+        else:
+            label = feed(pcm[offset:offset + chunk_bytes], heard_at)
+        done = time.monotonic()
+        process_s += done - heard_at
+        if label and matched is None:
+            matched = label
+            latency_ms = (done - heard_at) * 1000
+            # How much of the recording had been heard when the command fired.
+            heard_bytes = len(pcm) if offset is None else min(len(pcm), offset + chunk_bytes)
+            dispatched_at = heard_bytes / 2 / SAMPLE_RATE
+
+    return {
+        "file": os.path.basename(path),
+        "audio_s": round(audio_seconds, 3),
+        "process_s": round(process_s, 4),
+        "cpu_s": round(time.process_time() - cpu_start, 4),
+        "matched": matched,
+        "latency_ms": round(latency_ms, 2) if latency_ms is not None else None,
+        "dispatched_at_s": round(dispatched_at, 3) if dispatched_at is not None else None,
+    }
+
+
+def run(directory, new_session, reset_state, manifest=None, chunk_frames=4000, verbose=True):
+    """`new_session()` returns a fresh chunk handler (new recognizer) per file."""
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(".wav"))
+    if manifest is not None:
+        missing = [f for f in manifest if f not in files]
+        if missing:
+            print(f"REPLAY: manifest lists {len(missing)} missing file(s): {', '.join(missing[:5])}")
+        files = [f for f in files if f in manifest]
+
+    results = []
+    wall_start = time.monotonic()
+    cpu_start = time.process_time()
+    for name in files:
+        reset_state()
+        try:
+            result = replay_file(os.path.join(directory, name), new_session(), chunk_frames)
+        except ValueError as e:
+            print(f"REPLAY: skipping {e}")
+            continue
+        if manifest is not None:
+            result["expected"] = manifest[name]
+            result["correct"] = result["matched"] == manifest[name]
+        results.append(result)
+        if verbose:
+            print(f"REPLAY: {name} -> {result['matched']}"
+                  + ("" if manifest is None else (" OK" if result["correct"] else f" (expected {manifest[name]})")))
+
+    return summarize(results, time.monotonic() - wall_start, time.process_time() - cpu_start)
+
+
+def summarize(results, wall_s, cpu_s):
+    audio_s = sum(r["audio_s"] for r in results)
+    process_s = sum(r["process_s"] for r in results)
+    latencies = [r["latency_ms"] for r in results if r["latency_ms"] is not None]
+    tails = [r["audio_s"] - r["dispatched_at_s"] for r in results if r["dispatched_at_s"] is not None]
+    labelled = [r for r in results if "correct" in r]
+
+    summary = {
+        "files": len(results),
+        "audio_s": round(audio_s, 2),
+        "wall_s": round(wall_s, 3),
+        "real_time_factor": round(process_s / audio_s, 4) if audio_s else None,
+        "cpu_ms_per_audio_s": round(cpu_s * 1000 / audio_s, 2) if audio_s else None,
+        "latency_ms_p50": round(percentile(latencies, 50), 2) if latencies else None,
+        "latency_ms_p95": round(percentile(latencies, 95), 2) if latencies else None,
+        "dispatch_before_end_s_p50": round(percentile(tails, 50), 3) if tails else None,
+        "accuracy": round(sum(r["correct"] for r in labelled) / len(labelled), 4) if labelled else None,
+        "results": results,
+    }
+    return summary
+
+
+def print_summary(summary):
+    print(f"REPLAY SUMMARY: {summary['files']} files, {summary['audio_s']} s of audio in {summary['wall_s']} s")
+    print(f"  real-time factor:      {summary['real_time_factor']}")
+    print(f"  CPU per audio second:  {summary['cpu_ms_per_audio_s']} ms")
+    print(f"  dispatch latency:      p50 {summary['latency_ms_p50']} ms, p95 {summary['latency_ms_p95']} ms")
+    print(f"  dispatched before end: p50 {summary['dispatch_before_end_s_p50']} s of audio")
+    if summary["accuracy"] is not None:
+        print(f"  match accuracy:        {summary['accuracy'] * 100:.1f}%")
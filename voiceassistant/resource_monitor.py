@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Resource sampling and profiling hooks for the long-running voice process.
+
+Monitor records resident memory, CPU, thread count and open file
+descriptors every `interval_s` seconds to a JSONL file (read from /proc, so
+no extra dependency). With `tracemalloc_top` set, each sample also lists
+the source lines whose allocations grew most since monitoring started.
+
+Signals, for a process that is already running:
+
+    kill -USR1 <pid>   take a sample now (with allocation growth if enabled)
+    kill -USR2 <pid>   start / stop the sampling profiler
+
+The profiler walks every thread's stack about 100 times a second and, when
+stopped, writes the counts in folded-stack format (one
+"thread;outer;...;inner count" line per distinct stack). flamegraph.pl
+and speedscope read this format directly.
+
+Run this module on a samples file for a summary:
+
+    python3 resource_monitor.py ~/.config/lcars-terminal/voice-resources.jsonl
+"""
+import collections
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+MAX_FILE_BYTES = 5 * 1024 * 1024
+
+
+def proc_status():
+    """{field: value} from /proc/self/status (VmRSS, Threads, ...); {} off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            return dict(line.rstrip("\n").split(":\t", 1) for line in f if ":\t" in line)
+    except OSError:
+        return {}
+
+
+def sample():
+    """One snapshot: {"ts", "pid", "rss_mb", "cpu_s", "threads", "fds"}."""
+    status = proc_status()
+    rss_kb = int(status.get("VmRSS", "0 kB").split()[0])
+    times = os.times()
+    try:
+        fds = len(os.listdir("/proc/self/fd")) - 1  # minus the one listdir itself opened
+    except OSError:
+        fds = None
+    return {
+        "ts": round(time.time(), 3),
+        "pid": os.getpid(),
+        "rss_mb": round(rss_kb / 1024, 2),
+        "cpu_s": round(times.user + times.system, 3),
+        "threads": int(status.get("Threads", threading.active_count())),
+        "fds": fds,
+    }
+
+
+class Monitor:
+    def __init__(self, path=None, interval_s=300, tracemalloc_top=0, quiet=False):
+        self.path = path
+        self.interval_s = interval_s
+        self.tracemalloc_top = tracemalloc_top
+        self.quiet = quiet
+        self.first = None
+        self._last = None
+        self._baseline = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def start(self):
+        if self.tracemalloc_top:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._baseline = tracemalloc.take_snapshot()
+        self.record()
+        if self.interval_s:
+            threading.Thread(target=self._run, name="resource-monitor", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.record()
+
+    def top_allocations(self):
+        """Source lines whose live allocations grew most since start()."""
+        if not self._baseline or not tracemalloc.is_tracing():
+            return []
+        diff = tracemalloc.take_snapshot().compare_to(self._baseline, "lineno")
+        return [{"where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+                for stat in diff[:self.tracemalloc_top]]
+
+    def record(self):
+        """Takes, logs and stores one sample; returns it."""
+        current = sample()
+        with self._lock:
+            if self._last and current["ts"] > self._last["ts"]:
+                current["cpu_pct"] = round(100 * (current["cpu_s"] - self._last["cpu_s"])
+                                           / (current["ts"] - self._last["ts"]), 2)
+            self._last = current
+            if self.first is None:
+                self.first = current
+        top = self.top_allocations()
+        if top:
+            current["top"] = top
+        if not self.quiet:
+            print(f"RESOURCES: rss {current['rss_mb']:.1f} MB "
+                  f"({current['rss_mb'] - self.first['rss_mb']:+.1f} since start), "
+                  f"cpu {current.get('cpu_pct', 0):.1f}%, {current['threads']} threads, {current['fds']} fds")
+            for entry in top[:5]:
+                print(f"    {entry['size_kb']:+.1f} kB ({entry['count']:+d} blocks) {entry['where']}")
+        if self.path:
+            self._write(current)
+        return current
+
+    def _write(self, record):
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > MAX_FILE_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Resource monitor: cannot write {self.path}: {e}")
+
+
+# --- SAMPLING PROFILER ---
+
+class SamplingProfiler:
+    def __init__(self, out_dir, interval_s=0.01):
+        self.out_dir = out_dir
+        self.interval_s = interval_s
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._thread = None
+        self._running = threading.Event()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def toggle(self):
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+    def start(self):
+        self.counts.clear()
+        self.samples = 0
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        print(f"PROFILER: sampling every {self.interval_s * 1000:.0f} ms (send SIGUSR2 again to stop)")
+
+    def _run(self):
+        me = threading.get_ident()
+        while self._running.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval_s)
+
+    def stop(self):
+        """Stops sampling and writes the folded stacks. Returns the file path."""
+        self._running.clear()
+        if self._thread:
+            self._thread.join()
+        path = os.path.join(self.out_dir, f"voice-profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.folded")
+        try:
+            with open(path, "w") as f:
+                for stack, count in self.counts.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"PROFILER: cannot write {path}: {e}")
+            return None
+        print(f"PROFILER: {self.samples} samples written to {path}")
+        for function, count in self.hottest(5):
+            print(f"    {100 * count / max(1, sum(self.counts.values())):5.1f}%  {function}")
+        return path
+
+    def hottest(self, n):
+        """Innermost frames by share of samples, leaving out threads idle in threading.py waits."""
+        leaves = collections.Counter()
+        for stack, count in self.counts.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            if "(threading.py:" not in leaf:
+                leaves[leaf] += count
+        return leaves.most_common(n)
+
+
+def install_signals(monitor, profiler):
+    """SIGUSR1: sample now; SIGUSR2: toggle the profiler. Main thread only."""
+    # File writes and thread joins stay out of the signal handler itself.
+    signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=monitor.record, daemon=True).start())
+    signal.signal(signal.SIGUSR2, lambda *_: threading.Thread(target=profiler.toggle, daemon=True).start())
+
+
+def split_runs(records):
+    """Splits samples appended across restarts into one list per process.
+
+    A new run starts where the pid changes, or, for samples written before
+    the pid was recorded, where the clock or the process CPU time goes back.
+    """
+    runs = []
+    for record in records:
+        if runs:
+            last = runs[-1][-1]
+            restarted = (record.get("pid") != last.get("pid") or record["ts"] < last["ts"]
+                         or record["cpu_s"] < last["cpu_s"])
+        if not runs or restarted:
+            runs.append([])
+        runs[-1].append(record)
+    return runs
+
+
+def summarize(path):
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        print("No samples")
+        return
+    runs = split_runs(records)
+    for n, run in enumerate(runs, 1):
+        if len(runs) > 1:
+            if n > 1:
+                print()
+            pid = f" (pid {run[0]['pid']})" if "pid" in run[0] else ""
+            print(f"Run {n} of {len(runs)}{pid}")
+        summarize_run(run)
+
+
+def summarize_run(records):
+    first, last = records[0], records[-1]
+    hours = (last["ts"] - first["ts"]) / 3600
+    cpu = 100 * (last["cpu_s"] - first["cpu_s"]) / max(1e-9, last["ts"] - first["ts"])
+    print(f"{len(records)} samples over {hours:.1f} h")
+    print(f"rss:     {first['rss_mb']:.1f} -> {last['rss_mb']:.1f} MB "
+          f"(peak {max(r['rss_mb'] for r in records):.1f}, {(last['rss_mb'] - first['rss_mb']) / max(hours, 1e-9):+.2f} MB/h)")
+    print(f"cpu:     {cpu:.2f}% average")
+    print(f"threads: {first['threads']} -> {last['threads']} (max {max(r['threads'] for r in records)})")
+    print(f"fds:     {first['fds']} -> {last['fds']} (max {max(r['fds'] or 0 for r in records)})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"usage: {sys.argv[0]} voice-resources.jsonl")
+        sys.exit(1)
+    summarize(sys.argv[1])
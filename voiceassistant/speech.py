@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Speech scheduler for the voice process.
+
+speak() only queues text; one thread plays it in priority order:
+
+    ACK       acknowledgements ("Yes, Captain.")
+    RESULT    short command results ("It is currently 14:05")
+    BRIEFING  long reports (status report, calendar read-outs)
+
+An acknowledgement for a new command pre-empts: anything of lower priority
+still queued is dropped and lower-priority speech in progress is cut off,
+so a new command never waits behind the previous one's report. Everything
+can be cancelled at once ("stop" / "silence").
+"""
+import heapq
+import itertools
+import threading
+import time
+
+ACK = 0
+RESULT = 1
+BRIEFING = 2
+
+PRIORITY_NAMES = {ACK: "ack", RESULT: "result", BRIEFING: "briefing"}
+
+
+class SpeechItem:
+    def __init__(self, text, priority, on_played=None):
+        self.text = text
+        self.priority = priority
+        # on_played(item, started, ended) runs on the speech thread once playback finishes.
+        self.on_played = on_played
+        self.queued_at = time.monotonic()
+        self.cancelled = False
+        self.done = threading.Event()
+        self._stop = None
+        self._lock = threading.Lock()
+
+    def on_cancel(self, stop):
+        """Registers how to stop playback in progress; runs it at once if already cancelled."""
+        with self._lock:
+            self._stop = stop
+            cancelled = self.cancelled
+        if cancelled:
+            stop()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            stop = self._stop
+        if stop:
+            stop()
+
+
+class SpeechQueue:
+    def __init__(self, play, tracer=None, on_state=None):
+        """`play(item)` synthesises and plays item.text, blocking until done or cancelled.
+
+        `on_state("speaking" | "listening")` is called when playback starts
+        and when the queue runs empty.
+        """
+        self.play = play
+        self.tracer = tracer
+        self.on_state = on_state
+        self.current = None
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, name="speech", daemon=True).start()
+
+    def say(self, text, priority=RESULT, preempt=False, wait=False, on_played=None):
+        item = SpeechItem(text, priority, on_played)
+        if preempt:
+            self.preempt(priority)
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._seq), item))
+            self._cond.notify()
+        if wait:
+            item.done.wait()
+        return item
+
+    def preempt(self, priority):
+        """Drops queued speech below `priority` and cuts off lower-priority speech in progress."""
+        with self._cond:
+            self._drop(lambda queued: queued.priority > priority)
+            current = self.current
+        if current and current.priority > priority:
+            current.cancel()
+
+    def cancel_all(self):
+        with self._cond:
+            self._drop(lambda queued: True)
+            current = self.current
+        if current:
+            current.cancel()
+
+    def wait_idle(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._heap and self.current is None, timeout)
+
+    def _drop(self, predicate):
+        kept = []
+        for entry in self._heap:
+            if predicate(entry[2]):
+                entry[2].cancelled = True
+                entry[2].done.set()
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self._heap = kept
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap)
+                item = heapq.heappop(self._heap)[2]
+                self.current = item
+            if self.on_state and not item.cancelled:
+                self.on_state("speaking")
+            started = time.monotonic()
+            try:
+                if not item.cancelled:
+                    self.play(item)
+            except Exception as e:
+                print(f"Error speaking: {e}")
+            finally:
+                ended = time.monotonic()
+                if self.tracer:
+                    kind = PRIORITY_NAMES[item.priority]
+                    self.tracer.span("speech_queue", item.queued_at, started, priority=kind)
+                    self.tracer.span("speech", started, ended, priority=kind, cancelled=item.cancelled)
+                if item.on_played:
+                    try:
+                        item.on_played(item, started, ended)
+                    except Exception as e:
+                        print(f"Error in speech callback: {e}")
+                with self._cond:
+                    self.current = None
+                    idle = not self._heap
+                    self._cond.notify_all()
+                item.done.set()
+                if self.on_state and idle:
+                    self.on_state("listening")
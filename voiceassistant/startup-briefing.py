@@ -1,12 +1,17 @@
 import os
 import sys
 import json
+import time
+import array
+import argparse
+import fcntl
 import datetime
 import random
 import shutil
 import subprocess
 import requests
 import socket
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIG ---
 if getattr(sys, 'frozen', False):
@@ -26,103 +31,78 @@ def load_json(path):
 
 SETTINGS = load_json(SETTINGS_PATH)
 
-def speak(text):
-    print(f"Speaking: {text}")
-    
-    voice_path = SETTINGS.get("voice_path", "")
+# --- BRIEFING CACHE ---
+# `startup-briefing --prerender` composes and synthesizes everything that can
+# be known ahead of time (greeting for each part of the day, today's and
+# tomorrow's date, weather, quote) into briefing-cache/. At launch the cached
+# segments play straight away while the live ones (time, disk, memory,
+# uptime) are synthesized alongside and spliced in at their place. A cache
+# older than "briefing_cache_hours" or made with other settings is ignored.
+# Weather goes stale sooner: after "briefing_weather_minutes" it is fetched
+# and rendered live again. An item with nothing to say when the cache was
+# made (e.g. weather while offline) is not cached, so it is tried live.
+CACHE_DIR = os.path.join(USER_DIR, "briefing-cache")
+MANIFEST_PATH = os.path.join(CACHE_DIR, "manifest.json")
+LOCK_FILE = "/tmp/lcars_briefing.lock"
+LIVE_ITEMS = {"time", "disk", "memory", "uptime"}
+PERIODS = ["morning", "afternoon", "evening"]
+DEFAULT_CONFIG = ["greeting", "date", "weather", "disk", "quote"]
+
+def greeting_period(hour):
+    if hour < 12:
+        return "morning"
+    elif hour < 18:
+        return "afternoon"
+    return "evening"
+
+def variant_key(item, at):
+    """Which cached rendering of an item applies at `at`."""
+    if item == "greeting":
+        return greeting_period(at.hour)
+    if item == "date":
+        return at.date().isoformat()
+    return ""
+
+def variant_times(item, now):
+    """Representative times for every variant worth pre-rendering."""
+    if item == "greeting":
+        return [now.replace(hour=h) for h in (6, 12, 18)]
+    if item == "date":
+        return [now, now + datetime.timedelta(days=1)]
+    return [now]
+
+def resolve_voice(settings):
+    voice_path = settings.get("voice_path", "")
     if not voice_path:
         voice_path = os.path.join(USER_DIR, "voices/LibriVox/libri.onnx")
-    
     if not os.path.isabs(voice_path):
         voice_path = os.path.join(USER_DIR, voice_path)
-        
-    piper_bin = os.path.join(SCRIPT_DIR, "piper/piper")
-    
-    if not os.path.exists(piper_bin):
-        print(f"Piper not found at {piper_bin}")
-        return
-
-    # Check for speaker ID
-    speaker_id = SETTINGS.get("speaker_id", "0")
-    
-    # Reload settings to get volume
-    current_settings = load_json(SETTINGS_PATH)
-    volume = current_settings.get("voice_volume", 100)
-    vol_factor = float(volume) / 100.0
-    
-    piper_cmd = [piper_bin, "--model", voice_path, "--output_file", "-"]
-    
-    # Check if model supports speakers
-    voice_config = voice_path + ".json"
-    if os.path.exists(voice_config):
-        try:
-            with open(voice_config, 'r') as f:
-                v_conf = json.load(f)
-                if "speaker_id_map" in v_conf:
-                    piper_cmd.extend(["--speaker", str(speaker_id)])
-        except:
-            pass
+    return voice_path
 
-    try:
-        p1 = subprocess.Popen(["echo", text], stdout=subprocess.PIPE)
-        p2 = subprocess.Popen(
-            piper_cmd,
-            stdin=p1.stdout,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL
-        )
-        p1.stdout.close()
-        
-        # FFmpeg Volume Adjustment
-        p3 = subprocess.Popen(
-            ["ffmpeg", "-f", "wav", "-i", "pipe:0", "-filter:a", f"volume={vol_factor}", "-f", "wav", "pipe:1", "-loglevel", "quiet"],
-            stdin=p2.stdout,
-            stdout=subprocess.PIPE
-        )
-        p2.stdout.close()
-
-        subprocess.run(["aplay", "-q"], stdin=p3.stdout)
-        p3.stdout.close()
-    except Exception as e:
-        print(f"Error speaking: {e}")
-
-def main():
-    # Reload settings on each run
-    SETTINGS.update(load_json(SETTINGS_PATH))
+def cache_key(settings):
+    """Everything a cached segment depends on besides the time."""
+    keys = ["voice_path", "speaker_id", "user_rank", "user_name", "user_surname", "assistant_name",
+            "weather_location", "personality_file"]
+    return json.dumps({k: settings.get(k) for k in keys} | {"config": settings.get("startup_briefing_config", DEFAULT_CONFIG)},
+                      sort_keys=True)
 
-    user_rank = SETTINGS.get("user_rank", "Captain")
-    user_name = SETTINGS.get("user_name", "Bradly")
-    user_surname = SETTINGS.get("user_surname", "User")
-    assistant_name = SETTINGS.get("assistant_name", "Leo")
-    weather_location = SETTINGS.get("weather_location", "Cape Town")
-    
-    # Time of day
-    hour = datetime.datetime.now().hour
-    if hour < 12:
-        greeting = "Good morning"
-    elif hour < 18:
-        greeting = "Good afternoon"
-    else:
-        greeting = "Good evening"
-        
-    date_str = datetime.datetime.now().strftime("%A, %B %d")
-    
-    # Disk usage
-    total, used, free = shutil.disk_usage("/")
-    disk_percent = (used / total) * 100
-    disk_usage = f"{int(disk_percent)}%"
-    
-    # Weather
-    weather = ""
+def fetch_weather(settings):
+    weather_location = settings.get("weather_location", "Cape Town")
     try:
         r = requests.get(f"https://wttr.in/{weather_location}?format=%C+and+%t", timeout=2)
         if r.status_code == 200:
-            weather = r.text.strip()
+            return r.text.strip()
     except:
         pass
-        
-    # Personality Quote
-    p_file = SETTINGS.get("personality_file", "")
+    return ""
+
+def pick_quote(settings):
+    user_rank = settings.get("user_rank", "Captain")
+    user_name = settings.get("user_name", "Bradly")
+    user_surname = settings.get("user_surname", "User")
+    assistant_name = settings.get("assistant_name", "Leo")
+
+    p_file = settings.get("personality_file", "")
     if p_file and not os.path.isabs(p_file):
         p_file = os.path.join(USER_DIR, p_file)
     
@@ -146,80 +126,305 @@ def main():
     chosen_quote = chosen_quote.replace("{user_surname}", user_surname)
     chosen_quote = chosen_quote.replace("{assistant_name}", assistant_name)
     chosen_quote = chosen_quote.replace("{system_name}", socket.gethostname())
+    return chosen_quote
+
+class Context:
+    """Slow inputs (network, personality file), fetched at most once per run."""
+    def __init__(self, settings):
+        self.settings = settings
+        self._weather = None
+        self._quote = None
+
+    @property
+    def weather(self):
+        if self._weather is None:
+            self._weather = fetch_weather(self.settings)
+        return self._weather
+
+    @property
+    def quote(self):
+        if self._quote is None:
+            self._quote = pick_quote(self.settings)
+        return self._quote
+
+def item_text(item, ctx, at):
+    """The sentence for one startup_briefing_config item at time `at` ("" to skip it)."""
+    user_rank = ctx.settings.get("user_rank", "Captain")
+    if item == "greeting":
+        greeting = {"morning": "Good morning", "afternoon": "Good afternoon"}.get(greeting_period(at.hour), "Good evening")
+        return f"{greeting}, {user_rank}."
+    elif item == "date":
+        return f"Today is {at.strftime('%A, %B %d')}."
+    elif item == "time":
+        return f"The time is {at.strftime('%I:%M %p')}."
+    elif item == "weather":
+        if ctx.weather:
+            return f"The current weather is {ctx.weather}."
+    elif item == "disk":
+        total, used, free = shutil.disk_usage("/")
+        disk_percent = (used / total) * 100
+        return f"System disk usage is at {int(disk_percent)}%."
+    elif item == "memory":
+        try:
+            # Try reading /proc/meminfo or use shell command
+            with open('/proc/meminfo', 'r') as f:
+                meminfo = f.readlines()
+                total = 0
+                free = 0
+                buffers = 0
+                cached = 0
+                for line in meminfo:
+                    parts = line.split()
+                    if parts[0] == 'MemTotal:': total = int(parts[1])
+                    if parts[0] == 'MemFree:': free = int(parts[1])
+                    if parts[0] == 'Buffers:': buffers = int(parts[1])
+                    if parts[0] == 'Cached:': cached = int(parts[1])
+                
+                used = total - free - buffers - cached
+                percent = int((used / total) * 100)
+                return f"Memory usage is at {percent}%."
+        except:
+            pass
+    elif item == "uptime":
+        try:
+            with open('/proc/uptime', 'r') as f:
+                uptime_seconds = float(f.readline().split()[0])
+                # simple parsing
+                hours = int(uptime_seconds // 3600)
+                minutes = int((uptime_seconds % 3600) // 60)
+                return f"System has been up for {hours} hours and {minutes} minutes."
+        except:
+            pass
+    elif item == "quote":
+        return ctx.quote
+    return ""
+
+# --- SYNTHESIS & PLAYBACK ---
+
+def piper_command(settings):
+    """(piper argv writing raw 16-bit mono PCM to stdout, sample rate), or (None, None)."""
+    voice_path = resolve_voice(settings)
+    piper_bin = os.path.join(SCRIPT_DIR, "piper/piper")
     
-    # --- BUILD BRIEFING ---
-    # Default config if not present
-    default_config = ["greeting", "date", "weather", "disk", "quote"]
-    briefing_config = SETTINGS.get("startup_briefing_config", default_config)
-    
-    full_text = ""
+    if not os.path.exists(piper_bin):
+        print(f"Piper not found at {piper_bin}")
+        return None, None
+
+    # Check for speaker ID
+    speaker_id = settings.get("speaker_id", "0")
+    piper_cmd = [piper_bin, "--model", voice_path, "--output_raw"]
+    rate = 22050
     
+    # Check if model supports speakers
+    voice_config = voice_path + ".json"
+    if os.path.exists(voice_config):
+        try:
+            with open(voice_config, 'r') as f:
+                v_conf = json.load(f)
+                if "speaker_id_map" in v_conf:
+                    piper_cmd.extend(["--speaker", str(speaker_id)])
+                rate = v_conf.get("audio", {}).get("sample_rate", rate)
+        except:
+            pass
+    return piper_cmd, rate
+
+def synthesize(text, piper_cmd):
+    """Raw PCM for text (b"" on failure)."""
+    if not text:
+        return b""
+    try:
+        result = subprocess.run(piper_cmd, input=text.encode() + b"\n", stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=True)
+        return result.stdout
+    except Exception as e:
+        print(f"Error synthesizing: {e}")
+        return b""
+
+def scale(pcm, factor):
+    if factor == 1.0 or not pcm:
+        return pcm
+    samples = array.array("h", pcm[:len(pcm) - len(pcm) % 2])
+    for i, s in enumerate(samples):
+        samples[i] = max(-32768, min(32767, int(s * factor)))
+    return samples.tobytes()
+
+def play(segments, rate, volume, block=8192):
+    """Plays a list of PCM byte strings or futures of them through one aplay, in order."""
+    player = subprocess.Popen(["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1", "-r", str(rate)],
+                              stdin=subprocess.PIPE)
+    try:
+        for segment in segments:
+            pcm = segment.result() if hasattr(segment, "result") else segment
+            # Block by block, so the first sound does not wait for the whole segment to be scaled.
+            for i in range(0, len(pcm), block):
+                player.stdin.write(scale(pcm[i:i + block], volume))
+            player.stdin.flush()
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            player.stdin.close()
+        except BrokenPipeError:
+            pass
+        player.wait()
+
+# --- PRE-RENDER ---
+
+def prerender(settings):
+    """Synthesizes every cacheable segment of the next briefing into CACHE_DIR."""
+    piper_cmd, rate = piper_command(settings)
+    if not piper_cmd:
+        return False
+    # One pre-render at a time (app quit and the post-briefing refresh can overlap).
+    lock = open(CACHE_DIR + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        print("Briefing pre-render already running")
+        lock.close()
+        return True
+    try:
+        return _prerender(settings, piper_cmd, rate)
+    finally:
+        lock.close()
+
+def _prerender(settings, piper_cmd, rate):
+    ctx = Context(settings)
+    now = datetime.datetime.now()
+    tmp_dir = CACHE_DIR + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    items = {}
+    for item in settings.get("startup_briefing_config", DEFAULT_CONFIG):
+        if item in LIVE_ITEMS or item in items:
+            continue
+        variants = {}
+        for at in variant_times(item, now):
+            key = variant_key(item, at)
+            text = item_text(item, ctx, at)
+            if not text:
+                continue  # nothing to say yet (e.g. weather unreachable): try it live at launch
+            pcm = synthesize(text, piper_cmd)
+            if not pcm:
+                continue  # synthesis failed: render it live instead
+            name = f"{item}-{key or 'any'}.raw"
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                f.write(pcm)
+            variants[key] = {"file": name, "text": text}
+        items[item] = variants
+
+    manifest = {"created": time.time(), "rate": rate, "key": cache_key(settings), "items": items}
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # Swap the whole directory so a briefing never sees half a cache.
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    os.rename(tmp_dir, CACHE_DIR)
+    print(f"Pre-rendered {sum(len(v) for v in items.values())} briefing segments into {CACHE_DIR}")
+    return True
+
+def load_cache(settings):
+    manifest = load_json(MANIFEST_PATH)
+    if not manifest:
+        return None
+    max_age = float(settings.get("briefing_cache_hours", 12)) * 3600
+    if time.time() - manifest.get("created", 0) > max_age:
+        print("Briefing cache expired")
+        return None
+    if manifest.get("key") != cache_key(settings):
+        print("Briefing cache made with other settings")
+        return None
+    return manifest
+
+def item_max_age(item, settings):
+    """Seconds a cached rendering of `item` stays usable."""
+    if item == "weather":
+        return float(settings.get("briefing_weather_minutes", 60)) * 60
+    return float(settings.get("briefing_cache_hours", 12)) * 3600
+
+def cached_segment(manifest, item, at, settings):
+    if not manifest:
+        return None
+    if time.time() - manifest.get("created", 0) > item_max_age(item, settings):
+        return None
+    variant = manifest["items"].get(item, {}).get(variant_key(item, at))
+    if not variant:
+        return None
+    try:
+        with open(os.path.join(CACHE_DIR, variant["file"]), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def spawn_prerender():
+    """Refreshes the cache for the next launch in a detached process."""
+    argv = [sys.executable] if getattr(sys, 'frozen', False) else [sys.executable, os.path.abspath(__file__)]
+    try:
+        subprocess.Popen(argv + ["--prerender"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    except Exception as e:
+        print(f"Could not start briefing pre-render: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup briefing")
+    parser.add_argument("--prerender", action="store_true", help="render the next briefing into the cache and exit")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the pre-rendered briefing")
+    args = parser.parse_args()
+
+    # Reload settings on each run
+    SETTINGS.update(load_json(SETTINGS_PATH))
+
+    if args.prerender:
+        sys.exit(0 if prerender(SETTINGS) else 1)
+
+    piper_cmd, rate = piper_command(SETTINGS)
+    if not piper_cmd:
+        return
+    manifest = None if args.no_cache else load_cache(SETTINGS)
+    if manifest and manifest.get("rate") != rate:
+        manifest = None
+
+    # --- BUILD BRIEFING ---
+    ctx = Context(SETTINGS)
+    now = datetime.datetime.now()
+    briefing_config = SETTINGS.get("startup_briefing_config", DEFAULT_CONFIG)
+    pool = ThreadPoolExecutor(max_workers=4)
+    segments = []
+    live = 0
     for item in briefing_config:
-        if item == "greeting":
-            full_text += f"{greeting}, {user_rank}. "
-        elif item == "date":
-            full_text += f"Today is {date_str}. "
-        elif item == "time":
-            time_str = datetime.datetime.now().strftime("%I:%M %p")
-            full_text += f"The time is {time_str}. "
-        elif item == "weather":
-            if weather:
-                full_text += f"The current weather is {weather}. "
-        elif item == "disk":
-            full_text += f"System disk usage is at {disk_usage}. "
-        elif item == "memory":
-            try:
-                # Try reading /proc/meminfo or use shell command
-                with open('/proc/meminfo', 'r') as f:
-                    meminfo = f.readlines()
-                    total = 0
-                    free = 0
-                    buffers = 0
-                    cached = 0
-                    for line in meminfo:
-                        parts = line.split()
-                        if parts[0] == 'MemTotal:': total = int(parts[1])
-                        if parts[0] == 'MemFree:': free = int(parts[1])
-                        if parts[0] == 'Buffers:': buffers = int(parts[1])
-                        if parts[0] == 'Cached:': cached = int(parts[1])
-                    
-                    used = total - free - buffers - cached
-                    percent = int((used / total) * 100)
-                    full_text += f"Memory usage is at {percent}%. "
-            except:
-                pass
-        elif item == "uptime":
-            try:
-                with open('/proc/uptime', 'r') as f:
-                    uptime_seconds = float(f.readline().split()[0])
-                    # simple parsing
-                    hours = int(uptime_seconds // 3600)
-                    minutes = int((uptime_seconds % 3600) // 60)
-                    full_text += f"System has been up for {hours} hours and {minutes} minutes. "
-            except:
-                pass
-        elif item == "quote":
-            full_text += f"{chosen_quote} "
-            
-    full_text = full_text.strip()
+        pcm = None if item in LIVE_ITEMS else cached_segment(manifest, item, now, SETTINGS)
+        if pcm is None:
+            text = item_text(item, ctx, now)
+            if not text:
+                continue
+            print(f"Speaking: {text}")
+            segments.append(pool.submit(synthesize, text, piper_cmd))
+            live += 1
+        else:
+            segments.append(pcm)
+    print(f"Briefing: {len(segments) - live} cached segments, {live} rendered now")
     
     # Create lock file
-    lock_file = "/tmp/lcars_briefing.lock"
     try:
-        with open(lock_file, "w") as f:
+        with open(LOCK_FILE, "w") as f:
             f.write(str(os.getpid()))
     except:
         pass
 
     try:
-        if full_text:
-            speak(full_text)
+        if segments:
+            volume = float(load_json(SETTINGS_PATH).get("voice_volume", 100)) / 100.0
+            play(segments, rate, volume)
     finally:
-        if os.path.exists(lock_file):
+        pool.shutdown(wait=False)
+        if os.path.exists(LOCK_FILE):
             try:
-                os.remove(lock_file)
+                os.remove(LOCK_FILE)
             except:
                 pass
 
+    if SETTINGS.get("briefing_prerender", True):
+        spawn_prerender()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""System status report, spoken in-process by the status_report action or from
+a shell via `galactica-utils.sh status_report`.
+
+All sources are sampled concurrently, each with its own timeout, and read
+from /proc and /sys instead of forking sensors/free/df/ping. Results are
+kept in a short-TTL cache, and the report is yielded in ready batches so the
+first sections can be spoken while calendar and network are still resolving.
+"""
+import datetime
+import glob
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+DEFAULT_CONFIG = ["header", "uptime", "thermal", "memory", "disk", "calendar", "network"]
+
+PING_HOST = "8.8.8.8"
+
+
+def read_first_line(path):
+    with open(path) as f:
+        return f.readline().strip()
+
+
+# --- SOURCES ---
+
+def section_header(_ctx):
+    return f"{socket.gethostname()} Status Report."
+
+
+def section_time(_ctx):
+    return f"The time is {datetime.datetime.now().strftime('%I:%M %p')}."
+
+
+def section_date(_ctx):
+    return f"Today is {datetime.datetime.now().strftime('%A, %B %d')}."
+
+
+def format_uptime(seconds):
+    """Same wording as `uptime -p`: '2 days, 3 hours, 4 minutes'."""
+    minutes = int(seconds // 60)
+    units = [("week", minutes // 10080), ("day", minutes // 1440 % 7),
+             ("hour", minutes // 60 % 24), ("minute", minutes % 60)]
+    parts = [f"{n} {unit}{'s' if n != 1 else ''}" for unit, n in units if n]
+    return ", ".join(parts) or "0 minutes"
+
+
+def section_uptime(_ctx):
+    seconds = float(read_first_line("/proc/uptime").split()[0])
+    return f"System uptime is {format_uptime(seconds)}."
+
+
+def cpu_temperature():
+    # Same preference as the `sensors` grep: the coretemp package, then core 0.
+    for wanted in ("Package id 0", "Core 0"):
+        for label_path in glob.glob("/sys/class/hwmon/hwmon*/temp*_label"):
+            try:
+                if read_first_line(label_path) == wanted:
+                    return int(read_first_line(label_path.replace("_label", "_input"))) // 1000
+            except (OSError, ValueError):
+                continue
+    try:
+        return int(read_first_line("/sys/class/thermal/thermal_zone0/temp")) // 1000
+    except (OSError, ValueError):
+        return None
+
+
+def section_thermal(_ctx):
+    temp = cpu_temperature()
+    return f"Thermal core is at {temp if temp is not None else 'unknown'} degrees."
+
+
+def section_memory(_ctx):
+    meminfo = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            meminfo[key] = int(value.split()[0])
+    total = meminfo["MemTotal"]
+    # `free` reports used = total - available (older kernels: minus free/buffers/cache).
+    available = meminfo.get("MemAvailable",
+                            meminfo["MemFree"] + meminfo.get("Buffers", 0) + meminfo.get("Cached", 0))
+    return f"Memory usage {round((total - available) / total * 100)} percent."
+
+
+def section_disk(_ctx):
+    st = os.statvfs("/")
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    avail = st.f_bavail * st.f_frsize
+    # df's Use% rounds up and excludes root-reserved blocks.
+    percent = -(-used * 100 // (used + avail)) if used + avail else 0
+    return f"Primary drive is {percent} percent full."
+
+
+def icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def ping_ms(host, timeout=2.0):
+    """Round trip in ms, or None if unreachable.
+
+    Uses an unprivileged ICMP socket (net.ipv4.ping_group_range) and falls
+    back to timing a TCP connect to port 53 where that is not permitted.
+    """
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    except OSError:
+        sock = None
+
+    if sock:
+        with sock:
+            sock.settimeout(timeout)
+            header = struct.pack("!BBHHH", 8, 0, 0, 0, 1)
+            payload = b"lcars-status"
+            packet = struct.pack("!BBHHH", 8, 0, icmp_checksum(header + payload), 0, 1) + payload
+            try:
+                start = time.monotonic()
+                sock.sendto(packet, (host, 0))
+                sock.recv(1024)
+                return (time.monotonic() - start) * 1000
+            except OSError:
+                return None
+
+    try:
+        start = time.monotonic()
+        with socket.create_connection((host, 53), timeout=timeout):
+            return (time.monotonic() - start) * 1000
+    except OSError:
+        return None
+
+
+def section_network(_ctx):
+    ms = ping_ms(PING_HOST)
+    status = f"{int(ms)} milliseconds" if ms is not None else "offline"
+    return f"Network latency is {status}."
+
+
+def section_calendar(ctx):
+    return ctx() if ctx else ""
+
+
+# name -> (sampler, timeout seconds, cache TTL seconds)
+SECTIONS = {
+    "header": (section_header, 1.0, 3600),
+    "time": (section_time, 1.0, 0),
+    "date": (section_date, 1.0, 0),
+    "uptime": (section_uptime, 1.0, 30),
+    "thermal": (section_thermal, 1.0, 5),
+    "memory": (section_memory, 1.0, 5),
+    "disk": (section_disk, 1.0, 30),
+    "calendar": (section_calendar, 15.0, 60),
+    "network": (section_network, 3.0, 10),
+}
+
+# --- SAMPLING & CACHE ---
+
+_executor = ThreadPoolExecutor(max_workers=len(SECTIONS), thread_name_prefix="status")
+_cache = {}         # name -> (monotonic timestamp, text)
+_cache_lock = threading.Lock()
+
+
+def _sample(name, ctx):
+    sampler, _timeout, ttl = SECTIONS[name]
+    text = sampler(ctx)
+    if ttl:
+        with _cache_lock:
+            _cache[name] = (time.monotonic(), text)
+    return text
+
+
+def _cached(name):
+    ttl = SECTIONS[name][2]
+    with _cache_lock:
+        entry = _cache.get(name)
+    if entry and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    return None
+
+
+def stream_report(settings, calendar_report=None):
+    """Yields the report in order, one batch of already-resolved sections at a time.
+
+    `calendar_report` is a callable returning today's calendar text. A source
+    that misses its timeout is left out of this report; it keeps running in
+    the background and refreshes the cache for the next one.
+    """
+    items = [i for i in settings.get("system_report_config", DEFAULT_CONFIG) if i in SECTIONS]
+
+    pending = []
+    for item in items:
+        text = _cached(item)
+        if text is not None:
+            pending.append((item, text, None))
+        else:
+            ctx = calendar_report if item == "calendar" else None
+            pending.append((item, None, _executor.submit(_sample, item, ctx)))
+
+    started = time.monotonic()
+    batch = []
+    for item, text, future in pending:
+        if future is not None:
+            if not future.done() and batch:
+                # Speak what is ready while this section is still resolving.
+                yield " ".join(batch)
+                batch = []
+            remaining = SECTIONS[item][1] - (time.monotonic() - started)
+            try:
+                text = future.result(timeout=max(remaining, 0))
+            except FutureTimeout:
+                print(f"Status report: {item} timed out", file=sys.stderr)
+                continue
+            except Exception as e:
+                print(f"Status report: {item} failed: {e}", file=sys.stderr)
+                continue
+        if text:
+            batch.append(text)
+
+    if batch:
+        yield " ".join(batch)
+
+
+def build_report(settings, calendar_report=None):
+    return " ".join(stream_report(settings, calendar_report))
+
+
+def calendar_agent_report():
+    """Today's calendar from a calendar-agent run, for the command-line report."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    binary = os.path.join(here, "calendar-agent")
+    if os.path.exists(binary):
+        command = [binary, "report_today"]
+    else:
+        command = [sys.executable, os.path.join(here, "calendar-agent.py"), "report_today"]
+    return subprocess.run(command, capture_output=True, text=True, timeout=15).stdout.strip()
+
+
+if __name__ == "__main__":
+    # `galactica-utils.sh status_report` speaks this output, for commands that run in a shell.
+    import json
+    settings_path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("LCARS_SETTINGS_PATH", "")
+    try:
+        with open(settings_path) as f:
+            settings = json.load(f)
+    except Exception:
+        settings = {}
+    for chunk in stream_report(settings, calendar_agent_report):
+        print(chunk, flush=True)
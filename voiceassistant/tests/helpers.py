@@ -0,0 +1,51 @@
+"""Shared setup for the voice assistant tests.
+
+The scripts import their neighbours directly, so the package directory is
+put on sys.path. voice-command.py needs vosk, pyaudio and pygame at import
+time; where they are not installed, empty stand-ins are registered so the
+module's logic can be tested without audio hardware.
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import types
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
+
+
+def stand_in(name, **attrs):
+    """Registers an empty module for `name` unless the real one is installed."""
+    if name in sys.modules or importlib.util.find_spec(name) is not None:
+        return
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+
+
+def workspace(settings=None, commands=None):
+    """A temporary LCARS_WORKSPACE with the given settings and commands.json."""
+    path = tempfile.mkdtemp(prefix="lcars-test-")
+    with open(os.path.join(path, "galactica_settings.json"), "w") as f:
+        json.dump(settings or {}, f)
+    with open(os.path.join(path, "commands.json"), "w") as f:
+        json.dump(commands or {}, f)
+    return path
+
+
+def load_script(filename, name, settings=None, commands=None):
+    """Imports a hyphenated script (e.g. voice-command.py) against a fresh workspace."""
+    stand_in("vosk", Model=lambda path: None, KaldiRecognizer=object)
+    stand_in("pyaudio", paInt16=8, paContinue=0, PyAudio=object)
+    stand_in("pygame")
+    ws = workspace(settings, commands)
+    os.environ["LCARS_WORKSPACE"] = ws
+    os.environ["LCARS_SETTINGS_PATH"] = os.path.join(ws, "galactica_settings.json")
+    os.environ.pop("LCARS_IPC_FD", None)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(PACKAGE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+import unittest.mock
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import actions
+
+
+class SlowCalendar:
+    """Stands in for the calendar worker; report_today takes `delay` seconds."""
+    def __init__(self, delay):
+        self.delay = delay
+
+    def call(self, args, timeout=None):
+        time.sleep(self.delay)
+        return "No appointments today."
+
+
+class Recorder:
+    """Collects spoken text; `done` is set once something containing `last` is spoken."""
+    def __init__(self, last=None):
+        self.last = last
+        self.spoken = []
+        self.done = threading.Event()
+
+    def speak(self, text, priority=None, **_):
+        self.spoken.append(text)
+        if self.last and self.last in text:
+            self.done.set()
+
+
+class SlowPlayer:
+    """Stands in for MprisClient; spotify registers on the bus `delay` seconds after it is asked for.
+
+    With `starts=False` it never does, as when the launch fails.
+    """
+    def __init__(self, delay, starts=True):
+        self.delay = delay
+        self.starts = starts
+        self.played = []
+
+    def find(self, name):
+        return []
+
+    def wait_for_player(self, name, timeout=None):
+        time.sleep(self.delay)
+        return "org.mpris.MediaPlayer2.spotify" if self.starts else None
+
+    def play(self, bus_name):
+        self.played.append(bus_name)
+
+
+class RunTest(unittest.TestCase):
+    def test_unavailable_step_falls_back_before_anything_runs(self):
+        out = Recorder()
+        ctx = actions.ActionContext(out.speak, ".", mpris=None)
+        steps = actions.resolve("{base_dir}/ai-speak.sh hello && {base_dir}/galactica-utils.sh music")
+        self.assertFalse(actions.run(steps, ctx, {}, str, time.monotonic(), "hello music"))
+        self.assertEqual(out.spoken, [])
+
+    def test_player_launch_does_not_block_the_caller(self):
+        out = Recorder()
+        player = SlowPlayer(0.5)
+        ctx = actions.ActionContext(out.speak, ".", mpris=player)
+        started = time.monotonic()
+        with unittest.mock.patch("subprocess.Popen") as popen:
+            self.assertTrue(actions.run([("music", [])], ctx, {}, str, started, "music"))
+            self.assertLess(time.monotonic() - started, 0.2)
+            self.assertEqual(out.spoken, ["Launching Spotify. Stand by."])
+            deadline = time.monotonic() + 5
+            while not player.played and time.monotonic() < deadline:
+                time.sleep(0.02)
+        self.assertEqual(popen.call_args[0][0], ["spotify"])
+        self.assertEqual(player.played, ["org.mpris.MediaPlayer2.spotify"])
+        self.assertEqual(out.spoken, ["Launching Spotify. Stand by."])
+
+    def test_failed_player_launch_is_spoken(self):
+        out = Recorder(last="Unable to launch")
+        ctx = actions.ActionContext(out.speak, ".", mpris=SlowPlayer(0.1, starts=False))
+        with unittest.mock.patch("subprocess.Popen"):
+            self.assertTrue(actions.run([("music", [])], ctx, {}, str, time.monotonic(), "music"))
+            self.assertTrue(out.done.wait(5))
+        self.assertEqual(out.spoken, ["Launching Spotify. Stand by.", "Unable to launch spotify."])
+
+
+class StatusReportTest(unittest.TestCase):
+    def test_report_does_not_block_the_caller(self):
+        out = Recorder(last="appointments")
+        ctx = actions.ActionContext(out.speak, ".", calendar=SlowCalendar(0.5))
+        settings = {"system_report_config": ["header", "calendar"]}
+        started = time.monotonic()
+        self.assertTrue(actions.run([("status_report", [])], ctx, settings, str, started, "status report"))
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertTrue(out.done.wait(5))
+        self.assertIn("Status Report.", out.spoken[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
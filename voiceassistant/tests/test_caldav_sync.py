@@ -0,0 +1,220 @@
+import http.server
+import os
+import re
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from xml.sax.saxutils import escape
+
+import helpers
+import caldav_sync
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+try:
+    import dateutil  # noqa: F401
+    import icalendar  # noqa: F401
+    import recurring_ical_events  # noqa: F401
+except ImportError:
+    icalendar = None
+
+COLLECTION = "/cal/work/"
+
+
+def event(uid, summary):
+    return ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nBEGIN:VEVENT\r\n"
+            f"UID:{uid}\r\nDTSTART:20260105T090000Z\r\nSUMMARY:{summary}\r\n"
+            "END:VEVENT\r\nEND:VCALENDAR\r\n")
+
+
+class Collection:
+    """A calendar collection with a change log, answering RFC 6578 sync tokens."""
+    def __init__(self):
+        self.members = {}     # href -> (etag, ics)
+        self.log = []         # (href, deleted) per change; token N = first N changes seen
+        self.oldest_token = 0
+        self.token_error = 403
+        self.page = None      # when set, every listing stops after this many members (507)
+        self.multigets = []   # hrefs asked for in each calendar-multiget
+        self.lock = threading.Lock()
+
+    def put(self, name, summary):
+        href = COLLECTION + name
+        etag = f'"{len(self.log) + 1}"'
+        self.members[href] = (etag, event(name, summary))
+        self.log.append((href, False))
+
+    def delete(self, name):
+        href = COLLECTION + name
+        del self.members[href]
+        self.log.append((href, True))
+
+    def expire_tokens(self, status=403):
+        """Forget the change log, as servers do after a while."""
+        self.oldest_token = len(self.log)
+        self.token_error = status
+
+
+def multistatus(responses, token=None):
+    body = "".join(responses)
+    token_xml = f"<d:sync-token>{token}</d:sync-token>" if token is not None else ""
+    return ('<?xml version="1.0" encoding="utf-8"?>'
+            '<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+            f"{body}{token_xml}</d:multistatus>").encode()
+
+
+def propstat(href, **props):
+    xml = "".join(f"<{tag}>{escape(value)}</{tag}>" for tag, value in props.items())
+    return (f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>{xml}</d:prop>"
+            "<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+
+
+def gone(href):
+    return f"<d:response><d:href>{href}</d:href><d:status>HTTP/1.1 404 Not Found</d:status></d:response>"
+
+
+def truncated():
+    return (f"<d:response><d:href>{COLLECTION}</d:href>"
+            "<d:status>HTTP/1.1 507 Insufficient Storage</d:status></d:response>")
+
+
+def make_handler(cal):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, body=b""):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_REPORT(self):
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            with cal.lock:
+                if "sync-collection" in body:
+                    self.sync_collection(re.search(r"<d:sync-token>(.*)</d:sync-token>", body).group(1))
+                else:
+                    self.multiget(re.findall(r"<d:href>(.*?)</d:href>", body))
+
+        def sync_collection(self, token):
+            now = f"tok-{len(cal.log)}"
+            if token and int(token.split("-")[1]) < cal.oldest_token:
+                self.reply(cal.token_error, b'<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>')
+                return
+            if not token or cal.page is not None:
+                listed = [propstat(href, **{"d:getetag": etag}) for href, (etag, _) in cal.members.items()]
+                if cal.page is not None:
+                    listed = listed[:cal.page] + [truncated()]
+                self.reply(207, multistatus(listed, now))
+                return
+            seen = int(token.split("-")[1])
+            latest = {href: deleted for href, deleted in cal.log[seen:]}
+            self.reply(207, multistatus([gone(href) if deleted else
+                                         propstat(href, **{"d:getetag": cal.members[href][0]})
+                                         for href, deleted in latest.items()], now))
+
+        def multiget(self, hrefs):
+            cal.multigets.append(hrefs)
+            self.reply(207, multistatus([propstat(href, **{"d:getetag": cal.members[href][0],
+                                                           "c:calendar-data": cal.members[href][1]})
+                                         for href in hrefs if href in cal.members]))
+
+    return Handler
+
+
+@unittest.skipIf(requests is None, "requests is not installed")
+class CalDAVSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.cal = Collection()
+        self.cal.put("standup.ics", "Standup")
+        self.cal.put("review.ics", "Design review")
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.cal))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_port}{COLLECTION}"
+
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+        self.store = caldav_sync.EventStore(os.path.join(tempfile.mkdtemp(), "work.db"))
+        self.addCleanup(self.store.close)
+
+    def sync(self):
+        return caldav_sync.CalDAVSync(self.session, self.url, self.store, timeout=5).sync()
+
+    def summaries(self):
+        return sorted(re.findall(r"SUMMARY:(.*)\r", self.store.to_ical().decode()))
+
+    def test_initial_sync_downloads_everything(self):
+        stats = self.sync()
+        self.assertEqual(stats, {"changed": 2, "deleted": 0, "full": True, "truncated": False})
+        self.assertEqual(self.summaries(), ["Design review", "Standup"])
+        self.assertEqual(self.store.get_meta("sync_token"), "tok-2")
+
+    def test_incremental_sync_fetches_only_changes(self):
+        self.sync()
+        self.cal.put("review.ics", "Design review (moved)")
+        self.cal.put("retro.ics", "Retro")
+        self.cal.delete("standup.ics")
+        stats = self.sync()
+        self.assertEqual(stats, {"changed": 2, "deleted": 1, "full": False, "truncated": False})
+        self.assertEqual(sorted(self.cal.multigets[-1]), [COLLECTION + "retro.ics", COLLECTION + "review.ics"])
+        self.assertEqual(self.summaries(), ["Design review (moved)", "Retro"])
+
+    def test_unchanged_collection_downloads_nothing(self):
+        self.sync()
+        self.assertEqual(self.sync(), {"changed": 0, "deleted": 0, "full": False, "truncated": False})
+        self.assertEqual(len(self.cal.multigets), 1)
+
+    def test_rejected_token_resyncs_in_full(self):
+        for status in (403, 410):
+            with self.subTest(status=status):
+                self.sync()
+                self.cal.delete("standup.ics")
+                self.cal.put("standup.ics", "Standup (new)")
+                self.cal.delete("review.ics")
+                self.cal.expire_tokens(status)
+                stats = self.sync()
+                self.assertTrue(stats["full"])
+                self.assertEqual(self.summaries(), ["Standup (new)"])
+                self.cal.put("review.ics", "Design review")  # back to two events for the next round
+
+    def test_truncated_full_listing_keeps_unlisted_events(self):
+        self.sync()
+        self.cal.put("retro.ics", "Retro")
+        self.cal.expire_tokens()
+        self.cal.page = 1
+        with unittest.mock.patch.object(caldav_sync, "MAX_ROUNDS", 3):
+            stats = self.sync()
+        self.assertEqual(stats, {"changed": 0, "deleted": 0, "full": True, "truncated": True})
+        self.assertEqual(self.summaries(), ["Design review", "Standup"])
+        self.assertEqual(self.store.get_meta("sync_token"), "tok-2")
+        self.cal.page = None
+        self.assertEqual(self.sync(), {"changed": 1, "deleted": 0, "full": True, "truncated": False})
+        self.assertEqual(self.summaries(), ["Design review", "Retro", "Standup"])
+
+    @unittest.skipIf(icalendar is None, "calendar-agent's dependencies are not installed")
+    def test_agent_renders_only_when_the_collection_changes(self):
+        agent = helpers.load_script("calendar-agent.py", "calendar_agent")
+        os.makedirs(agent.SOURCE_CACHE_DIR, exist_ok=True)
+        source = {"type": "caldav", "url": self.url, "timeout": 5}
+        with unittest.mock.patch.object(caldav_sync.EventStore, "to_ical", autospec=True,
+                                        side_effect=caldav_sync.EventStore.to_ical) as render:
+            path = agent.refresh_source(source)
+            agent.refresh_source(source)
+            self.assertEqual(render.call_count, 1)
+            self.cal.put("retro.ics", "Retro")
+            self.assertEqual(agent.refresh_source(source), path)
+            self.assertEqual(render.call_count, 2)
+        with open(path) as f:
+            self.assertEqual(sorted(re.findall(r"SUMMARY:(.*)", f.read())), ["Design review", "Retro", "Standup"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+
+try:
+    import numpy as np
+    import capture
+except ImportError:
+    np = None
+
+
+def tone(rate, seconds, freq, amplitude=0.3):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+class FakeStream:
+    """Stands in for a PyAudio input stream, handing out a recording `frames` at a time."""
+    def __init__(self, pcm, channels):
+        self.pcm = pcm
+        self.frame_bytes = 2 * channels
+        self.offset = 0
+        self.reads = []
+
+    def read(self, frames, exception_on_overflow=False):
+        self.reads.append(frames)
+        data = self.pcm[self.offset:self.offset + frames * self.frame_bytes]
+        self.offset += len(data)
+        return data
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ResamplerTest(unittest.TestCase):
+    def test_output_length(self):
+        for rate in (48000, 44100, 22050):
+            with self.subTest(rate=rate):
+                resampler = capture.Resampler(rate)
+                x = tone(rate, 1.0, 440)
+                out = [resampler.process(x[i:i + rate // 4]) for i in range(0, len(x), rate // 4)]
+                self.assertEqual(sum(len(y) for y in out), 16000)
+
+    def test_blocking_does_not_change_the_output(self):
+        for rate in (48000, 44100, 22050):
+            with self.subTest(rate=rate):
+                x = tone(rate, 0.5, 1000) + tone(rate, 0.5, 3100, 0.1)
+                whole = capture.Resampler(rate).process(x)
+                resampler = capture.Resampler(rate)
+                pieces, i = [], 0
+                for size in (1, 7, 333, 2, 1021, 4096, 17):
+                    pieces.append(resampler.process(x[i:i + size]))
+                    i += size
+                while i < len(x):
+                    pieces.append(resampler.process(x[i:i + 997]))
+                    i += 997
+                np.testing.assert_allclose(np.concatenate(pieces), whole, atol=1e-6)
+
+    def test_keeps_the_passband_and_rejects_aliases(self):
+        y = capture.Resampler(48000).process(tone(48000, 1.0, 1000) + tone(48000, 1.0, 11000))
+        spectrum = np.abs(np.fft.rfft(y[2000:] * np.hanning(len(y) - 2000)))
+        freqs = np.fft.rfftfreq(len(y) - 2000, 1 / 16000)
+        level = lambda f: spectrum[np.argmin(np.abs(freqs - f))]
+        self.assertGreater(level(1000) / level(5000), 100)
+        self.assertAlmostEqual(np.sqrt(np.mean(y[2000:] ** 2)), 0.3 / np.sqrt(2), delta=0.02)
+
+    def test_passthrough_at_16k(self):
+        resampler = capture.Resampler(16000)
+        self.assertTrue(resampler.passthrough)
+        x = tone(16000, 0.1, 440)
+        self.assertIs(resampler.process(x), x)
+        self.assertEqual(capture.convert(b"\x01\x02" * 100, 16000, 1), b"\x01\x02" * 100)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ConvertingStreamTest(unittest.TestCase):
+    def test_stereo_downmix(self):
+        left, right = tone(16000, 0.1, 440), tone(16000, 0.1, 1000, 0.2)
+        stereo = capture.to_pcm16(np.stack((left, right), axis=1).ravel())
+        mono = np.frombuffer(capture.to_pcm16((left + right) / 2), dtype=np.int16)
+        downmixed = np.frombuffer(capture.to_pcm16(capture.to_mono(stereo, 2)), dtype=np.int16)
+        self.assertLessEqual(np.max(np.abs(downmixed.astype(int) - mono)), 1)
+
+    def test_reads_native_frames_and_returns_16k_mono(self):
+        pcm = capture.to_pcm16(np.repeat(tone(48000, 1.0, 1000), 2))
+        stream = FakeStream(pcm, channels=2)
+        converting = capture.ConvertingStream(stream, 48000, 2, report_every_s=0)
+        blocks = [converting.read(4000) for _ in range(4)]
+        self.assertEqual(stream.reads, [12000] * 4)
+        self.assertEqual([len(b) for b in blocks], [8000] * 4)
+        expected = capture.to_pcm16(capture.Resampler(48000).process(capture.to_mono(pcm, 2)))
+        self.assertEqual(b"".join(blocks), expected)
+        self.assertAlmostEqual(converting.audio_s, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
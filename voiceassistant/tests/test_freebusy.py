@@ -0,0 +1,104 @@
+import random
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import freebusy
+
+
+def covered(intervals):
+    """The whole time units inside any [start, end)."""
+    return {t for start, end in intervals for t in range(start, end)}
+
+
+def brute_first_free(intervals, start, end, duration):
+    """Earliest t with [t, t + duration) inside [start, end) and clear of every interval."""
+    taken = covered(intervals)
+    for t in range(start, end - duration + 1):
+        if not any(u in taken for u in range(t, t + duration)):
+            return t
+    return None
+
+
+class MergeTest(unittest.TestCase):
+    def test_overlapping_and_adjacent_intervals_join(self):
+        self.assertEqual(freebusy.merge([(5, 8), (1, 3), (2, 4), (4, 5), (10, 12)]), [(1, 8), (10, 12)])
+
+    def test_contained_and_empty_intervals(self):
+        self.assertEqual(freebusy.merge([(1, 10), (2, 3), (6, 6), (7, 5)]), [(1, 10)])
+        self.assertEqual(freebusy.merge([]), [])
+
+    def test_matches_covered_time(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            intervals = [(s, s + rng.randrange(0, 6)) for s in (rng.randrange(0, 40) for _ in range(8))]
+            merged = freebusy.merge(intervals)
+            self.assertEqual(covered(merged), covered(intervals))
+            self.assertTrue(all(a[1] < b[0] for a, b in zip(merged, merged[1:])))
+
+
+class MaxTreeTest(unittest.TestCase):
+    def test_matches_a_scan(self):
+        rng = random.Random(4)
+        for n in (0, 1, 2, 5, 8, 13):
+            values = [rng.randrange(0, 10) for _ in range(n)]
+            tree = freebusy.MaxTree(values)
+            for lo in range(n + 1):
+                for hi in range(-1, n + 1):
+                    for x in range(0, 11, 3):
+                        expected = next((i for i in range(lo, min(hi, n - 1) + 1) if values[i] >= x), None)
+                        self.assertEqual(tree.first_at_least(lo, hi, x), expected, (values, lo, hi, x))
+
+
+class BusyIndexTest(unittest.TestCase):
+    def test_empty_index(self):
+        index = freebusy.BusyIndex([])
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.first_free(10, 20, 5), 10)
+        self.assertEqual(index.first_free(10, 20, 10), 10)
+        self.assertIsNone(index.first_free(10, 20, 11))
+        self.assertEqual(index.free(10, 20), [(10, 20)])
+
+    def test_gap_exactly_the_duration(self):
+        index = freebusy.BusyIndex([(0, 10), (15, 20), (30, 40)])
+        self.assertEqual(index.first_free(0, 40, 5), 10)
+        self.assertEqual(index.first_free(0, 40, 6), 20)
+        self.assertEqual(index.first_free(0, 40, 10), 20)
+        self.assertIsNone(index.first_free(0, 40, 11))
+        # The slot after the last event counts too, up to the end of the range.
+        self.assertEqual(index.first_free(0, 51, 11), 40)
+        self.assertIsNone(index.first_free(0, 50, 11))
+
+    def test_adjacent_events_leave_no_gap(self):
+        index = freebusy.BusyIndex([(0, 10), (10, 20), (25, 30)])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.first_free(0, 30, 1), 20)
+
+    def test_after_bounds(self):
+        index = freebusy.BusyIndex([(0, 10), (15, 20), (30, 40)])
+        # Starting inside a busy interval, inside a gap, and right at a boundary.
+        self.assertEqual(index.first_free(5, 40, 5), 10)
+        self.assertEqual(index.first_free(12, 40, 3), 12)
+        self.assertEqual(index.first_free(12, 40, 4), 20)
+        self.assertEqual(index.first_free(20, 40, 10), 20)
+        # The range ends before the slot would.
+        self.assertIsNone(index.first_free(20, 29, 10))
+        self.assertEqual(index.first_free(20, 30, 10), 20)
+        self.assertIsNone(index.first_free(30, 40, 1))
+        self.assertEqual(index.busy(5, 32), [(5, 10), (15, 20), (30, 32)])
+        self.assertEqual(index.free(5, 32), [(10, 15), (20, 30)])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(5)
+        for _ in range(300):
+            intervals = [(s, s + rng.randrange(1, 8)) for s in (rng.randrange(0, 60) for _ in range(rng.randrange(0, 10)))]
+            index = freebusy.BusyIndex(intervals)
+            start = rng.randrange(0, 60)
+            end = start + rng.randrange(0, 30)
+            duration = rng.randrange(1, 12)
+            self.assertEqual(index.first_free(start, end, duration),
+                             brute_first_free(intervals, start, end, duration),
+                             (intervals, start, end, duration))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+
+try:
+    import ics_stream
+    import recurring_ical_events
+    from icalendar import Calendar
+except ImportError:
+    ics_stream = None
+
+TIMEZONE = """BEGIN:VTIMEZONE
+TZID:Europe/Berlin
+BEGIN:STANDARD
+DTSTART:19701025T030000
+RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU
+TZOFFSETFROM:+0200
+TZOFFSETTO:+0100
+END:STANDARD
+BEGIN:DAYLIGHT
+DTSTART:19700329T020000
+RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU
+TZOFFSETFROM:+0100
+TZOFFSETTO:+0200
+END:DAYLIGHT
+END:VTIMEZONE"""
+
+
+def vevent(uid, *props):
+    return "\n".join(["BEGIN:VEVENT", f"UID:{uid}", *props, "END:VEVENT"])
+
+
+def feed():
+    """A year of mixed events: zoned, UTC, all-day, folded, recurring and overridden."""
+    day = datetime.date(2026, 1, 1)
+    blocks = [TIMEZONE]
+    for i in range(120):
+        when = (day + datetime.timedelta(days=3 * i)).strftime("%Y%m%d")
+        kind = i % 4
+        if kind == 0:
+            props = [f"DTSTART;TZID=Europe/Berlin:{when}T090000", f"DTEND;TZID=Europe/Berlin:{when}T100000"]
+        elif kind == 1:
+            props = [f"DTSTART:{when}T233000Z", "DURATION:PT2H"]
+        elif kind == 2:
+            props = [f"DTSTART;VALUE=DATE:{when}"]
+        else:
+            props = [f"DTSTART:{when}T120000", f"DTEND:{when}T130000",
+                     "DESCRIPTION:A long description that the server folded",
+                     "  across two lines"]
+        blocks.append(vevent(f"event-{i}", f"SUMMARY:Event {i}", *props))
+    blocks.append(vevent("weekly", "SUMMARY:Weekly sync", "DTSTART:20250106T100000",
+                         "DTEND:20250106T103000", "RRULE:FREQ=WEEKLY;COUNT=200"))
+    blocks.append(vevent("weekly", "SUMMARY:Weekly sync (moved)", "RECURRENCE-ID:20260608T100000",
+                         "DTSTART:20260609T110000", "DTEND:20260609T113000"))
+    blocks.append(vevent("extra", "SUMMARY:Extra dates", "DTSTART:20250301T080000",
+                         "RDATE:20260610T080000"))
+    blocks.append("BEGIN:VTODO\nUID:todo\nSUMMARY:Not an event\nEND:VTODO")
+    text = "\n".join(["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Test//EN", *blocks, "END:VCALENDAR"])
+    return text.replace("\n", "\r\n").encode() + b"\r\n"
+
+
+def lines(text):
+    return list(ics_stream.unfold(line.encode() + b"\r\n" for line in text.split("\n")))
+
+
+@unittest.skipIf(ics_stream is None, "icalendar is not installed")
+class UnfoldTest(unittest.TestCase):
+    def test_joins_folded_lines(self):
+        raw = [b"BEGIN:VEVENT\r\n", b"SUMMARY:Long\r\n", b"  title\r\n", b"\twith a tab\r\n",
+               b"\r\n", b"END:VEVENT"]
+        self.assertEqual(list(ics_stream.unfold(raw)), ["BEGIN:VEVENT", "SUMMARY:Long titlewith a tab", "END:VEVENT"])
+
+    def test_joins_a_character_split_across_a_fold(self):
+        encoded = "SUMMARY:Café".encode()
+        raw = [encoded[:-1] + b"\r\n", b" " + encoded[-1:] + b"\r\n"]
+        self.assertEqual(list(ics_stream.unfold(raw)), ["SUMMARY:Café"])
+
+
+@unittest.skipIf(ics_stream is None, "icalendar is not installed")
+class ComponentsTest(unittest.TestCase):
+    def test_keeps_wanted_components_with_their_children(self):
+        text = "\n".join(["BEGIN:VCALENDAR", TIMEZONE,
+                          vevent("a", "DTSTART:20260101T090000", "BEGIN:VALARM", "TRIGGER:-PT5M", "END:VALARM"),
+                          "BEGIN:VTODO", "UID:todo", "END:VTODO", "END:VCALENDAR",
+                          "BEGIN:VCALENDAR", vevent("b", "DTSTART:20260102T090000"), "END:VCALENDAR"])
+        found = list(ics_stream.components(lines(text)))
+        self.assertEqual([name for name, _ in found], ["VTIMEZONE", "VEVENT", "VEVENT"])
+        self.assertEqual(found[1][1][-4:], ["BEGIN:VALARM", "TRIGGER:-PT5M", "END:VALARM", "END:VEVENT"])
+        self.assertEqual(ics_stream.prop(found[2][1], "UID"), ("", "b"))
+
+
+@unittest.skipIf(ics_stream is None, "icalendar is not installed")
+class InHorizonTest(unittest.TestCase):
+    start = datetime.datetime(2026, 6, 1)
+    end = datetime.datetime(2026, 6, 7, 23, 59)
+
+    def check(self, *props):
+        return ics_stream.in_horizon(lines(vevent("x", *props)), self.start, self.end)
+
+    def test_recurrence_properties_are_always_kept(self):
+        self.assertTrue(self.check("DTSTART:20200101T090000", "RRULE:FREQ=YEARLY"))
+        self.assertTrue(self.check("DTSTART:20200101T090000", "RDATE:20200202T090000"))
+        self.assertTrue(self.check("DTSTART:20200101T090000", "RECURRENCE-ID:20200101T090000"))
+
+    def test_one_day_margin(self):
+        self.assertTrue(self.check("DTSTART:20260530T220000", "DTEND:20260531T010000"))
+        self.assertFalse(self.check("DTSTART:20260530T220000", "DTEND:20260530T235000"))
+        self.assertTrue(self.check("DTSTART:20260608T230000Z", "DTEND:20260609T000000Z"))
+        self.assertFalse(self.check("DTSTART:20260609T000000", "DTEND:20260609T010000"))
+        self.assertTrue(self.check("DTSTART;TZID=Europe/Berlin:20260530T230000", "DURATION:PT2H"))
+        self.assertFalse(self.check("DTSTART;TZID=Europe/Berlin:20260530T200000", "DURATION:PT2H"))
+        self.assertFalse(self.check("DTSTART;VALUE=DATE:20260529"))
+
+    def test_unparseable_start_is_kept(self):
+        self.assertTrue(self.check("SUMMARY:No start"))
+        self.assertTrue(self.check("DTSTART:soon"))
+
+
+@unittest.skipIf(ics_stream is None, "icalendar is not installed")
+class LoadTest(unittest.TestCase):
+    def setUp(self):
+        self.data = feed()
+        fd, self.path = tempfile.mkstemp(suffix=".ics")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.data)
+        self.addCleanup(os.remove, self.path)
+
+    def events(self, cal):
+        return sorted((str(e["UID"]), str(e["SUMMARY"]), e.decoded("DTSTART").isoformat(),
+                       str(e.get("DESCRIPTION", ""))) for e in cal.walk("VEVENT"))
+
+    def occurrences(self, cal, start, end):
+        return sorted((str(e["UID"]), e.decoded("DTSTART").isoformat())
+                      for e in recurring_ical_events.of(cal).between(start, end))
+
+    def test_without_horizon_matches_full_parse(self):
+        cal, kept, dropped = ics_stream.load(self.path)
+        full = Calendar.from_ical(self.data)
+        self.assertEqual(self.events(cal), self.events(full))
+        self.assertEqual((kept, dropped), (len(full.walk("VEVENT")), 0))
+        self.assertIn("A long description that the server folded across two lines",
+                      [str(e.get("DESCRIPTION")) for e in cal.walk("VEVENT")])
+
+    def test_with_horizon_keeps_every_occurrence(self):
+        full = Calendar.from_ical(self.data)
+        for start, end in ((datetime.datetime(2026, 6, 1), datetime.datetime(2026, 6, 15)),
+                           (datetime.datetime(2026, 3, 29), datetime.datetime(2026, 3, 30)),
+                           (datetime.datetime(2027, 1, 1), datetime.datetime(2027, 2, 1))):
+            with self.subTest(start=start):
+                cal, kept, dropped = ics_stream.load(self.path, start, end)
+                self.assertGreater(dropped, 0)
+                self.assertEqual(kept + dropped, len(full.walk("VEVENT")))
+                self.assertEqual(self.occurrences(cal, start, end), self.occurrences(full, start, end))
+                self.assertEqual([str(e["UID"]) for e in cal.walk("VEVENT") if e.get("RRULE") or e.get("RDATE")
+                                  or e.get("RECURRENCE-ID")], ["weekly", "weekly", "extra"])
+                self.assertEqual(len(cal.walk("VTIMEZONE")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
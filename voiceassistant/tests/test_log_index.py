@@ -0,0 +1,94 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import log_index
+
+
+def has_fts5():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+@unittest.skipIf(not has_fts5(), "SQLite was built without FTS5")
+class LogIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="lcars-logs-")
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.logs_dir = os.path.join(self.dir, "logs")
+        os.mkdir(self.logs_dir)
+        self.index = log_index.LogIndex(os.path.join(self.dir, log_index.DB_NAME))
+        self.addCleanup(self.index.close)
+
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.logs_dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def found(self, query):
+        return [os.path.basename(r["path"]) for r in self.index.search(query)]
+
+    def test_incremental_add(self):
+        path = self.write("log_2026-03-01_09-15.txt", "Warp core breach averted")
+        self.assertTrue(self.index.add(path))
+        self.assertFalse(self.index.add(path))  # unchanged: nothing to do
+        self.write("log_2026-03-02_10-00.txt", "Shore leave on Risa")
+        self.assertEqual(self.index.sync(self.logs_dir), (1, 0))
+        self.assertEqual(self.index.sync(self.logs_dir), (0, 0))
+        self.assertEqual(self.index.count(), 2)
+        self.assertEqual(self.found("warp core"), ["log_2026-03-01_09-15.txt"])
+
+    def test_updated_file_is_reindexed(self):
+        path = self.write("log_2026-03-01_09-15.txt", "Warp core breach averted", mtime=1_000_000)
+        self.index.sync(self.logs_dir)
+        self.write("log_2026-03-01_09-15.txt", "Dilithium crystals replaced", mtime=1_000_060)
+        self.assertEqual(self.index.sync(self.logs_dir), (1, 0))
+        self.assertEqual(self.index.count(), 1)
+        self.assertEqual(self.found("warp"), [])
+        self.assertEqual(self.found("dilithium"), [os.path.basename(path)])
+
+    def test_deleted_file_is_removed_on_sync(self):
+        kept = self.write("log_2026-03-01_09-15.txt", "Warp core breach averted")
+        gone = self.write("log_2026-03-02_10-00.txt", "Warp drive offline")
+        self.write("notes.md", "Warp notes")  # not a transcript
+        self.assertEqual(self.index.sync(self.logs_dir), (2, 0))
+        os.remove(gone)
+        self.assertEqual(self.index.sync(self.logs_dir), (0, 1))
+        self.assertEqual(self.found("warp"), [os.path.basename(kept)])
+
+    def test_all_words_then_any_word(self):
+        self.write("log_2026-03-01_09-15.txt", "Warp core breach averted")
+        self.write("log_2026-03-02_10-00.txt", "Warp drive offline, core temperature nominal")
+        self.write("log_2026-03-03_11-30.txt", "Shore leave on Risa")
+        self.index.sync(self.logs_dir)
+        self.assertEqual(self.found("warp breach"), ["log_2026-03-01_09-15.txt"])
+        # No log mentions both words, so either one will do.
+        self.assertCountEqual(self.found("breach Risa"), ["log_2026-03-01_09-15.txt", "log_2026-03-03_11-30.txt"])
+        self.assertEqual(self.found("Romulans"), [])
+        self.assertEqual(self.found("..."), [])
+
+    def test_recorded_at(self):
+        path = self.write("log_2026-03-01_09-15.txt", "Warp core breach averted")
+        other = self.write("stardate-notes.txt", "Warp core breach averted", mtime=1_700_000_000)
+        self.assertEqual(log_index.recorded_at(path), "2026-03-01T09:15")
+        self.assertEqual(log_index.recorded_at(other),
+                         datetime.datetime.fromtimestamp(1_700_000_000).strftime("%Y-%m-%dT%H:%M"))
+        self.index.sync(self.logs_dir)
+        results = {os.path.basename(r["path"]): r["recorded_at"] for r in self.index.search("warp")}
+        self.assertEqual(results["log_2026-03-01_09-15.txt"], "2026-03-01T09:15")
+        # Equal relevance: newest first (the other file dates from 2023).
+        self.assertEqual(list(results), ["log_2026-03-01_09-15.txt", "stardate-notes.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
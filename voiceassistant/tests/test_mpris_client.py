@@ -0,0 +1,124 @@
+import os
+import shutil
+import subprocess
+import threading
+import unittest
+import unittest.mock
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import mpris_client
+
+try:
+    from jeepney import DBusAddress, MessageType, message_bus, new_error, new_method_return, new_signal
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.low_level import HeaderFields
+except ImportError:
+    open_dbus_connection = None
+
+PLAYER = "org.mpris.MediaPlayer2.testplayer"
+
+
+class StubPlayer:
+    """A minimal MPRIS player on its own connection, answering from a thread."""
+    def __init__(self, address, bus_name=PLAYER):
+        self.conn = open_dbus_connection(bus=address)
+        self.status = "Stopped"
+        self.calls = []
+        self.lock = threading.Lock()
+        self.conn.send_and_get_reply(message_bus.RequestName(bus_name))
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                msg = self.conn.receive()
+            except Exception:
+                return  # connection closed
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            member = msg.header.fields.get(HeaderFields.member)
+            if member == "Get":
+                self.conn.send(new_method_return(msg, "v", (("s", self.status),)))
+            elif member in ("Play", "Pause", "Next"):
+                with self.lock:
+                    self.calls.append(member)
+                self.conn.send(new_method_return(msg))
+                if member != "Next":
+                    self.set_status("Playing" if member == "Play" else "Paused")
+            else:
+                self.conn.send(new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod"))
+
+    def set_status(self, status):
+        self.status = status
+        props = DBusAddress(mpris_client.MPRIS_PATH, interface="org.freedesktop.DBus.Properties")
+        self.conn.send(new_signal(props, "PropertiesChanged", "sa{sv}as",
+                                  (mpris_client.PLAYER_IFACE, {"PlaybackStatus": ("s", status)}, [])))
+
+    def close(self):
+        self.conn.close()
+
+
+@unittest.skipIf(shutil.which("dbus-daemon") is None, "dbus-daemon is not installed")
+@unittest.skipIf(open_dbus_connection is None, "jeepney is not installed")
+class MprisClientTest(unittest.TestCase):
+    def setUp(self):
+        # A private session bus, so the test never touches the desktop's players.
+        self.daemon = subprocess.Popen(["dbus-daemon", "--session", "--print-address", "--nofork"],
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self.address = self.daemon.stdout.readline().strip()
+        self.addCleanup(self.daemon.stdout.close)
+        self.addCleanup(self.daemon.wait)
+        self.addCleanup(self.daemon.terminate)
+        env = unittest.mock.patch.dict(os.environ, {"DBUS_SESSION_BUS_ADDRESS": self.address})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def client(self):
+        client = mpris_client.MprisClient(timeout=2.0)
+        self.addCleanup(client.close)
+        return client
+
+    def player(self):
+        player = StubPlayer(self.address)
+        self.addCleanup(player.close)
+        return player
+
+    def wait_for_status(self, client, status):
+        with client._cond:
+            return client._cond.wait_for(lambda: client.status(PLAYER) == status, timeout=2.0)
+
+    def test_finds_running_player(self):
+        self.player()
+        client = self.client()
+        self.assertEqual(client.find("testplayer"), [PLAYER])
+        self.assertEqual(client.status(PLAYER), "Stopped")
+
+    def test_commands_and_status_tracking(self):
+        player = self.player()
+        client = self.client()
+        client.play(PLAYER)
+        self.assertTrue(self.wait_for_status(client, "Playing"))
+        self.assertEqual(client.playing(), [PLAYER])
+        client.next(PLAYER)
+        client.pause_all()
+        self.assertTrue(self.wait_for_status(client, "Paused"))
+        self.assertEqual(player.calls, ["Play", "Next", "Pause"])
+        self.assertEqual(client.playing(), [])
+
+    def test_wait_for_player_sees_late_start(self):
+        client = self.client()
+        self.assertIsNone(client.wait_for_player("testplayer", timeout=0.1))
+        threading.Timer(0.2, self.player).start()
+        self.assertEqual(client.wait_for_player("testplayer", timeout=5.0), PLAYER)
+
+    def test_player_exit_is_tracked(self):
+        player = self.player()
+        client = self.client()
+        self.assertEqual(client.players(), [PLAYER])
+        player.close()
+        with client._cond:
+            self.assertTrue(client._cond.wait_for(lambda: not client._owners, timeout=2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import phrase_matcher
+
+PHRASES = ["{assistant_name} say hi", "{assistant_name} lock workstation", "{assistant_name} system report"]
+
+
+class PhraseMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.matcher = phrase_matcher.PhraseMatcher(PHRASES, ["leo"])
+
+    def assertMatches(self, text, phrase):
+        match = self.matcher.match(text)
+        self.assertIsNotNone(match, text)
+        self.assertEqual(match[0], phrase)
+
+    def test_near_misses_match(self):
+        self.assertMatches("leo lock work station", "{assistant_name} lock workstation")
+        self.assertMatches("leo sistem report", "{assistant_name} system report")
+        self.assertMatches("leo sai hi", "{assistant_name} say hi")
+
+    def test_short_words_do_not_sound_alike(self):
+        # "say" and "sayhi" share the one-letter key "s"; that must not pass for "say hi".
+        self.assertIsNone(self.matcher.match("leo say"))
+        self.assertEqual(phrase_matcher.word_distance("say", "sayhi"), 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import resource_monitor
+
+
+def record(ts, cpu_s, rss_mb, pid=None):
+    r = {"ts": ts, "rss_mb": rss_mb, "cpu_s": cpu_s, "threads": 10, "fds": 20}
+    if pid is not None:
+        r["pid"] = pid
+    return r
+
+
+class SplitRunsTest(unittest.TestCase):
+    def test_split_on_pid_change(self):
+        records = [record(0, 1, 100, pid=1), record(300, 2, 101, pid=1),
+                   record(600, 5, 90, pid=2), record(900, 6, 91, pid=2)]
+        self.assertEqual([len(run) for run in resource_monitor.split_runs(records)], [2, 2])
+
+    def test_split_on_cpu_time_drop_without_pid(self):
+        records = [record(0, 1, 100), record(300, 40, 150), record(600, 0.5, 90), record(900, 2, 91)]
+        runs = resource_monitor.split_runs(records)
+        self.assertEqual([len(run) for run in runs], [2, 2])
+        self.assertEqual(runs[1][0]["rss_mb"], 90)
+
+    def test_summary_reports_each_run(self):
+        records = [record(0, 1, 100, pid=1), record(3600, 2, 110, pid=1),
+                   record(7200, 1, 80, pid=2), record(10800, 2, 80, pid=2)]
+        path = os.path.join(tempfile.mkdtemp(), "samples.jsonl")
+        with open(path, "w") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            resource_monitor.summarize(path)
+        text = out.getvalue()
+        self.assertIn("Run 2 of 2 (pid 2)", text)
+        self.assertIn("100.0 -> 110.0 MB", text)
+        self.assertIn("80.0 -> 80.0 MB", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
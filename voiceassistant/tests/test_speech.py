@@ -0,0 +1,34 @@
+import threading
+import time
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import speech
+
+
+class OnPlayedTest(unittest.TestCase):
+    def test_callback_spans_playback_on_the_speech_thread(self):
+        played = {}
+
+        def play(item):
+            played["start"] = time.monotonic()
+            time.sleep(0.2)
+
+        def on_played(item, started, ended):
+            played["span"] = (started, ended)
+            played["thread"] = threading.current_thread().name
+
+        queue = speech.SpeechQueue(play)
+        item = queue.say("Yes, Captain.", priority=speech.ACK, on_played=on_played)
+        queued = time.monotonic()
+        self.assertLess(queued - item.queued_at, 0.1)
+        self.assertTrue(item.done.wait(5))
+
+        started, ended = played["span"]
+        self.assertLessEqual(started, played["start"])
+        self.assertGreaterEqual(ended - started, 0.2)
+        self.assertEqual(played["thread"], "speech")
+
+
+if __name__ == "__main__":
+    unittest.main()
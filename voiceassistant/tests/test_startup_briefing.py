@@ -0,0 +1,42 @@
+import datetime
+import importlib.util
+import time
+import unittest
+import unittest.mock
+
+from helpers import load_script
+
+SETTINGS = {"startup_briefing_config": ["greeting", "weather", "quote"]}
+
+
+@unittest.skipIf(importlib.util.find_spec("requests") is None, "requests is not installed")
+class PrerenderTest(unittest.TestCase):
+    def setUp(self):
+        self.sb = load_script("startup-briefing.py", "startup_briefing", settings=SETTINGS)
+        patch = unittest.mock.patch.object(self.sb, "synthesize", lambda text, cmd: text.encode())
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def prerender(self, weather):
+        with unittest.mock.patch.object(self.sb, "fetch_weather", lambda settings: weather):
+            self.assertTrue(self.sb._prerender(SETTINGS, ["piper"], 22050))
+        return self.sb.load_cache(SETTINGS)
+
+    def test_failed_weather_is_not_cached(self):
+        manifest = self.prerender("")
+        self.assertEqual(manifest["items"]["weather"], {})
+        self.assertIsNone(self.sb.cached_segment(manifest, "weather", datetime.datetime.now(), SETTINGS))
+        self.assertIsNotNone(self.sb.cached_segment(manifest, "quote", datetime.datetime.now(), SETTINGS))
+
+    def test_weather_expires_before_the_rest(self):
+        manifest = self.prerender("Sunny and +21°C")
+        now = datetime.datetime.now()
+        self.assertEqual(self.sb.cached_segment(manifest, "weather", now, SETTINGS),
+                         "The current weather is Sunny and +21°C.".encode())
+        manifest["created"] = time.time() - 2 * 3600
+        self.assertIsNone(self.sb.cached_segment(manifest, "weather", now, SETTINGS))
+        self.assertIsNotNone(self.sb.cached_segment(manifest, "greeting", now, SETTINGS))
+
+
+if __name__ == "__main__":
+    unittest.main()
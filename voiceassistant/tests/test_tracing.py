@@ -0,0 +1,103 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import tracing
+
+
+class PercentileTest(unittest.TestCase):
+    def test_interpolates_between_ranks(self):
+        values = list(range(1, 101))
+        self.assertEqual(tracing.percentile(values, 50), 50.5)
+        self.assertAlmostEqual(tracing.percentile(values, 95), 95.05)
+        self.assertEqual(tracing.percentile([7], 95), 7)
+        self.assertIsNone(tracing.percentile([], 50))
+
+    def test_summary(self):
+        summary = tracing.summarize({"match": [3, 1, 2], "ack": []})
+        self.assertEqual(summary, {"match": {"n": 3, "p50": 2.0, "p95": 2.9}})
+        self.assertEqual(tracing.format_summary(summary), "match p50=2.0ms p95=2.9ms (n=3)")
+
+
+class TracerTest(unittest.TestCase):
+    def trace_file(self):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def tracer(self, path=None, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracer = tracing.Tracer(path, **kwargs)
+        if tracer._file:
+            self.addCleanup(tracer._file.close)
+        return tracer
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = self.tracer()
+        tracer.begin()
+        tracer.span("match", 0.0, 0.01)
+        tracer.end(time.monotonic())
+        self.assertEqual(tracer.summary(), {})
+
+    def test_spans_go_to_the_trace_file(self):
+        path = self.trace_file()
+        tracer = self.tracer(path)
+        utt = tracer.begin()
+        tracer.span("vosk_final", 1.0, 1.25, text="leo lights")
+        tracer.event("debounce", accepted=True)
+        tracer.end(time.monotonic() - 0.5, phrase="leo lights")
+        tracer._file.flush()
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["span"] for r in records], ["vosk_final", "debounce", "utterance"])
+        self.assertEqual({r["utt"] for r in records}, {utt})
+        self.assertEqual(records[0]["dur_ms"], 250.0)
+        self.assertEqual(records[0]["text"], "leo lights")
+        self.assertNotIn("dur_ms", records[1])
+        self.assertGreaterEqual(records[2]["dur_ms"], 500)
+        self.assertEqual(tracing.load_durations(path), {"vosk_final": [250.0], "utterance": [records[2]["dur_ms"]]})
+
+    def test_listener_gets_spans_and_durations_are_summarised_without_a_file(self):
+        tracer = self.tracer(summary_every=2)
+        received = []
+        tracer.listener = received.append
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for match_s in (0.010, 0.030):
+                tracer.begin()
+                tracer.span("match", 0.0, match_s)
+                with tracer.measure("command", action="lights") as attrs:
+                    attrs["exit"] = 0
+                tracer.end(time.monotonic(), phrase="leo lights")
+        self.assertEqual([r["spans"]["match"] for r in received], [10.0, 30.0])
+        self.assertEqual(set(received[0]["spans"]), {"match", "command", "utterance"})
+        self.assertEqual(received[1]["phrase"], "leo lights")
+        summary = tracer.summary()
+        self.assertEqual(summary["match"], {"n": 2, "p50": 20.0, "p95": 29.0})
+        self.assertEqual(summary["command"]["n"], 2)
+        self.assertEqual(summary["utterance"]["n"], 2)
+        self.assertIn("TRACE SUMMARY: match p50=20.0ms p95=29.0ms (n=2)", out.getvalue())
+
+    def test_measure_records_a_failed_stage(self):
+        path = self.trace_file()
+        tracer = self.tracer(path)
+        tracer.begin()
+        with self.assertRaises(RuntimeError):
+            with tracer.measure("command", action="lights") as attrs:
+                attrs["step"] = 1
+                raise RuntimeError("boom")
+        tracer._file.flush()
+        with open(path) as f:
+            record = json.loads(f.readline())
+        self.assertEqual((record["span"], record["action"], record["step"]), ("command", "lights", 1))
+        self.assertEqual(tracer.summary()["command"]["n"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
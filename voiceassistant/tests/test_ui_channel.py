@@ -0,0 +1,131 @@
+import contextlib
+import io
+import os
+import socket
+import threading
+import time
+import unittest
+import unittest.mock
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import ui_channel
+
+
+class FrameReaderTest(unittest.TestCase):
+    def test_reassembles_frames_split_anywhere(self):
+        messages = [{"type": "text", "text": "leo status report", "final": True},
+                    {"type": "state", "state": "listening"},
+                    {"type": "match", "text": "naïve café", "label": None}]
+        stream = b"".join(ui_channel.encode(m) for m in messages)
+        for size in (1, 2, 3, 5, 7, len(stream)):
+            with self.subTest(size=size):
+                reader = ui_channel.FrameReader()
+                received = []
+                for i in range(0, len(stream), size):
+                    received += reader.feed(stream[i:i + size])
+                self.assertEqual(received, messages)
+
+    def test_header_split_from_body(self):
+        frame = ui_channel.encode({"type": "state", "state": "active"})
+        reader = ui_channel.FrameReader()
+        self.assertEqual(reader.feed(frame[:3]), [])
+        self.assertEqual(reader.feed(frame[3:4]), [])
+        self.assertEqual(reader.feed(frame[4:] + frame[:2]), [{"type": "state", "state": "active"}])
+        self.assertEqual(reader.feed(frame[2:]), [{"type": "state", "state": "active"}])
+
+    def test_oversize_frame_is_an_error(self):
+        reader = ui_channel.FrameReader()
+        with self.assertRaises(ValueError):
+            reader.feed(ui_channel.HEADER.pack(ui_channel.MAX_FRAME + 1) + b"{")
+        self.assertEqual(ui_channel.FrameReader().feed(ui_channel.HEADER.pack(ui_channel.MAX_FRAME)), [])
+
+
+class ChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.ours, self.theirs = socket.socketpair()
+        self.addCleanup(self.ours.close)
+        self.addCleanup(self.theirs.close)
+        self.started = []
+        self.addCleanup(self.hang_up)
+
+    def start(self, channel):
+        self.started.append(channel)
+        return channel.start()
+
+    def hang_up(self):
+        """Closes our end as main.js would, and waits for the read loops to see it."""
+        self.theirs.shutdown(socket.SHUT_WR)
+        deadline = time.monotonic() + 5
+        while not all(c.closed for c in self.started) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for channel in self.started:
+            if channel.sock is not self.ours:
+                channel.sock.close()
+
+    def test_dispatches_to_handlers_by_type(self):
+        channel = ui_channel.Channel(self.ours)
+        got, done = [], threading.Event()
+        channel.on("set_log_level", got.append)
+        channel.on("settings_changed", lambda m: (got.append(m), done.set()))
+        self.start(channel)
+        frames = b"".join(ui_channel.encode(m) for m in (
+            {"type": "set_log_level", "level": "debug"},
+            {"type": "unknown"},
+            {"type": "settings_changed", "keys": ["voice_path"]}))
+        self.theirs.sendall(frames[:5])
+        self.theirs.sendall(frames[5:])
+        self.assertTrue(done.wait(5))
+        self.assertEqual(got, [{"type": "set_log_level", "level": "debug"},
+                               {"type": "settings_changed", "keys": ["voice_path"]}])
+
+    def test_handler_error_does_not_stop_the_channel(self):
+        channel = ui_channel.Channel(self.ours)
+        done = threading.Event()
+        calls = []
+
+        def handler(message):
+            calls.append(message["n"])
+            if message["n"] == 1:
+                raise KeyError("bad")
+            done.set()
+        channel.on("ping", handler)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.start(channel)
+            self.theirs.sendall(ui_channel.encode({"type": "ping", "n": 1}) + ui_channel.encode({"type": "ping", "n": 2}))
+            self.assertTrue(done.wait(5))
+        self.assertEqual(calls, [1, 2])
+        self.assertIn("handler error", out.getvalue())
+
+    def test_send_and_close(self):
+        channel = ui_channel.Channel(self.ours)
+        channel.send("state", state="speaking")
+        reader = ui_channel.FrameReader()
+        self.assertEqual(reader.feed(self.theirs.recv(65536)), [{"type": "state", "state": "speaking"}])
+
+        # main.js going away ends the read loop and closes the channel.
+        self.start(channel)
+        self.hang_up()
+        self.assertTrue(channel.closed)
+        channel.send("state", state="listening")  # ignored once closed
+
+    def test_connect_without_fd_is_a_null_channel(self):
+        with unittest.mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("LCARS_IPC_FD", None)
+            channel = ui_channel.connect()
+        self.assertIsInstance(channel, ui_channel.NullChannel)
+        self.assertTrue(channel.closed)
+        channel.send("state", state="active")
+
+    def test_connect_takes_the_fd_from_the_environment(self):
+        fd = os.dup(self.ours.fileno())
+        with unittest.mock.patch.dict(os.environ, {"LCARS_IPC_FD": str(fd)}):
+            channel = ui_channel.connect()
+            self.assertNotIn("LCARS_IPC_FD", os.environ)
+        self.started.append(channel)
+        self.assertFalse(os.get_inheritable(fd))
+        channel.send("state", state="active")
+        self.assertEqual(ui_channel.FrameReader().feed(self.theirs.recv(65536)), [{"type": "state", "state": "active"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import contextlib
+import io
+import json
+import threading
+import time
+import unittest
+
+from helpers import load_script
+import audio_bus
+
+END = b"."  # a chunk of silence: the fake recognizers finalise on it
+
+
+class FakeRecognizer:
+    """Hears each chunk as one word (its bytes); a silence chunk ends the utterance."""
+    def __init__(self, grammar=None):
+        self.vocabulary = json.loads(grammar) if grammar else None
+        self.words = []
+
+    def AcceptWaveform(self, data):
+        if data == END:
+            return True
+        word = data.decode()
+        if self.vocabulary is None or word in self.vocabulary:
+            self.words.append(word)
+        return False
+
+    def _text(self):
+        text, self.words = " ".join(self.words), []
+        return text
+
+    def Result(self):
+        return json.dumps({"text": self._text()})
+
+    FinalResult = Result
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(self.words)})
+
+    def Reset(self):
+        self.words = []
+
+
+class DebugLogTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.vc = load_script("voice-command.py", "voice_command", settings={"voice_log_level": "debug"})
+
+    def tearDown(self):
+        self.vc.log_level = "debug"
+
+    def test_debug_prints_at_debug_level(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.vc.debug("hello")
+        self.assertEqual(out.getvalue(), "DEBUG: hello\n")
+
+    def test_debug_silent_at_info_level(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.vc.set_log_level({"type": "set_log_level", "level": "info"})
+            self.vc.debug("hidden")
+        self.assertNotIn("hidden", out.getvalue())
+
+
+class DebounceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.vc = load_script("voice-command.py", "voice_command_debounce",
+                             settings={"command_debounce": {"music:skip": 60}})
+
+    def setUp(self):
+        self.vc.reset_state()
+
+    def test_same_speech_fires_once(self):
+        accept = self.vc.accept_trigger
+        self.assertTrue(accept("leo lights", 10.0, 11.0))
+        self.assertFalse(accept("leo lights", 10.0, 11.5))   # the same utterance matched again
+        self.assertFalse(accept("leo lights", 10.5, 12.0))   # audio that began before it ended
+        self.assertTrue(accept("leo lights", 11.25, 12.5))   # said again straight away
+
+    def test_commands_are_debounced_separately(self):
+        self.assertTrue(self.vc.accept_trigger("leo lights", 10.0, 11.0))
+        self.assertTrue(self.vc.accept_trigger("music:pause", 10.0, 11.0))
+
+    def test_configured_window(self):
+        self.assertTrue(self.vc.accept_trigger("music:skip", 10.0, 11.0))
+        self.assertFalse(self.vc.accept_trigger("music:skip", 20.0, 21.0))
+        self.assertTrue(self.vc.accept_trigger("leo lights", 20.0, 21.0))
+
+
+class NameBargeInTest(unittest.TestCase):
+    def setUp(self):
+        self.vc = load_script("voice-command.py", "voice_command_barge_in", settings={"assistant_name": "Leo"})
+        self.vc.EARLY_DISPATCH = False
+        self.vc.PROFILE = dict(self.vc.PROFILE, chunk_frames=16)  # 1 ms chunks
+        self.vc.new_recognizer = lambda model, grammar=None: FakeRecognizer(grammar)
+        self.heard = []
+        self.vc.handle_text = lambda text, heard_at, words=None, heard_from=None: self.heard.append(text)
+
+    def publish(self, bus, *words):
+        for word in words:
+            bus.publish(word)
+            time.sleep(0.005)
+
+    def wait_caught_up(self, reader, bus):
+        deadline = time.monotonic() + 5
+        while reader.seq < bus._next_seq and time.monotonic() < deadline:
+            time.sleep(0.005)
+        time.sleep(0.02)  # the last chunk read is processed too
+
+    def test_name_and_command_spoken_over_our_speech_are_decoded(self):
+        bus = audio_bus.AudioBus(stream=None)
+        command_reader, keyword_reader = bus.reader(), bus.reader()
+        interrupted = threading.Event()
+        token = self.vc.GATE.begin(on_interrupt=interrupted.set)  # the assistant is talking
+
+        # The command reader gets to the gated chunks first and drops them.
+        listener = threading.Thread(target=self.vc.listen, args=(command_reader, FakeRecognizer()))
+        listener.start()
+        self.publish(bus, b"echo", b"leo", b"what", b"time")
+        self.wait_caught_up(command_reader, bus)
+        self.assertEqual(self.heard, [])
+
+        # Only then does the keyword reader hear the name and open the gate.
+        threading.Thread(target=self.vc.barge_in_monitor, args=(None, keyword_reader), daemon=True).start()
+        self.assertTrue(interrupted.wait(5))
+        self.vc.GATE.end(token)
+
+        self.publish(bus, b"is", b"it", END)
+        self.wait_caught_up(command_reader, bus)
+        bus.close()
+        listener.join(5)
+        self.assertEqual(self.heard, ["leo what time is it"])
+
+
+if __name__ == "__main__":
+    unittest.main()
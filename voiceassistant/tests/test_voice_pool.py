@@ -0,0 +1,75 @@
+import unittest
+import unittest.mock
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import voice_pool
+
+COSTS = {"a.onnx": 150, "b.onnx": 100, "c.onnx": 200, "d.onnx": 350, "big.onnx": 500}
+
+
+class FakeVoice:
+    def __init__(self, path):
+        self.path = path
+        self.mapped_data = None
+        self.cost_mb = 0.0
+
+    def synthesize(self, text, speaker_id=None, volume=1.0):
+        return iter(())
+
+
+class FakeMemory:
+    """Private memory grows by the voice's cost each time one is opened."""
+    def __init__(self):
+        self.mb = 300.0
+
+    def open_voice(self, path, load_path, data=None):
+        self.mb += COSTS[path]
+        return FakeVoice(path)
+
+
+class VoicePoolTest(unittest.TestCase):
+    def setUp(self):
+        memory = FakeMemory()
+        patches = [unittest.mock.patch.object(voice_pool, "open_voice", memory.open_voice),
+                   unittest.mock.patch.object(voice_pool, "anon_mb", lambda: memory.mb)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.pool = voice_pool.VoicePool(budget_mb=400, mmap=False)
+
+    def paths(self):
+        return [path for path, _ in self.pool.loaded()]
+
+    def test_cost_is_the_memory_added_by_loading(self):
+        self.pool.get("a.onnx")
+        self.assertEqual(self.pool.loaded(), [("a.onnx", 150)])
+
+    def test_least_recently_used_is_evicted_first(self):
+        self.pool.get("a.onnx")
+        self.pool.get("b.onnx")
+        self.pool.get("a.onnx")  # a is now the most recently used
+        self.assertEqual(self.paths(), ["b.onnx", "a.onnx"])
+        self.pool.get("c.onnx")  # 450 MB: b goes, a stays
+        self.assertEqual(self.paths(), ["a.onnx", "c.onnx"])
+        self.assertLessEqual(self.pool.total_mb(), 400)
+
+    def test_evicts_until_under_budget(self):
+        self.pool.get("a.onnx")
+        self.pool.get("b.onnx")
+        self.pool.get("d.onnx")  # 600 MB: dropping a alone still leaves 450
+        self.assertEqual(self.paths(), ["d.onnx"])
+
+    def test_newest_voice_kept_even_over_budget(self):
+        self.pool.get("a.onnx")
+        voice = self.pool.get("big.onnx")
+        self.assertEqual(self.paths(), ["big.onnx"])
+        self.assertIs(self.pool.get("big.onnx"), voice)
+
+    def test_loaded_voice_is_reused(self):
+        first = self.pool.get("a.onnx")
+        self.assertIs(self.pool.get("a.onnx"), first)
+        self.assertEqual(self.pool.total_mb(), 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
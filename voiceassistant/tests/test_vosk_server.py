@@ -0,0 +1,147 @@
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+
+import helpers  # noqa: F401  (puts voiceassistant/ on sys.path)
+import vosk_server
+
+
+def serve(path, handler):
+    """Accepts one connection on a private socket at `path` and hands it to handler in a thread."""
+    sock = vosk_server.listen(path)
+
+    def run():
+        conn, _ = sock.accept()
+        with conn:
+            handler(conn)
+    threading.Thread(target=run, daemon=True).start()
+    return sock
+
+
+class SocketTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = vosk_server.private_dir(tempfile.mkdtemp(prefix="lcars-vosk-test-"))
+        self.path = os.path.join(self.dir, "vosk.sock")
+
+    def test_socket_is_private(self):
+        with vosk_server.listen(self.path):
+            self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_default_path_uses_runtime_dir(self):
+        old = os.environ.get("XDG_RUNTIME_DIR")
+        os.environ["XDG_RUNTIME_DIR"] = self.dir
+        try:
+            self.assertEqual(vosk_server.default_socket_path(), os.path.join(self.dir, vosk_server.SOCKET_NAME))
+        finally:
+            if old is None:
+                os.environ.pop("XDG_RUNTIME_DIR")
+            else:
+                os.environ["XDG_RUNTIME_DIR"] = old
+
+    def test_shared_directory_refused(self):
+        os.chmod(self.dir, 0o777)
+        with self.assertRaises(PermissionError):
+            vosk_server.private_dir(self.dir)
+
+    def test_live_socket_not_replaced(self):
+        with vosk_server.listen(self.path):
+            with self.assertRaises(RuntimeError):
+                vosk_server.listen(self.path)
+            self.assertTrue(os.path.exists(self.path))
+
+    def test_stale_socket_replaced(self):
+        vosk_server.listen(self.path).close()  # bound but no longer listening, like after a crash
+        with vosk_server.listen(self.path):
+            pass
+
+    def test_regular_file_not_removed(self):
+        with open(self.path, "w") as f:
+            f.write("keep")
+        with self.assertRaises(PermissionError):
+            vosk_server.listen(self.path)
+        self.assertTrue(os.path.isfile(self.path))
+
+    def test_client_checks_server_uid(self):
+        with vosk_server.listen(self.path):
+            with vosk_server.connect(self.path, 1.0) as sock:
+                self.assertEqual(vosk_server.peer_uid(sock), os.getuid())
+
+    def test_group_socket(self):
+        with vosk_server.listen(self.path, gid=os.getgid()):
+            st = os.stat(self.path)
+            self.assertEqual(stat.S_IMODE(st.st_mode), 0o660)
+            self.assertEqual(st.st_gid, os.getgid())
+
+    def test_group_membership(self):
+        self.assertTrue(vosk_server.in_group(os.getuid(), os.getgid(), os.getgid()))
+        nobody = 65534
+        self.assertFalse(vosk_server.in_group(nobody, nobody, 0))
+
+    def test_shared_directory_must_not_be_writable_by_others(self):
+        shared = os.path.join(self.dir, "shared")
+        vosk_server.shared_dir(shared, os.getgid())
+        self.assertEqual(stat.S_IMODE(os.stat(shared).st_mode), 0o750)
+        os.chmod(shared, 0o770)
+        with self.assertRaises(PermissionError):
+            vosk_server.shared_dir(shared, os.getgid())
+
+    def test_server_admits_own_user_and_group_members_only(self):
+        server = vosk_server.RecognitionServer.__new__(vosk_server.RecognitionServer)
+        server.gid = 4242
+        a, b = socket.socketpair()
+        with a, b:
+            self.assertTrue(server.allowed(a))
+            with unittest.mock.patch.object(vosk_server, "peer_creds", lambda sock: (1, 65534, 4242)):
+                self.assertTrue(server.allowed(a))
+            with unittest.mock.patch.object(vosk_server, "peer_creds", lambda sock: (1, 65534, 65534)):
+                self.assertFalse(server.allowed(a))
+                server.gid = None
+                self.assertFalse(server.allowed(a))
+
+    @unittest.skipUnless(os.getuid() == 0, "needs root to give a directory to another user")
+    def test_client_trusts_owner_of_protected_directory(self):
+        shared = os.path.join(self.dir, "shared")
+        os.mkdir(shared, 0o755)
+        os.chown(shared, 65534, -1)
+        path = os.path.join(shared, vosk_server.SOCKET_NAME)
+        self.assertEqual(vosk_server.trusted_server_uids(path), {os.getuid(), 65534})
+        os.chmod(shared, 0o777)  # anyone could have put a socket there
+        self.assertEqual(vosk_server.trusted_server_uids(path), {os.getuid()})
+
+    def test_recognizer_round_trip(self):
+        def handler(conn):
+            while True:
+                try:
+                    kind, payload = vosk_server.recv_msg(conn)
+                except ConnectionError:
+                    return
+                if kind == b"A":
+                    vosk_server.send_msg(conn, b"R", {"final": True, "result": '{"text": "hello"}'})
+                else:
+                    vosk_server.send_msg(conn, b"K")
+        with serve(self.path, handler):
+            model = vosk_server.RemoteModel.__new__(vosk_server.RemoteModel)
+            model.socket_path, model.timeout, model.call_timeout = self.path, 1.0, 1.0
+            rec = vosk_server.RemoteRecognizer(model, 16000)
+            self.assertTrue(rec.AcceptWaveform(b"\0\0"))
+            self.assertEqual(rec.Result(), '{"text": "hello"}')
+            rec.close()
+
+    def test_hung_server_times_out(self):
+        released = threading.Event()
+        with serve(self.path, lambda conn: released.wait(5)):
+            model = vosk_server.RemoteModel(self.path, timeout=1.0, call_timeout=0.2)
+            started = time.monotonic()
+            with self.assertRaises(ConnectionError):
+                vosk_server.RemoteRecognizer(model, 16000)
+            self.assertLess(time.monotonic() - started, 2.0)
+            released.set()
+
+
+if __name__ == "__main__":
+    unittest.main()
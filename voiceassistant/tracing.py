@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Latency spans for the voice pipeline.
+
+Each recognised utterance gets an id, and every stage between audio
+arriving and the command finishing is recorded as a span:
+
+    audio       first chunk after the previous final result -> chunk that completed it
+    vosk_final  AcceptWaveform() call that returned the final result
+    debounce    instant; accepted or rejected
+    match       phrase matching
+    ack         acknowledgement synthesis and playback
+    command     action / shell command execution
+    utterance   final chunk arrival -> command finished (end to end)
+
+Spans go to a JSONL file (one object per line) and/or a listener (the UI),
+and p50/p95 per stage is printed every few utterances either way. Run this module on a trace file
+for the same summary offline:
+
+    python3 tracing.py ~/.config/lcars-terminal/voice-trace.jsonl
+"""
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+MAX_FILE_BYTES = 10 * 1024 * 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(durations):
+    """{stage: [ms, ...]} -> {stage: {"n", "p50", "p95"}}"""
+    return {stage: {"n": len(values),
+                    "p50": round(percentile(values, 50), 1),
+                    "p95": round(percentile(values, 95), 1)}
+            for stage, values in durations.items() if values}
+
+
+def format_summary(summary):
+    return " | ".join(f"{stage} p50={s['p50']}ms p95={s['p95']}ms (n={s['n']})"
+                      for stage, s in summary.items())
+
+
+class Tracer:
+    def __init__(self, path=None, summary_every=20, window=500):
+        self.path = path
+        self.enabled = bool(path)
+        # listener(record) gets each finished utterance's span durations, trace file or not.
+        self.listener = None
+        self._spans = {}
+        self.summary_every = summary_every
+        self.utt = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._utterances = 0
+        self._file = None
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", buffering=1)
+            print(f"Latency trace: {path}")
+
+    def begin(self):
+        """Starts a new utterance and returns its id."""
+        self.utt = next(self._ids)
+        return self.utt
+
+    def _write(self, record):
+        with self._lock:
+            if self._file.tell() > MAX_FILE_BYTES:
+                self._file.close()
+                os.replace(self.path, self.path + ".1")
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(json.dumps(record) + "\n")
+
+    def span(self, name, start, end, utt=None, **attrs):
+        """Records a span from two time.monotonic() readings."""
+        if not self.enabled and not self.listener:
+            return
+        dur_ms = (end - start) * 1000
+        with self._lock:
+            self._durations[name].append(dur_ms)
+        if self.listener:
+            self._collect(utt or self.utt, name, dur_ms)
+        if not self.enabled:
+            return
+        record = {"ts": time.time(), "utt": utt or self.utt, "span": name,
+                  "start": round(start, 6), "dur_ms": round(dur_ms, 2)}
+        record.update(attrs)
+        self._write(record)
+
+    def event(self, name, utt=None, **attrs):
+        if not self.enabled:
+            return
+        record = {"ts": time.time(), "utt": utt or self.utt, "span": name, "start": round(time.monotonic(), 6)}
+        record.update(attrs)
+        self._write(record)
+
+    @contextmanager
+    def measure(self, name, **attrs):
+        start = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            self.span(name, start, time.monotonic(), **attrs)
+
+    def _collect(self, utt, name, dur_ms):
+        with self._lock:
+            self._spans.setdefault(utt, {})[name] = round(dur_ms, 2)
+            # Spans can arrive after their utterance ended (speech); keep only recent ones.
+            while len(self._spans) > 8:
+                del self._spans[next(iter(self._spans))]
+
+    def end(self, origin, **attrs):
+        """Closes the current utterance with its end-to-end span."""
+        if not self.enabled and not self.listener:
+            return
+        self.span("utterance", origin, time.monotonic(), **attrs)
+        if self.listener:
+            with self._lock:
+                spans = self._spans.pop(self.utt, {})
+            self.listener(dict(attrs, utt=self.utt, spans=spans))
+        self._utterances += 1
+        if self.summary_every and self._utterances % self.summary_every == 0:
+            print(f"TRACE SUMMARY: {format_summary(self.summary())}")
+
+    def summary(self):
+        with self._lock:
+            return summarize({k: list(v) for k, v in self._durations.items()})
+
+
+def load_durations(path):
+    durations = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "dur_ms" in record:
+                durations[record["span"]].append(record["dur_ms"])
+    return durations
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: tracing.py <trace.jsonl>")
+        sys.exit(1)
+    for stage, s in summarize(load_durations(sys.argv[1])).items():
+        print(f"{stage:12s} n={s['n']:<6d} p50={s['p50']:>9.1f} ms  p95={s['p95']:>9.1f} ms")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Whisper transcription of captain's logs.
+
+Used inline when a log is terminated and by `voice-command.py
+--transcribe-logs` to work through a backlog: every WAV in logs_dir without
+a .txt next to it is transcribed by a pool of worker processes, each of
+which loads the model once. Transcripts are written to a temporary file and
+renamed into place, so an interrupted run leaves no half-written .txt and
+simply picks up where it stopped next time.
+"""
+import multiprocessing
+import os
+import time
+import wave
+
+MODEL_NAME = "base"
+# A WAV modified more recently than this may still be recording.
+MIN_AGE_S = 30
+
+
+def model_source(base_dir, user_dir):
+    """Bundled model, then the user's copy, then the (downloaded) default."""
+    for root in (base_dir, user_dir):
+        path = os.path.join(root, "whisper-models", f"{MODEL_NAME}.pt")
+        if os.path.exists(path):
+            return path
+    return MODEL_NAME
+
+
+def load_model(base_dir, user_dir):
+    import whisper
+    source = model_source(base_dir, user_dir)
+    print(f"Loading Whisper model: {source}")
+    return whisper.load_model(source)
+
+
+def transcript_path(wav_path):
+    return os.path.splitext(wav_path)[0] + ".txt"
+
+
+def transcribe(model, wav_path):
+    """Writes wav_path's transcript next to it and returns the text."""
+    text = model.transcribe(wav_path)["text"].strip()
+    final_path = transcript_path(wav_path)
+    tmp_path = final_path + ".part"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, final_path)
+    return text
+
+
+def wav_duration(path):
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+
+def pending_logs(logs_dir, min_age_s=MIN_AGE_S):
+    """WAVs in logs_dir with no transcript yet, oldest first."""
+    if not os.path.isdir(logs_dir):
+        return []
+    now = time.time()
+    pending = []
+    for name in sorted(os.listdir(logs_dir)):
+        path = os.path.join(logs_dir, name)
+        if not name.lower().endswith(".wav") or os.path.exists(transcript_path(path)):
+            continue
+        if now - os.path.getmtime(path) < min_age_s:
+            print(f"Skipping {name}: modified in the last {min_age_s} s (still recording?)")
+            continue
+        pending.append(path)
+    return pending
+
+
+# --- WORKER POOL ---
+
+_worker_model = None
+
+
+def _init_worker(base_dir, user_dir, threads):
+    global _worker_model
+    import torch
+    # Workers split the cores between them instead of each using all of them.
+    torch.set_num_threads(threads)
+    _worker_model = load_model(base_dir, user_dir)
+
+
+def _transcribe_one(wav_path):
+    started = time.monotonic()
+    try:
+        transcribe(_worker_model, wav_path)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return wav_path, wav_duration(wav_path), time.monotonic() - started, error
+
+
+def default_workers():
+    # Each worker holds its own copy of the model (~150 MB for base).
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def transcribe_backlog(logs_dir, base_dir, user_dir, workers=None):
+    """Transcribes every pending log in logs_dir; returns a summary dict."""
+    pending = pending_logs(logs_dir)
+    summary = {"logs_dir": logs_dir, "files": len(pending), "done": 0, "failed": [],
+               "audio_s": 0.0, "wall_s": 0.0, "audio_s_per_wall_s": None}
+    if not pending:
+        print(f"No untranscribed logs in {logs_dir}")
+        return summary
+
+    workers = min(workers or default_workers(), len(pending))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Transcribing {len(pending)} logs with {workers} workers ({threads} threads each)")
+
+    started = time.monotonic()
+    # fork: the parent never imports torch, and the voice script must not be re-run per worker.
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(base_dir, user_dir, threads)) as pool:
+        for n, (path, audio_s, took_s, error) in enumerate(pool.imap_unordered(_transcribe_one, pending), 1):
+            name = os.path.basename(path)
+            if error:
+                summary["failed"].append(name)
+                print(f"[{n}/{len(pending)}] {name}: FAILED: {error}")
+                continue
+            summary["done"] += 1
+            summary["audio_s"] += audio_s
+            print(f"[{n}/{len(pending)}] {name}: {audio_s:.1f} s of audio in {took_s:.1f} s")
+
+    summary["wall_s"] = time.monotonic() - started
+    if summary["wall_s"] > 0:
+        summary["audio_s_per_wall_s"] = summary["audio_s"] / summary["wall_s"]
+    return summary
+
+
+def print_summary(summary):
+    print(f"TRANSCRIPTION SUMMARY: {summary['done']}/{summary['files']} logs, "
+          f"{summary['audio_s']:.1f} s of audio in {summary['wall_s']:.1f} s")
+    if summary["audio_s_per_wall_s"] is not None:
+        print(f"  throughput: {summary['audio_s_per_wall_s']:.2f} audio seconds per wall second")
+    if summary["failed"]:
+        print(f"  failed (will be retried next run): {', '.join(summary['failed'])}")
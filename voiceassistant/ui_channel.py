@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Structured message channel between the voice process and Electron (main.js).
+
+main.js starts the voice process with an extra socket on fd 3 and passes
+its number in LCARS_IPC_FD. Every message in either direction is a 4-byte
+big-endian length followed by that many bytes of UTF-8 JSON with a "type":
+
+    voice -> main  {"type": "state", "state": "starting" | "active" | "speaking" | "listening"}
+                   {"type": "text", "text": "leo status report", "final": true}
+                   {"type": "match", "text": "...", "label": "{assistant_name} status report" or null}
+                   {"type": "timing", "utt": 3, "phrase": "...", "spans": {"match": 0.4, ...}}
+    main -> voice  {"type": "set_log_level", "level": "debug" | "info"}
+                   {"type": "settings_changed", "keys": ["voice_path", ...]}
+
+Frames arrive whole however the socket splits the bytes, so nothing can be
+lost or cut in half the way a stdout marker could. The UI no longer has
+to scan log output, and stdout can stay a plain log.
+"""
+import json
+import os
+import socket
+import struct
+import threading
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 1 << 20
+
+
+def encode(message):
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+class FrameReader:
+    """Reassembles length-prefixed frames from arbitrary chunks."""
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        """Returns the messages completed by `chunk`; raises ValueError on a corrupt stream."""
+        self._buffer += chunk
+        messages = []
+        while len(self._buffer) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self._buffer)
+            if length > MAX_FRAME:
+                raise ValueError(f"frame of {length} bytes")
+            if len(self._buffer) < HEADER.size + length:
+                break
+            body = bytes(self._buffer[HEADER.size:HEADER.size + length])
+            del self._buffer[:HEADER.size + length]
+            messages.append(json.loads(body.decode("utf-8")))
+        return messages
+
+
+class Channel:
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def send(self, kind, **fields):
+        """Sends one message; a closed channel (main.js gone) is ignored."""
+        if self.closed:
+            return
+        frame = encode(dict(fields, type=kind))
+        try:
+            with self._lock:
+                self.sock.sendall(frame)
+        except OSError:
+            self.closed = True
+
+    def on(self, kind, handler):
+        """Calls handler(message) for every incoming message of this type."""
+        self._handlers[kind] = handler
+
+    def start(self):
+        threading.Thread(target=self._read_loop, name="ui-channel", daemon=True).start()
+        return self
+
+    def _read_loop(self):
+        reader = FrameReader()
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+                if not chunk:
+                    break
+                messages = reader.feed(chunk)
+            except (OSError, ValueError) as e:
+                print(f"UI channel closed: {e}")
+                break
+            for message in messages:
+                handler = self._handlers.get(message.get("type"))
+                if handler:
+                    try:
+                        handler(message)
+                    except Exception as e:
+                        print(f"UI channel handler error: {e}")
+        self.closed = True
+
+
+class NullChannel:
+    """Stand-in when the voice process runs without main.js (terminal, --replay)."""
+    closed = True
+
+    def send(self, kind, **fields):
+        pass
+
+    def on(self, kind, handler):
+        pass
+
+    def start(self):
+        return self
+
+
+def connect():
+    """The channel on LCARS_IPC_FD, or a NullChannel if there is none."""
+    fd = os.environ.pop("LCARS_IPC_FD", None)  # not inherited by commands we launch
+    if not fd:
+        return NullChannel()
+    try:
+        sock = socket.socket(fileno=int(fd))
+    except (OSError, ValueError) as e:
+        print(f"UI channel unavailable on fd {fd}: {e}")
+        return NullChannel()
+    os.set_inheritable(sock.fileno(), False)
+    return Channel(sock).start()
@@ -2,14 +2,38 @@
 import os
 import sys
 import json
+import argparse
 import socket
 import pyaudio
 import subprocess
 import time
 import random
+import re
 import pygame
 import shutil
+import threading
+import collections
 from vosk import Model, KaldiRecognizer
+import mpris_client
+import actions
+import tracing
+import audio_bus
+import speech
+import vosk_server
+import phrase_matcher
+import transcription
+import log_index
+import ui_channel
+import resource_monitor
+import voice_pool
+try:
+    import audio_out  # needs numpy
+except ImportError:
+    audio_out = None
+try:
+    import capture  # needs numpy
+except ImportError:
+    capture = None
 
 def ensure_ffmpeg_in_path():
     if shutil.which("ffmpeg"):
@@ -65,13 +89,40 @@ def load_json(path):
         print(f"Error loading JSON from {path}: {e}")
         return {}
 
-def speak(text):
-    # Reload settings to get volume
-    current_settings = load_json(SETTINGS_PATH)
-    volume = current_settings.get("voice_volume", 100)
-    vol_factor = float(volume) / 100.0
+# --- UI CHANNEL & LOG LEVEL ---
+# State changes, transcripts, matches and timings go to main.js as framed
+# messages (ui_channel.py), so stdout is only a log. DEBUG lines are printed
+# only at "voice_log_level": "debug"; main.js can switch the level at runtime.
+UI = ui_channel.connect()
+LOG_LEVELS = ("debug", "info")
+log_level = load_json(SETTINGS_PATH).get("voice_log_level", "info")
+
+def debug(message):
+    if log_level == "debug":
+        print(f"DEBUG: {message}")
+
+def set_log_level(message):
+    global log_level
+    if message.get("level") in LOG_LEVELS:
+        log_level = message["level"]
+        print(f"Log level: {log_level}")
+
+UI.on("set_log_level", set_log_level)
 
-    voice_path = SETTINGS.get("voice_path", "")
+def settings_changed(message):
+    """main.js saved voice or personality settings; load the new voice before it is needed."""
+    if VOICES:
+        VOICES.prewarm(voice_model_path(load_json(SETTINGS_PATH)))
+
+UI.on("settings_changed", settings_changed)
+UI.send("state", state="starting")
+
+def speak(text, priority=speech.RESULT, preempt=False, wait=False, on_played=None):
+    """Queues text for the speech thread (see speech.py)."""
+    return SPEECH.say(text, priority=priority, preempt=preempt, wait=wait, on_played=on_played)
+
+def voice_model_path(settings):
+    voice_path = settings.get("voice_path", "")
     if not voice_path:
         # Fallback
         voice_path = os.path.join(USER_DIR, "voices/LibriVox/libri.onnx")
@@ -79,7 +130,38 @@ def speak(text):
     # Handle relative paths
     if not os.path.isabs(voice_path):
         voice_path = os.path.join(USER_DIR, voice_path)
-        
+    return voice_path
+
+def play_speech(item):
+    text = item.text
+    # Reload settings to get volume and the current voice
+    current_settings = load_json(SETTINGS_PATH)
+    volume = current_settings.get("voice_volume", 100)
+    vol_factor = float(volume) / 100.0
+    voice_path = voice_model_path(current_settings)
+    speaker_id = current_settings.get("speaker_id", "0")
+
+    if VOICES and MIXER:
+        try:
+            voice = VOICES.get(voice_path)
+        except Exception as e:
+            print(f"Voice pool: cannot load {voice_path}, using piper: {e}")
+            voice = None
+        if voice:
+            try:
+                source = MIXER.open_stream("voice", gain=vol_factor)
+                item.on_cancel(source.stop)
+                token = GATE.begin(on_interrupt=item.cancel)
+                try:
+                    audio_out.stream_samples(voice.synthesize(text, speaker_id), voice.sample_rate,
+                                             source, MIXER.rate)
+                    source.wait()
+                finally:
+                    GATE.end(token)
+            except Exception as e:
+                print(f"Error speaking: {e}")
+            return
+
     piper_bin = os.path.join(SCRIPT_DIR, "piper/piper")
     
     # Check if piper exists
@@ -87,12 +169,11 @@ def speak(text):
         print(f"Error: Piper binary not found at {piper_bin}")
         return
 
-    # Check for speaker ID
-    speaker_id = SETTINGS.get("speaker_id", "0")
-    piper_cmd = [piper_bin, "--model", voice_path, "--output_file", "-"]
+    piper_cmd = [piper_bin, "--model", voice_path]
     
     # Check if model supports speakers
     voice_config = voice_path + ".json"
+    v_conf = {}
     if os.path.exists(voice_config):
         try:
             with open(voice_config, 'r') as f:
@@ -102,13 +183,36 @@ def speak(text):
         except:
             pass
 
+    # The gate keeps this stretch of microphone audio away from the
+    # recognizer, and a barge-in keyword can cut it short.
+    if MIXER:
+        try:
+            # Raw PCM straight into the shared output stream; volume is the source gain.
+            p2 = subprocess.Popen(piper_cmd + ["--output_raw"], stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            p2.stdin.write(text.encode() + b"\n")
+            p2.stdin.close()
+            source = MIXER.open_stream("voice", gain=vol_factor)
+            item.on_cancel(lambda: (source.stop(), p2.terminate()))
+            token = GATE.begin(on_interrupt=item.cancel)
+            try:
+                rate = v_conf.get("audio", {}).get("sample_rate", audio_out.RATE)
+                audio_out.stream_pcm(p2.stdout, rate, source, MIXER.rate)
+                p2.wait()
+                source.wait()
+            finally:
+                GATE.end(token)
+        except Exception as e:
+            print(f"Error speaking: {e}")
+        return
+
     try:
         # Echo text
         p1 = subprocess.Popen(["echo", text], stdout=subprocess.PIPE)
         
         # Piper
         p2 = subprocess.Popen(
-            piper_cmd,
+            piper_cmd + ["--output_file", "-"],
             stdin=p1.stdout,
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL
@@ -124,14 +228,21 @@ def speak(text):
         p2.stdout.close()
 
         # Aplay
-        subprocess.run(["aplay", "-q"], stdin=p3.stdout)
+        p4 = subprocess.Popen(["aplay", "-q"], stdin=p3.stdout)
         p3.stdout.close()
+        item.on_cancel(lambda: [p.terminate() for p in (p2, p3, p4)])
+        token = GATE.begin(on_interrupt=item.cancel)
+        try:
+            p4.wait()
+        finally:
+            GATE.end(token)
         
     except Exception as e:
         print(f"Error speaking: {e}")
 
 # --- INITIALIZATION ---
-print(f"DEBUG: SETTINGS_PATH = {SETTINGS_PATH}")
+SPEECH = speech.SpeechQueue(play_speech, on_state=lambda state: UI.send("state", state=state))
+debug(f"SETTINGS_PATH = {SETTINGS_PATH}")
 COMMANDS = load_json(COMMANDS_PATH)
 
 # --- MIGRATION: Fix old python paths in commands.json ---
@@ -162,11 +273,61 @@ if needs_save:
         print(f"Error saving migrated commands: {e}")
 
 SETTINGS = load_json(SETTINGS_PATH)
-print(f"DEBUG: Loaded Settings: {SETTINGS.keys()}")
-sys.stderr = open(os.devnull, "w")
+debug(f"Loaded Settings: {SETTINGS.keys()}")
+
+# --- LATENCY TRACE ---
+# Per-stage spans for every utterance, enabled with "latency_trace": true
+# (or LCARS_TRACE_FILE=/path/to/trace.jsonl).
+TRACE_PATH = os.environ.get("LCARS_TRACE_FILE")
+if not TRACE_PATH and SETTINGS.get("latency_trace", False):
+    TRACE_PATH = os.path.join(USER_DIR, "voice-trace.jsonl")
+TRACER = tracing.Tracer(TRACE_PATH)
+SPEECH.tracer = TRACER
+if not UI.closed:
+    TRACER.listener = lambda record: UI.send("timing", **record)
+
+# --- LATENCY PROFILE ---
+# "latency_profile" picks capture block size and Vosk endpointing. Smaller blocks and a shorter end-of-utterance silence
+# answer sooner but wake the decoder more often. Individual values can be
+# overridden with "capture_chunk_frames", "capture_buffer_frames",
+# "vosk_endpointer_mode" and "vosk_endpointer_delays" ([start_max, end, max]
+# seconds). Compare profiles with --replay --profile NAME and the trace.
+LATENCY_PROFILES = {
+    "low_latency": {"chunk_frames": 1600, "buffer_frames": 3200, "endpointer_mode": "short",
+                    "endpointer_delays": None},
+    "balanced": {"chunk_frames": 4000, "buffer_frames": 8000, "endpointer_mode": None,
+                 "endpointer_delays": None},
+    "low_cpu": {"chunk_frames": 8000, "buffer_frames": 16000, "endpointer_mode": None,
+                "endpointer_delays": None},
+}
+
+def latency_profile(settings, name=None):
+    name = name or settings.get("latency_profile", "balanced")
+    if name not in LATENCY_PROFILES:
+        print(f"Unknown latency_profile '{name}', using balanced")
+        name = "balanced"
+    profile = dict(LATENCY_PROFILES[name], name=name)
+    for key, setting in (("chunk_frames", "capture_chunk_frames"), ("buffer_frames", "capture_buffer_frames"),
+                         ("endpointer_mode", "vosk_endpointer_mode"), ("endpointer_delays", "vosk_endpointer_delays")):
+        if settings.get(setting) is not None:
+            profile[key] = settings[setting]
+    profile["buffer_frames"] = max(profile["buffer_frames"], profile["chunk_frames"])
+    return profile
+
+PROFILE = latency_profile(SETTINGS)
+print(f"Latency profile: {PROFILE['name']} ({PROFILE['chunk_frames']}-frame blocks)")
+
+# --- SELF-SPEECH GATE ---
+# Microphone audio captured while our own speech or sound effects play is not
+# decoded for commands; only the barge-in keywords are listened for.
+GATE = audio_bus.OutputGate(tail_s=SETTINGS.get("echo_tail_ms", 300) / 1000.0)
 
 # --- SOUND EFFECT SETUP ---
-pygame.mixer.init()
+# With the shared output stream (audio_out.py) every file in sounds/ is
+# decoded once at startup and mixed with speech; pygame is the fallback.
+MIXER = None
+SFX_BANK = None
+VOICES = None  # voice_pool.VoicePool when piper-tts is installed
 
 ACK_FILES = ["acknowledged1.mp3", "acknowledged2.mp3", "acknowledged3.mp3"]
 PAUSE_FILE = "pause.mp3"
@@ -188,61 +349,142 @@ def play_sfx(path_or_list):
     elif isinstance(path_or_list, str) and os.path.exists(path_or_list):
         target = path_or_list
     
-    if target:
-        try:
-            sfx = pygame.mixer.Sound(target)
-            sfx.set_volume(0.6)
-            sfx.play()
-        except Exception as e:
-            print(f"SFX Error: {e}")
+    if not target:
+        return
+
+    samples = SFX_BANK.get(target) if SFX_BANK else None
+    if MIXER and samples is not None:
+        volume = float(load_json(SETTINGS_PATH).get("voice_volume", 100)) / 100.0
+        MIXER.play(samples, "sfx", gain=0.6 * volume)
+        GATE.add(len(samples) / MIXER.rate)
+        return
+
+    try:
+        sfx = pygame.mixer.Sound(target)
+        sfx.set_volume(0.6)
+        sfx.play()
+        GATE.add(sfx.get_length())
+    except Exception as e:
+        print(f"SFX Error: {e}")
 
 # --- VOSK SETUP ---
-if not os.path.exists(MODEL_PATH):
-    print("Model not found!")
-    sys.exit(1)
+# With "recognition_server" (or LCARS_VOSK_SOCKET) set, recognizers live in the
+# shared vosk_server.py process and the model is never loaded here. `true`
+# means the server's default socket. If the server stops answering, the
+# recognizers switch to a locally loaded model.
+RECOGNITION_SERVER = os.environ.get("LCARS_VOSK_SOCKET") or SETTINGS.get("recognition_server")
+_local_model = None
+_local_model_lock = threading.Lock()
+
+def load_model():
+    if RECOGNITION_SERVER:
+        try:
+            model = vosk_server.RemoteModel(RECOGNITION_SERVER if isinstance(RECOGNITION_SERVER, str) else None)
+            print(f"Using recognition server at {model.socket_path}")
+            return model
+        except OSError as e:
+            print(f"Recognition server unavailable ({e}), loading model locally")
+    return local_model()
+
+def local_model():
+    """The in-process model, loaded once (also the fallback when the server is lost)."""
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            if not os.path.exists(MODEL_PATH):
+                print("Model not found!")
+                sys.exit(1)
+            _local_model = Model(MODEL_PATH)
+        return _local_model
 
-model = Model(MODEL_PATH)
-rec = KaldiRecognizer(model, 16000)
-rec.SetMaxAlternatives(0)
-rec.SetWords(True)
+def new_recognizer(model, grammar=None):
+    if isinstance(model, vosk_server.RemoteModel):
+        return vosk_server.RemoteRecognizer(model, 16000, grammar)
+    if grammar:
+        return KaldiRecognizer(model, 16000, grammar)
+    return KaldiRecognizer(model, 16000)
 
-p = pyaudio.PyAudio()
+def make_recognizer(model):
+    rec = new_recognizer(model)
+    rec.SetMaxAlternatives(0)
+    rec.SetWords(True)
+    # Endpointer controls need vosk >= 0.3.45; older builds keep Kaldi's defaults.
+    try:
+        if PROFILE["endpointer_mode"]:
+            from vosk import EndpointerMode
+            rec.SetEndpointerMode(EndpointerMode[PROFILE["endpointer_mode"].upper()])
+        if PROFILE["endpointer_delays"]:
+            rec.SetEndpointerDelays(*PROFILE["endpointer_delays"])
+    except (ImportError, AttributeError, KeyError, RuntimeError) as e:
+        print(f"Vosk endpointer settings not applied: {e}")
+    return rec
 
 # --- DEVICE SELECTION ---
-input_device_index = SETTINGS.get("input_device_index", None)
-device_name = "Default"
+# The microphone is opened at its native rate and channel count and converted
+# to 16 kHz mono in-process (capture.py), so devices that cannot run at 16 kHz
+# keep the chosen input_device_index. "capture_native_rate": false asks the
+# device for 16 kHz mono directly; "capture_channels" overrides the channel count.
+def open_input_stream(p):
+    input_device_index = SETTINGS.get("input_device_index", None)
+    device_name = "Default"
+
+    if input_device_index is not None:
+        try:
+            info = p.get_device_info_by_index(input_device_index)
+            device_name = info['name']
+        except:
+            input_device_index = None
+
+    if capture:
+        try:
+            stream, device_name = capture.open_stream(
+                p, pyaudio.paInt16, input_device_index, PROFILE["buffer_frames"],
+                native=SETTINGS.get("capture_native_rate", True), channels=SETTINGS.get("capture_channels"))
+            print(f"Systems Online. Listening on: {device_name}")
+            return stream
+        except Exception as e:
+            print(f"Fallback to default: {e}")
+            input_device_index = None
+            device_name = "Default"
 
-if input_device_index is not None:
     try:
-        info = p.get_device_info_by_index(input_device_index)
-        device_name = info['name']
-    except:
-        input_device_index = None
+        stream = p.open(format=pyaudio.paInt16, 
+                        channels=1, 
+                        rate=16000, 
+                        input=True, 
+                        input_device_index=input_device_index,
+                        frames_per_buffer=PROFILE["buffer_frames"])
+    except Exception as e:
+        print(f"Fallback to default: {e}")
+        stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=PROFILE["buffer_frames"])
 
-try:
-    stream = p.open(format=pyaudio.paInt16, 
-                    channels=1, 
-                    rate=16000, 
-                    input=True, 
-                    input_device_index=input_device_index,
-                    frames_per_buffer=8000)
-except Exception as e:
-    print(f"Fallback to default: {e}")
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-
-print(f"Systems Online. Listening on: {device_name}")
-
-# Wait for startup briefing to finish
-lock_file = "/tmp/lcars_briefing.lock"
-wait_count = 0
-while os.path.exists(lock_file) and wait_count < 60: # Wait max 60 seconds
-    time.sleep(1)
-    wait_count += 1
-
-print("<<VOICE_ACTIVE>>")
-speak("Voice interface initialised")
+    print(f"Systems Online. Listening on: {device_name}")
+    return stream
+
+# --- RESOURCE MONITOR ---
+# RSS, CPU, threads and open fds are sampled every "resource_sample_s"
+# seconds (default 300, 0 to turn off) into voice-resources.jsonl in the
+# config folder. "tracemalloc_top": N (or --tracemalloc N) adds the source
+# lines with the most allocation growth. SIGUSR1 samples at once and SIGUSR2
+# starts/stops the sampling profiler (see resource_monitor.py).
+def start_resource_monitor(tracemalloc_top=0):
+    monitor = resource_monitor.Monitor(
+        os.path.join(USER_DIR, "voice-resources.jsonl"),
+        interval_s=SETTINGS.get("resource_sample_s", 300),
+        tracemalloc_top=tracemalloc_top or SETTINGS.get("tracemalloc_top", 0)).start()
+    resource_monitor.install_signals(monitor, resource_monitor.SamplingProfiler(USER_DIR))
+    return monitor
+
+def wait_for_briefing():
+    # Wait for startup briefing to finish
+    lock_file = "/tmp/lcars_briefing.lock"
+    wait_count = 0
+    while os.path.exists(lock_file) and wait_count < 60: # Wait max 60 seconds
+        time.sleep(1)
+        wait_count += 1
 
 def acknowledge():
+    ack_start = time.monotonic()
     # RELOAD SETTINGS dynamically in case you changed them without restarting
     # (Optional safety measure)
     current_settings = load_json(SETTINGS_PATH)
@@ -254,8 +496,8 @@ def acknowledge():
         
         # Load Personality
         p_file = current_settings.get("personality_file")
-        print(f"DEBUG: USER_DIR: {USER_DIR}")
-        print(f"DEBUG: Original p_file from settings: {p_file}")
+        debug(f"USER_DIR: {USER_DIR}")
+        debug(f"Original p_file from settings: {p_file}")
         
         responses = ["On it!", "You got it.", "Executing command.", f"Yes, {rank}.", "Affirmative."]
         
@@ -264,19 +506,17 @@ def acknowledge():
             if not os.path.isabs(p_file):
                 p_file = os.path.join(USER_DIR, p_file)
             
-            print(f"DEBUG: Resolved p_file: {p_file}")
+            debug(f"Resolved p_file: {p_file}")
 
-        print(f"DEBUG: Final p_file to load: {p_file}")
+        debug(f"Final p_file to load: {p_file}")
         if p_file and os.path.exists(p_file):
             p_data = load_json(p_file)
-            print(f"DEBUG: Loaded personality data keys: {list(p_data.keys())}")
+            debug(f"Loaded personality data keys: {list(p_data.keys())}")
             if "acknowledgements" in p_data and p_data["acknowledgements"]:
                 responses = p_data["acknowledgements"]
-                print(f"DEBUG: Loaded {len(responses)} acknowledgements.")
+                debug(f"Loaded {len(responses)} acknowledgements.")
         else:
-            print("DEBUG: Failed to load personality file.")
-            if "acknowledgements" in p_data and p_data["acknowledgements"]:
-                responses = p_data["acknowledgements"]
+            debug("Failed to load personality file.")
 
         chosen = random.choice(responses)
         
@@ -292,308 +532,922 @@ def acknowledge():
                        .replace("{assistant_name}", assistant_name)\
                        .replace("{system_name}", socket.gethostname())
                        
-        speak(chosen)
+        # speak() only queues, so the span is recorded by the speech thread around the ack's playback.
+        utt = TRACER.utt
+        def played(item, started, ended):
+            TRACER.span("ack", started, ended, utt=utt, kind="speech", cancelled=item.cancelled)
+        speak(chosen, priority=speech.ACK, preempt=True, on_played=played)
     else:
+        SPEECH.preempt(speech.ACK)
         play_sfx(ACK_PATHS)
+        TRACER.span("ack", ack_start, time.monotonic(), kind="sfx")
 
-# --- MAIN LOOP ---
-is_logging = False
-is_paused = False
+# --- MEDIA CONTROL ---
+# One D-Bus connection for the life of the process. Player status is tracked
+# from signals, so no per-command `playerctl -l` / `status` round trips.
+# Falls back to playerctl if D-Bus (or jeepney) is unavailable.
+MPRIS = None
 paused_players = []
-log_text_file = None
-last_trigger_time = 0
 
-while True:
-    try:
-        data = stream.read(4000, exception_on_overflow=False)
-    except:
-        continue
-        
-    if len(data) == 0: break
+def preferred_player(settings):
+    return settings.get("preferred_music_player", "spotify").lower().replace(" ", "")
 
-    if rec.AcceptWaveform(data):
-        result = json.loads(rec.Result())
-        text = result.get("text", "").lower()
+def pause_music():
+    global paused_players
+    try:
+        if MPRIS:
+            currently_playing = MPRIS.playing()
+            for bus_name in currently_playing:
+                MPRIS.pause(bus_name)
+            if currently_playing:
+                paused_players = currently_playing
+                print(f"Paused specific players: {paused_players}")
+            else:
+                MPRIS.pause_all()
+        elif shutil.which("playerctl"):
+            players_output = subprocess.check_output(["playerctl", "-l"], text=True).strip().split('\n')
+            currently_playing = []
+            for p in players_output:
+                if not p: continue
+                try:
+                    status = subprocess.check_output(["playerctl", "-p", p, "status"], text=True).strip()
+                    if status == "Playing":
+                        currently_playing.append(p)
+                        subprocess.run(["playerctl", "-p", p, "pause"])
+                except: pass
+            
+            if currently_playing:
+                paused_players = currently_playing
+                print(f"Paused specific players: {paused_players}")
+            else:
+                subprocess.run(["playerctl", "-a", "pause"])
+    except Exception as e:
+        print(f"Media control error: {e}")
 
-        if not text: continue
-        
-        # --- GLOBAL DEBOUNCE CHECK ---
-        # If we just triggered a command less than 1.5 seconds ago, ignore everything.
-        if time.time() - last_trigger_time < 1.5:
-            continue
+def resume_music(settings):
+    global paused_players
+    try:
+        # Strategy 1: Resume remembered
+        if paused_players:
+            print(f"Resuming remembered players: {paused_players}")
+            for p in paused_players:
+                if MPRIS:
+                    MPRIS.play(p)
+                else:
+                    subprocess.run(["playerctl", "-p", p, "play"])
+            paused_players = []
+            return
 
-        print(f"I HEARD: '{text}'")
+        # Strategy 2: Preferred
+        pref = preferred_player(settings)
+        if MPRIS:
+            if not MPRIS.find(pref):
+                speak(f"Launching {pref}. Stand by.")
 
-        # --- BRANCH 1: CAPTAIN'S LOG ---
-        if is_logging:
-            clean_text = text
-            if "terminate" in clean_text and "log" in clean_text:
-                last_trigger_time = time.time() # LOCK THE DOOR
-                
-                is_logging = False
-                is_paused = False
-                
-                subprocess.run([os.path.join(BASE_DIR, "captains-log.sh"), "stop"])
-                speak("Log terminated. Processing audio.")
-                
-                try:
-                    with open("/tmp/current_log_path", "r") as f:
-                        wav_path = f.read().strip()
-                        final_txt_path = wav_path.replace(".wav", ".txt")
-                    
-                    if not shutil.which("ffmpeg"):
-                        speak("Transcription failed. FFmpeg is not installed.")
-                        print("ERROR: ffmpeg binary not found. Please install ffmpeg.")
-                        continue
-
-                    if not os.path.exists(wav_path):
-                        speak("Log recording failed. Audio file not found.")
-                        print(f"ERROR: Audio file not found at {wav_path}")
-                        continue
-
-                    import whisper
-                    # Check for bundled model first
-                    bundled_model_path = os.path.join(BASE_DIR, "whisper-models", "base.pt")
-                    user_model_path = os.path.join(USER_DIR, "whisper-models", "base.pt")
-                    
-                    if os.path.exists(bundled_model_path):
-                        print(f"Loading bundled Whisper model: {bundled_model_path}")
-                        model_whisper = whisper.load_model(bundled_model_path)
-                    elif os.path.exists(user_model_path):
-                        print(f"Loading local Whisper model: {user_model_path}")
-                        model_whisper = whisper.load_model(user_model_path)
-                    else:
-                        print("Local model not found, using default (may download)")
-                        model_whisper = whisper.load_model("base")
-                        
-                    result = model_whisper.transcribe(wav_path)
-                    with open(final_txt_path, "w") as f:
-                        f.write(result["text"].strip())
-                    speak("Transcription complete.")
-                except Exception as e:
-                    speak("Error during transcription.")
-                    print(f"TRANSCRIPTION ERROR: {e}")
-                    import traceback
-                    traceback.print_exc()
-                continue
-
-            elif "resume" in clean_text and "log" in clean_text:
-                last_trigger_time = time.time() # LOCK THE DOOR
-                is_paused = False
-                play_sfx(RESUME_PATH)
-                subprocess.run([os.path.join(BASE_DIR, "captains-log.sh"), "resume"])
-                speak("Resuming log.") 
-                continue
-
-            elif "pause" in clean_text and "log" in clean_text:
-                last_trigger_time = time.time() # LOCK THE DOOR
-                is_paused = True
-                play_sfx(PAUSE_PATH)
-                subprocess.run([os.path.join(BASE_DIR, "captains-log.sh"), "pause"])
-                speak("Log paused.")
-                continue
-            else:
-                continue 
-
-        # --- BRANCH 1.5: MUSIC CONTROL ---
-        # Load settings for dynamic name (needed for name detection)
-        # We assume local load checks are fast enough
-        m_settings = load_json(SETTINGS_PATH)
-        m_name = (m_settings.get("assistant_name") or "Leo").lower()
-        m_alts = [x.lower() for x in m_settings.get("phonetic_alternatives", [])]
-        m_valid_names = [m_name] + m_alts
-        
-        # Check if ANY valid name is in the text
-        if any(name in text for name in m_valid_names):
-            clean_text = text
+            def play(bus_name):
+                print(f"Sending play command to {bus_name}")
+                MPRIS.play(bus_name)
+            actions.with_player(ACTION_CTX, pref, play, on_missing=lambda: speak(f"Unable to launch {pref}."))
+        elif shutil.which("playerctl"):
+            # Check if preferred player is running
+            current_players = subprocess.check_output(["playerctl", "-l"], text=True).lower().split('\n')
             
-            # PAUSE
-            if "pause" in clean_text and ("music" in clean_text or "audio" in clean_text or "media" in clean_text or "playback" in clean_text):
-                last_trigger_time = time.time()
-                acknowledge()
-                
+            if any(pref in p for p in current_players if p):
+                print(f"Playing preferred (already running): {pref}")
+                subprocess.run(["playerctl", "-p", pref, "play"])
+            else:
+                print(f"Preferred player {pref} not running. Attempting to launch...")
+                speak(f"Launching {pref}. Stand by.")
                 try:
-                    if shutil.which("playerctl"):
-                        players_output = subprocess.check_output(["playerctl", "-l"], text=True).strip().split('\n')
-                        currently_playing = []
-                        for p in players_output:
-                            if not p: continue
-                            try:
-                                status = subprocess.check_output(["playerctl", "-p", p, "status"], text=True).strip()
-                                if status == "Playing":
-                                    currently_playing.append(p)
-                                    subprocess.run(["playerctl", "-p", p, "pause"])
-                            except: pass
-                        
-                        if currently_playing:
-                            paused_players = currently_playing
-                            print(f"Paused specific players: {paused_players}")
-                        else:
-                            subprocess.run(["playerctl", "-a", "pause"])
-                except Exception as e:
-                    print(f"Playerctl error: {e}")
-                
-                continue
+                    subprocess.Popen([pref], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    time.sleep(5) # Wait for startup
+                    print(f"Sending play command to {pref}")
+                    subprocess.run(["playerctl", "-p", pref, "play"])
+                except Exception as launch_err:
+                    print(f"Failed to launch {pref}: {launch_err}")
+                    speak(f"Unable to launch {pref}.")
+    except Exception as e:
+        print(f"Media control error: {e}")
 
-            # RESUME / PLAY
-            if ("play" in clean_text or "resume" in clean_text) and ("music" in clean_text or "audio" in clean_text or "playback" in clean_text or "spotify" in clean_text):
-                # EXCLUSIONS for specific playlist commands in commands.json
-                is_specific = "focus" in clean_text or "concentration" in clean_text or "nostalgic" in clean_text or "retro" in clean_text
-                
-                if not is_specific:
-                    last_trigger_time = time.time()
-                    acknowledge()
-                    
-                    try:
-                        if shutil.which("playerctl"):
-                            # Strategy 1: Resume remembered
-                            if paused_players:
-                                print(f"Resuming remembered players: {paused_players}")
-                                for p in paused_players:
-                                    subprocess.run(["playerctl", "-p", p, "play"])
-                                paused_players = []
-                            else:
-                                # Strategy 2: Preferred
-                                pref = m_settings.get("preferred_music_player", "spotify").lower().replace(" ", "")
-                                
-                                # Check if preferred player is running
-                                current_players = subprocess.check_output(["playerctl", "-l"], text=True).lower().split('\n')
-                                
-                                if any(pref in p for p in current_players if p):
-                                    print(f"Playing preferred (already running): {pref}")
-                                    subprocess.run(["playerctl", "-p", pref, "play"])
-                                else:
-                                    print(f"Preferred player {pref} not running. Attempting to launch...")
-                                    speak(f"Launching {pref}. Stand by.")
-                                    # Try to launch it
-                                    try:
-                                        subprocess.Popen([pref], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                                        time.sleep(5) # Wait for startup
-                                        print(f"Sending play command to {pref}")
-                                        subprocess.run(["playerctl", "-p", pref, "play"])
-                                    except Exception as launch_err:
-                                        print(f"Failed to launch {pref}: {launch_err}")
-                                        speak(f"Unable to launch {pref}.")
-                    except Exception as e:
-                        print(f"Playerctl error: {e}")
-                    
-                    continue
-
-            # SKIP
-            if ("next" in clean_text or "skip" in clean_text) and ("track" in clean_text or "song" in clean_text or "music" in clean_text):
-                last_trigger_time = time.time()
-                acknowledge()
-                
+def skip_track(settings):
+    try:
+        if MPRIS:
+            playing_now = MPRIS.playing() or MPRIS.find(preferred_player(settings))
+            for bus_name in playing_now:
+                MPRIS.next(bus_name)
+        elif shutil.which("playerctl"):
+            players_output = subprocess.check_output(["playerctl", "-l"], text=True).strip().split('\n')
+            playing_now = []
+            for p in players_output:
+                if not p: continue
                 try:
-                    if shutil.which("playerctl"):
-                        players_output = subprocess.check_output(["playerctl", "-l"], text=True).strip().split('\n')
-                        playing_now = []
-                        for p in players_output:
-                            if not p: continue
-                            try:
-                                status = subprocess.check_output(["playerctl", "-p", p, "status"], text=True).strip()
-                                if status == "Playing":
-                                    playing_now.append(p)
-                            except: pass
-                            
-                        if playing_now:
-                            for p in playing_now:
-                                subprocess.run(["playerctl", "-p", p, "next"])
-                        else:
-                             pref = m_settings.get("preferred_music_player", "spotify").lower().replace(" ", "")
-                             subprocess.run(["playerctl", "-p", pref, "next"])
-                except Exception as e:
-                    print(f"Playerctl error: {e}")
+                    status = subprocess.check_output(["playerctl", "-p", p, "status"], text=True).strip()
+                    if status == "Playing":
+                        playing_now.append(p)
+                except: pass
                 
-                continue
+            if playing_now:
+                for p in playing_now:
+                    subprocess.run(["playerctl", "-p", p, "next"])
+            else:
+                 subprocess.run(["playerctl", "-p", preferred_player(settings), "next"])
+    except Exception as e:
+        print(f"Media control error: {e}")
 
-        # --- BRANCH 2: COMMANDS ---
-        # Load settings for dynamic name
-        current_settings = load_json(SETTINGS_PATH)
-        assistant_name = (current_settings.get("assistant_name") or "Leo").lower()
-        phonetic_alternatives = [x.lower() for x in current_settings.get("phonetic_alternatives", [])]
-        
-        # Create a list of all valid names to check
-        valid_names = [assistant_name] + phonetic_alternatives
+# --- BUILT-IN ACTIONS ---
+# Built-in commands run in-process (calendar modes in a warm worker);
+# only user-defined commands go through the shell.
+CALENDAR = None
+ACTION_CTX = None
 
-        # Log for debugging (only if "play" is involved to avoid spam)
-        if "play" in text:
-             print(f"DEBUG: Processing potential play command: {text}")
+def fill_placeholders(command, settings, assistant_name):
+    rank = settings.get("user_rank") or "Captain"
+    name = settings.get("user_name") or "Bradly"
+    surname = settings.get("user_surname") or "User"
 
-        # Check if ANY valid name is in the text for special commands
-        name_detected = any(name in text for name in valid_names)
+    return command.replace("{user_rank}", rank)\
+                  .replace("{user_name}", name)\
+                  .replace("{user_surname}", surname)\
+                  .replace("{assistant_name}", assistant_name)\
+                  .replace("{USER_RANK}", rank)\
+                  .replace("{USER_NAME}", name)\
+                  .replace("{USER_SURNAME}", surname)\
+                  .replace("{ASSISTANT_NAME}", assistant_name)\
+                  .replace("{base_dir}", f'"{BASE_DIR}"')\
+                  .replace("{SYSTEM_NAME}", socket.gethostname())\
+                  .replace("{system_name}", socket.gethostname())
 
-        if name_detected and "captain's log" in text:
-            last_trigger_time = time.time() # LOCK THE DOOR
-            is_logging = True
-            is_paused = False
-            play_sfx(RESUME_PATH)
-            speak("Captain's log initiated.")
-            
-            # Get log directory from settings
-            logs_dir = current_settings.get("logs_dir", "~/Documents/CaptainsLogs")
-            logs_dir = os.path.expanduser(logs_dir)
+def run_command(phrase, command, settings, assistant_name, heard_at):
+    final_command = fill_placeholders(command, settings, assistant_name)
+
+    if "play_playlist" in command:
+         debug(f"Final Command: {final_command}")
+
+    steps = actions.resolve(command)
+    if steps:
+        fill = lambda arg: fill_placeholders(arg, settings, assistant_name)
+        if actions.run(steps, ACTION_CTX, settings, fill, heard_at, phrase):
+            return
+
+    print(f"LATENCY: '{phrase}' heard -> shell {(time.monotonic() - heard_at) * 1000:.0f} ms")
+    with TRACER.measure("command", action="shell"):
+        os.system(final_command)
+
+# --- CAPTAIN'S LOG ---
+# The log is written straight from the shared capture (see audio_bus.py):
+# one microphone open, pause/resume only gate the writer, nothing to concat.
+AUDIO_BUS = None
+LOG_WRITER = None
+last_log_path = None
+LOG_INDEX = None
+
+def logs_dir_setting(settings):
+    return os.path.expanduser(settings.get("logs_dir", "~/Documents/CaptainsLogs"))
+
+def open_log_index(logs_dir):
+    """Opens the transcript index and catches up on transcripts written while we were not running."""
+    global LOG_INDEX
+    try:
+        LOG_INDEX = log_index.LogIndex(os.path.join(USER_DIR, log_index.DB_NAME))
+        added, removed = LOG_INDEX.sync(logs_dir)
+        if added or removed:
+            print(f"Log index: {added} transcripts added, {removed} removed")
+    except Exception as e:
+        print(f"Log index unavailable: {e}")
+        LOG_INDEX = None
+
+def captains_log(action, *args):
+    global LOG_WRITER, last_log_path
+    if action == "start":
+        timestamp = time.strftime("%Y-%m-%d_%H-%M")
+        LOG_WRITER = audio_bus.LogWriter(AUDIO_BUS, os.path.join(args[0], f"log_{timestamp}.wav"))
+        print(f"Captain's log recording to {LOG_WRITER.path}")
+    elif LOG_WRITER is None:
+        return
+    elif action == "pause":
+        LOG_WRITER.pause()
+    elif action == "resume":
+        LOG_WRITER.resume()
+    elif action == "stop":
+        last_log_path = LOG_WRITER.stop()
+        LOG_WRITER = None
+
+def transcribe_log():
+    try:
+        wav_path = last_log_path
+        if not shutil.which("ffmpeg"):
+            speak("Transcription failed. FFmpeg is not installed.")
+            print("ERROR: ffmpeg binary not found. Please install ffmpeg.")
+            return
+
+        if not wav_path or not os.path.exists(wav_path):
+            speak("Log recording failed. Audio file not found.")
+            print(f"ERROR: Audio file not found at {wav_path}")
+            return
+
+        model_whisper = transcription.load_model(BASE_DIR, USER_DIR)
+        transcription.transcribe(model_whisper, wav_path)
+        if LOG_INDEX:
+            LOG_INDEX.add(transcription.transcript_path(wav_path))
+        speak("Transcription complete.")
+    except Exception as e:
+        speak("Error during transcription.")
+        print(f"TRANSCRIPTION ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+
+def shutdown():
+    speak("Shutting down. Goodbye.", wait=True)
+    sys.exit(0)
+
+# --- RECOGNITION & DISPATCH ---
+is_logging = False
+is_paused = False
+log_text_file = None
+last_triggered = {}  # label -> (time.time() it fired, arrival of the audio that fired it)
+
+def reset_state():
+    global is_logging, is_paused
+    is_logging = False
+    is_paused = False
+    last_triggered.clear()
+
+# --- DEBOUNCE ---
+# Our own speech never reaches the recognizer (see GATE), so there is no
+# global lock. Instead each command is debounced against the audio that last
+# fired it: a trigger is refused when its utterance began before that audio
+# ended, i.e. the same speech matched twice (an early dispatch and its final
+# result, or chunks re-fed after a barge-in). The window is as long as the
+# command took to say, so saying it again is always heard. A fixed window
+# can be added per label:
+#   "command_debounce": {"{assistant_name} next track": 0.5, "music:skip": 0.5}
+def debounce_window(label):
+    return SETTINGS.get("command_debounce", {}).get(label, 0)
+
+def accept_trigger(label, heard_from=None, heard_at=None):
+    """Whether `label` may fire for the utterance heard from `heard_from` to `heard_at` (monotonic)."""
+    now = time.time()
+    fired, fired_audio = last_triggered.get(label, (0, None))
+    same_audio = heard_from is not None and fired_audio is not None and heard_from < fired_audio
+    if same_audio or now - fired < debounce_window(label):
+        print(f"Debounced: {label}")
+        TRACER.event("debounce", accepted=False, phrase=label, same_audio=same_audio)
+        return False
+    last_triggered[label] = (now, heard_at)
+    TRACER.event("debounce", accepted=True, phrase=label)
+    return True
+
+# "find log about warp core", "search logs for the away team"
+LOG_SEARCH_PATTERN = re.compile(r"\b(?:find|search)(?: the| my)? logs? (?:about|for|mentioning) (.+)")
+
+# --- FUZZY MATCHING ---
+# When no phrase is an exact substring of what was heard but the assistant
+# was addressed, the closest commands.json phrase is accepted if it scores
+# at least "fuzzy_threshold" (0-1). "fuzzy_matching": false turns it off.
+_matcher = None
+_matcher_key = None
+
+def fuzzy_match(text, words, valid_names, settings):
+    global _matcher, _matcher_key
+    if not settings.get("fuzzy_matching", True):
+        return None
+    key = (tuple(valid_names), settings.get("fuzzy_threshold", 0.85), settings.get("fuzzy_budget_ms", 20))
+    if key != _matcher_key:
+        _matcher = phrase_matcher.PhraseMatcher(COMMANDS, valid_names, threshold=key[1], budget_ms=key[2])
+        _matcher_key = key
+    with TRACER.measure("fuzzy_match"):
+        best = _matcher.match(text, words)
+    if not best:
+        return None
+    print(f"FUZZY MATCH: '{text}' -> {best[0]} ({best[1]:.2f})")
+    return best[0]
+
+def handle_text(text, heard_at, words=None, heard_from=None):
+    """Runs one final transcript through the log, music and command branches.
+
+    `words` is Vosk's per-word result (with confidences) for fuzzy matching.
+    `heard_from` is when the utterance's audio began (see accept_trigger).
+    Returns a label for what fired (a commands.json phrase, "music:pause",
+    "log:start", ...) or None if nothing matched.
+    """
+    global is_logging, is_paused
+
+    match_start = time.monotonic()
+
+    print(f"I HEARD: '{text}'")
+
+    # --- BRANCH 0: STOP TALKING ---
+    spoken = text.split()
+    if spoken and spoken[-1] in BARGE_IN_STOP_WORDS and len(spoken) <= 2:
+        SPEECH.cancel_all()
+        TRACER.end(heard_at, phrase="speech:stop")
+        return "speech:stop"
+
+    # --- BRANCH 1: CAPTAIN'S LOG ---
+    if is_logging:
+        clean_text = text
+        if "terminate" in clean_text and "log" in clean_text:
+            if not accept_trigger("log:stop", heard_from, heard_at):
+                return None
             
-            # Ensure directory exists
-            if not os.path.exists(logs_dir):
-                try:
-                    os.makedirs(logs_dir)
-                except Exception as e:
-                    print(f"Error creating log directory: {e}")
-                    speak("Error creating log directory.")
-                    is_logging = False
-                    continue
+            is_logging = False
+            is_paused = False
             
-            subprocess.run([os.path.join(BASE_DIR, "captains-log.sh"), "start", logs_dir])
-            continue
+            captains_log("stop")
+            speak("Log terminated. Processing audio.")
+            transcribe_log()
+            return "log:stop"
 
-        if name_detected and "stop listening" in text:
-            last_trigger_time = time.time()
+        elif "resume" in clean_text and "log" in clean_text:
+            if not accept_trigger("log:resume", heard_from, heard_at):
+                return None
+            is_paused = False
+            play_sfx(RESUME_PATH)
+            captains_log("resume")
+            speak("Resuming log.") 
+            return "log:resume"
+
+        elif "pause" in clean_text and "log" in clean_text:
+            if not accept_trigger("log:pause", heard_from, heard_at):
+                return None
+            is_paused = True
             play_sfx(PAUSE_PATH)
-            speak("Shutting down. Goodbye.")
-            time.sleep(3) 
-            sys.exit(0)
-
-        for phrase, command in COMMANDS.items():
-            # Check against ALL valid names
-            matched = False
-            for name in valid_names:
-                check_phrase = phrase.replace("{assistant_name}", name)
-                if check_phrase in text:
-                    matched = True
-                    break
-            
-            if matched:
-                # We already checked time at the top, but let's be safe
-                print(f"Executing: {phrase}")
-                print(f"DEBUG: Raw Command Value: '{command}'")
+            captains_log("pause")
+            speak("Log paused.")
+            return "log:pause"
+        else:
+            return None
 
-                if "play_playlist" in command:
-                     print(f"DEBUG: Triggering playlist command: {command}")
-                
-                # IMPORTANT: Update time BEFORE executing actions
-                last_trigger_time = time.time() 
-                
+    # --- BRANCH 1.5: MUSIC CONTROL ---
+    # Load settings for dynamic name (needed for name detection)
+    # We assume local load checks are fast enough
+    m_settings = load_json(SETTINGS_PATH)
+    m_name = (m_settings.get("assistant_name") or "Leo").lower()
+    m_alts = [x.lower() for x in m_settings.get("phonetic_alternatives", [])]
+    m_valid_names = [m_name] + m_alts
+    
+    # Check if ANY valid name is in the text
+    if any(name in text for name in m_valid_names):
+        clean_text = text
+        
+        # PAUSE
+        if "pause" in clean_text and ("music" in clean_text or "audio" in clean_text or "media" in clean_text or "playback" in clean_text):
+            TRACER.span("match", match_start, time.monotonic(), phrase="music:pause")
+            if not accept_trigger("music:pause", heard_from, heard_at):
+                return None
+            acknowledge()
+            with TRACER.measure("command", action="pause_music"):
+                pause_music()
+            TRACER.end(heard_at, phrase="music:pause")
+            return "music:pause"
+
+        # RESUME / PLAY
+        if ("play" in clean_text or "resume" in clean_text) and ("music" in clean_text or "audio" in clean_text or "playback" in clean_text or "spotify" in clean_text):
+            # EXCLUSIONS for specific playlist commands in commands.json
+            is_specific = "focus" in clean_text or "concentration" in clean_text or "nostalgic" in clean_text or "retro" in clean_text
+            
+            if not is_specific:
+                TRACER.span("match", match_start, time.monotonic(), phrase="music:resume")
+                if not accept_trigger("music:resume", heard_from, heard_at):
+                    return None
                 acknowledge()
+                with TRACER.measure("command", action="resume_music"):
+                    resume_music(m_settings)
+                TRACER.end(heard_at, phrase="music:resume")
+                return "music:resume"
+
+        # SKIP
+        if ("next" in clean_text or "skip" in clean_text) and ("track" in clean_text or "song" in clean_text or "music" in clean_text):
+            TRACER.span("match", match_start, time.monotonic(), phrase="music:skip")
+            if not accept_trigger("music:skip", heard_from, heard_at):
+                return None
+            acknowledge()
+            with TRACER.measure("command", action="skip_track"):
+                skip_track(m_settings)
+            TRACER.end(heard_at, phrase="music:skip")
+            return "music:skip"
+
+    # --- BRANCH 2: COMMANDS ---
+    # Load settings for dynamic name
+    current_settings = load_json(SETTINGS_PATH)
+    assistant_name = (current_settings.get("assistant_name") or "Leo").lower()
+    phonetic_alternatives = [x.lower() for x in current_settings.get("phonetic_alternatives", [])]
+    
+    # Create a list of all valid names to check
+    valid_names = [assistant_name] + phonetic_alternatives
+
+    # Log for debugging (only if "play" is involved to avoid spam)
+    if "play" in text:
+         debug(f"Processing potential play command: {text}")
+
+    # Check if ANY valid name is in the text for special commands
+    name_detected = any(name in text for name in valid_names)
+
+    if name_detected and "captain's log" in text:
+        if not accept_trigger("log:start", heard_from, heard_at):
+            return None
+        is_logging = True
+        is_paused = False
+        play_sfx(RESUME_PATH)
+        speak("Captain's log initiated.", wait=True)  # finish before recording starts
+        
+        # Get log directory from settings
+        logs_dir = logs_dir_setting(current_settings)
+        
+        # Ensure directory exists
+        if not os.path.exists(logs_dir):
+            try:
+                os.makedirs(logs_dir)
+            except Exception as e:
+                print(f"Error creating log directory: {e}")
+                speak("Error creating log directory.")
+                is_logging = False
+                return None
+        
+        captains_log("start", logs_dir)
+        return "log:start"
+
+    search = LOG_SEARCH_PATTERN.search(text) if name_detected else None
+    if search:
+        if not accept_trigger("log:search", heard_from, heard_at):
+            return None
+        acknowledge()
+        with TRACER.measure("command", action="log_search"):
+            results = LOG_INDEX.search(search.group(1)) if LOG_INDEX else []
+        speak(log_index.describe(results, search.group(1)), priority=speech.BRIEFING)
+        TRACER.end(heard_at, phrase="log:search")
+        return "log:search"
+
+    if name_detected and "stop listening" in text:
+        if not accept_trigger("stop_listening", heard_from, heard_at):
+            return None
+        play_sfx(PAUSE_PATH)
+        shutdown()
+        return "stop_listening"
+
+    matched_phrase = None
+    for phrase in COMMANDS:
+        # Check against ALL valid names
+        if any(phrase.replace("{assistant_name}", name) in text for name in valid_names):
+            matched_phrase = phrase
+            break
+
+    if matched_phrase is None and name_detected:
+        matched_phrase = fuzzy_match(text, words, valid_names, current_settings)
+
+    if matched_phrase is None:
+        return None
+
+    phrase, command = matched_phrase, COMMANDS[matched_phrase]
+    TRACER.span("match", match_start, time.monotonic(), phrase=phrase)
+    # We already checked time at the top, but let's be safe
+    print(f"Executing: {phrase}")
+    debug(f"Raw Command Value: '{command}'")
+
+    if "play_playlist" in command:
+         debug(f"Triggering playlist command: {command}")
+    
+    # IMPORTANT: Update time BEFORE executing actions
+    if not accept_trigger(phrase, heard_from, heard_at):
+        return None
+    
+    acknowledge()
+    run_command(phrase, command, current_settings, assistant_name, heard_at)
+    TRACER.end(heard_at, phrase=phrase)
+    return phrase
+
+# --- EARLY DISPATCH ---
+# Opt-in ("early_dispatch": true): act on a Vosk partial hypothesis once it
+# names exactly one command, no longer phrase could still extend it, and it
+# has held for the stability window. The final result for the same
+# utterance is then dropped instead of firing the command twice.
+EARLY_DISPATCH = SETTINGS.get("early_dispatch", False)
+EARLY_STABILITY = SETTINGS.get("early_dispatch_stability_ms", 250) / 1000.0
+
+def assistant_names(settings):
+    return [(settings.get("assistant_name") or "Leo").lower()] + \
+           [x.lower() for x in settings.get("phonetic_alternatives", [])]
+
+def phrase_matches(text, valid_names):
+    """commands.json phrases found in `text`, in file order."""
+    return [phrase for phrase in COMMANDS
+            if any(phrase.replace("{assistant_name}", name) in text for name in valid_names)]
+
+def early_candidate(partial):
+    if is_logging or not partial:
+        return None
+    if "captain's log" in partial or "stop listening" in partial:
+        return None
+    matches = phrase_matches(partial, assistant_names(load_json(SETTINGS_PATH)))
+    if len(matches) != 1:
+        return None
+    phrase = matches[0]
+    # "leo play music" must not fire while "leo play music focus" is still possible.
+    core = phrase.replace("{assistant_name}", "")
+    if any(other != phrase and core in other.replace("{assistant_name}", "") for other in COMMANDS):
+        return None
+    return phrase
+
+class Utterance:
+    """Recognizer state carried between audio chunks."""
+    def __init__(self):
+        self.start = None
+        self.chunks = 0
+        self.audio_s = 0.0  # audio clock, so replay faster than real time sees the same window
+        self.partial = ""
+        self.candidate = None
+        self.candidate_since = None
+        self.early_phrase = None
+
+def process_chunk(rec, data, heard_at, utt, flush=False, lookback=None):
+    """Feeds one chunk to the recognizer and dispatches on a final (or stable partial) result.
+
+    With `flush` the stream has ended: pending audio is finalised instead of
+    feeding `data`. `lookback` keeps the gated chunks of the last few seconds,
+    so a barge-in by name can hand them back (see barge_in_monitor). Returns
+    the label of anything dispatched.
+    """
+    gated = not flush and GATE.is_gated(heard_at)
+    rewind = GATE.take_rewind() if lookback is not None else None
+    if rewind is not None:
+        # "Leo, what time is it" over our own speech: the name and what followed
+        # were dropped as gated before the barge-in reopened the gate.
+        refeed = [chunk for chunk in lookback if chunk[0] >= rewind]
+        lookback.clear()
+        debug(f"Barge-in: re-feeding {len(refeed)} gated chunks")
+        for at, gated_data in refeed:
+            process_chunk(rec, gated_data, at, utt)
+        gated = not flush and GATE.is_gated(heard_at)
+
+    if gated:
+        # Our own voice: drop it, along with anything half-decoded from it.
+        if lookback is not None:
+            lookback.append((heard_at, data))
+        if utt.start is not None:
+            rec.Reset()
+            utt.__init__()
+        return None
+
+    if utt.start is None:
+        utt.start = heard_at
+    utt.chunks += 1
+    utt.audio_s += len(data) / 2 / 16000
+
+    is_final = True if flush else rec.AcceptWaveform(data)
+    decoded_at = time.monotonic()
+
+    if is_final:
+        result = json.loads(rec.FinalResult() if flush else rec.Result())
+        text = result.get("text", "").lower()
+        early_phrase = utt.early_phrase
+        heard_from = utt.start
+
+        if not early_phrase:
+            TRACER.begin()
+            TRACER.span("audio", utt.start, heard_at, chunks=utt.chunks)
+        TRACER.span("vosk_final", heard_at, decoded_at, text=text)
+        utt.__init__()
+
+        if not text: return None
+        UI.send("text", text=text, final=True)
+
+        if early_phrase and early_phrase in phrase_matches(text, assistant_names(load_json(SETTINGS_PATH))):
+            TRACER.event("early_dedup", phrase=early_phrase)
+            print(f"I HEARD: '{text}' (already dispatched early)")
+            return None
+        label = handle_text(text, heard_at, result.get("result"), heard_from)
+        UI.send("match", text=text, label=label)
+        return label
+
+    if not EARLY_DISPATCH or utt.early_phrase:
+        return None
+
+    partial = json.loads(rec.PartialResult()).get("partial", "").lower()
+    if partial != utt.partial:
+        utt.partial = partial
+        phrase = early_candidate(partial)
+        if phrase != utt.candidate:
+            utt.candidate, utt.candidate_since = phrase, utt.audio_s
+            return None
+    phrase = utt.candidate
+    if not phrase or utt.audio_s - utt.candidate_since < EARLY_STABILITY:
+        return None
+
+    TRACER.begin()
+    TRACER.span("audio", utt.start, heard_at, chunks=utt.chunks)
+    TRACER.span("vosk_partial", heard_at, decoded_at, text=partial)
+    print(f"EARLY DISPATCH: '{partial}' -> {phrase}")
+    label = handle_text(partial, heard_at, heard_from=utt.start)
+    utt.candidate = None
+    if label:
+        utt.early_phrase = phrase
+        UI.send("text", text=partial, final=False)
+        UI.send("match", text=partial, label=label, early=True)
+    return label
+
+# --- BARGE-IN ---
+# While output is playing, a small grammar-limited recognizer listens for
+# "stop" / "silence" (cuts the speech short) or the assistant's name (cuts it
+# short and hands the sentence, name included, to the command recognizer).
+BARGE_IN_STOP_WORDS = ["stop", "silence"]
+LOOKBACK_S = 3.0  # gated audio the command recognizer keeps for a barge-in by name
+
+def barge_in_monitor(model, reader):
+    names = assistant_names(SETTINGS)
+    keywords = BARGE_IN_STOP_WORDS + names
+    grammar = json.dumps(keywords + ["[unk]"])
+    rec = new_recognizer(model, grammar)
+
+    def reset(rec):
+        """rec reset for the next stretch, or a local recognizer if the server is gone."""
+        try:
+            rec.Reset()
+            return rec
+        except ConnectionError as e:
+            print(f"Barge-in: {e}, switching to the local model")
+            return new_recognizer(local_model(), grammar)
+
+    chunk_s = PROFILE["chunk_frames"] / 16000
+    feeding = False
+    speech_from = None
+
+    while True:
+        chunk = reader.read()
+        if chunk is None: return
+        arrived, data = chunk
+
+        if not GATE.is_gated(arrived):
+            if feeding:
+                rec = reset(rec)
+                feeding = False
+                speech_from = None
+            continue
+
+        feeding = True
+        try:
+            if rec.AcceptWaveform(data):
+                text = json.loads(rec.Result()).get("text", "")
+            else:
+                text = json.loads(rec.PartialResult()).get("partial", "")
+        except ConnectionError:
+            rec = reset(rec)
+            feeding = False
+            continue
+        text = f" {text.replace('[unk]', '')} "
+        if speech_from is None and text.strip():
+            speech_from = arrived - chunk_s
+
+        hit = next((kw for kw in keywords if f" {kw} " in text), None)
+        if not hit: continue
+
+        print(f"BARGE-IN: '{hit}'")
+        TRACER.event("barge_in", keyword=hit)
+        # A stop word is consumed here. For a name, the command recognizer
+        # re-feeds its gated audio from where the speech started.
+        if hit in BARGE_IN_STOP_WORDS:
+            SPEECH.cancel_all()
+            GATE.barge_in(arrived)
+        else:
+            GATE.barge_in(speech_from, rewind=True)
+        rec = reset(rec)
+        feeding = False
+        speech_from = None
+
+def listen(reader, rec):
+    utt = Utterance()
+    lookback = collections.deque(maxlen=int(LOOKBACK_S * 16000 / PROFILE["chunk_frames"]) + 1)
+    while True:
+        chunk = reader.read()
+        if chunk is None: break
+        # heard_at = arrival of the chunk that completes an utterance; all latency is measured from here.
+        heard_at, data = chunk
+        try:
+            process_chunk(rec, data, heard_at, utt, lookback=lookback)
+        except ConnectionError as e:
+            # Raised only by a RemoteRecognizer whose server hung or went away.
+            print(f"{e}, switching to the local model")
+            rec = make_recognizer(local_model())
+            utt = Utterance()
+
+# --- OFFLINE REPLAY ---
+# `voice-command --replay DIR` runs recorded utterances through the same
+# recognizer, matching and dispatch as the microphone loop. Speech, sound
+# effects, media control and commands are stubbed so it runs headless.
+def replay_session(args):
+    """Stubs output and returns new_session() -> a fresh chunk handler, for --replay and --soak."""
+    global speak, play_sfx, pause_music, resume_music, skip_track
+    global run_command, captains_log, transcribe_log, shutdown
+    speak = lambda text, **_: print(f"SAY: {text}")
+    play_sfx = lambda path_or_list: None
+    pause_music = lambda: None
+    resume_music = lambda settings: None
+    skip_track = lambda settings: None
+    run_command = lambda phrase, command, settings, assistant_name, heard_at: print(f"RUN: {command}")
+    captains_log = lambda action, *args: None
+    transcribe_log = lambda: None
+    shutdown = lambda: None
+
+    global EARLY_DISPATCH, PROFILE
+    if args.early_dispatch:
+        EARLY_DISPATCH = True
+    if args.profile:
+        PROFILE = latency_profile(SETTINGS, args.profile)
+
+    model = load_model()
+
+    def new_session():
+        rec = make_recognizer(model)
+        utt = Utterance()
+        return lambda data, heard_at, flush=False: process_chunk(rec, data, heard_at, utt, flush)
+    return new_session
+
+def replay_mode(args):
+    import replay
+
+    new_session = replay_session(args)
+    summary = replay.run(args.replay, new_session, reset_state, manifest=replay.load_manifest(args.manifest),
+                         chunk_frames=PROFILE["chunk_frames"])
+    summary["profile"] = PROFILE["name"]
+    replay.print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+# --- SOAK TEST ---
+# `voice-command --soak DIR` replays DIR over and over (faster than real time)
+# for --soak-hours and fails if resident memory grows more than
+# --max-growth-mb past its level after the first pass (caches warm), or if
+# a pass matches fewer manifest files than the first one (--min-accuracy
+# sets a fixed floor instead).
+def soak_mode(args):
+    import contextlib
+    import gc
+    import replay
+
+    new_session = replay_session(args)
+    manifest = replay.load_manifest(args.manifest)
+    monitor = resource_monitor.Monitor(args.soak_samples, interval_s=0,
+                                       tracemalloc_top=args.tracemalloc, quiet=True).start()
+    deadline = time.monotonic() + args.soak_hours * 3600
+    next_report = time.monotonic()
+    baseline = None
+    baseline_accuracy = None
+    passes = 0
+    audio_s = 0.0
+    failure = None
+
+    devnull = open(os.devnull, "w")
+    while time.monotonic() < deadline:
+        # Per-utterance output would flood hours of logs; only SOAK lines are printed.
+        with contextlib.redirect_stdout(devnull):
+            summary = replay.run(args.soak, new_session, reset_state, manifest=manifest,
+                                 chunk_frames=PROFILE["chunk_frames"], verbose=False)
+        if not summary["files"]:
+            failure = f"no replayable WAV files in {args.soak}"
+            break
+        passes += 1
+        audio_s += summary["audio_s"]
+        accuracy = summary.get("accuracy") if manifest is not None else None
+        if accuracy is not None:
+            floor = args.min_accuracy if args.min_accuracy is not None else baseline_accuracy
+            if floor is not None and accuracy < floor:
+                failure = f"pass {passes}: accuracy {accuracy:.2%} (expected at least {floor:.2%})"
+                break
+            if baseline_accuracy is None:
+                baseline_accuracy = accuracy
+        gc.collect()
+        current = monitor.record()
+        if baseline is None:
+            baseline = current
+            print(f"SOAK: baseline after warm-up pass: rss {current['rss_mb']:.1f} MB, "
+                  f"{current['threads']} threads, {current['fds']} fds"
+                  + (f", accuracy {baseline_accuracy:.2%}" if baseline_accuracy is not None else ""))
+            continue
+        growth = current["rss_mb"] - baseline["rss_mb"]
+        if growth > args.max_growth_mb:
+            failure = f"rss grew {growth:.1f} MB (limit {args.max_growth_mb} MB)"
+            break
+        if time.monotonic() >= next_report:
+            next_report = time.monotonic() + 60
+            print(f"SOAK: pass {passes}, {audio_s / 3600:.2f} h of audio, rss {current['rss_mb']:.1f} MB "
+                  f"({growth:+.1f}), {current['threads']} threads, {current['fds']} fds")
+            for entry in current.get("top", [])[:5]:
+                print(f"    {entry['size_kb']:+.1f} kB ({entry['count']:+d} blocks) {entry['where']}")
+
+    final = monitor.record()
+    result = {
+        "passes": passes,
+        "audio_h": round(audio_s / 3600, 3),
+        "baseline": baseline,
+        "baseline_accuracy": baseline_accuracy,
+        "final": final,
+        "rss_growth_mb": round(final["rss_mb"] - baseline["rss_mb"], 2) if baseline else None,
+        "max_growth_mb": args.max_growth_mb,
+        "failure": failure,
+    }
+    print(f"SOAK {'FAILED: ' + failure if failure else 'PASSED'}: {passes} passes, "
+          f"{result['audio_h']} h of audio, rss growth {result['rss_growth_mb']} MB, "
+          f"threads {baseline and baseline['threads']} -> {final['threads']}, fds {baseline and baseline['fds']} -> {final['fds']}")
+    for entry in final.get("top", [])[:10]:
+        print(f"    {entry['size_kb']:+.1f} kB ({entry['count']:+d} blocks) {entry['where']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if failure else 0)
+
+def transcribe_logs_mode(args):
+    logs_dir = args.transcribe_logs
+    logs_dir = logs_dir_setting(SETTINGS) if logs_dir is True else os.path.expanduser(logs_dir)
+    if not shutil.which("ffmpeg"):
+        print("ERROR: ffmpeg binary not found. Please install ffmpeg.")
+        sys.exit(1)
+    summary = transcription.transcribe_backlog(logs_dir, BASE_DIR, USER_DIR, workers=args.workers)
+    transcription.print_summary(summary)
+    open_log_index(logs_dir)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    if summary["failed"]:
+        sys.exit(1)
+
+def main():
+    global MPRIS, CALENDAR, ACTION_CTX, AUDIO_BUS, MIXER, SFX_BANK, VOICES
+
+    parser = argparse.ArgumentParser(description="LCARS voice command listener")
+    parser.add_argument("--replay", metavar="DIR", help="replay 16 kHz mono WAVs from DIR instead of the microphone")
+    parser.add_argument("--manifest", help="JSON map of WAV file name -> expected phrase (or null) for --replay")
+    parser.add_argument("--json", metavar="OUT", help="write the --replay or --transcribe-logs summary as JSON")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), help="latency profile for --replay (default: from settings)")
+    parser.add_argument("--early-dispatch", action="store_true", help="enable early dispatch for --replay regardless of settings")
+    parser.add_argument("--transcribe-logs", metavar="DIR", nargs="?", const=True,
+                        help="transcribe captain's logs that have no .txt yet (default DIR: logs_dir) and exit")
+    parser.add_argument("--workers", type=int, help="worker processes for --transcribe-logs (default: one per core, up to 8)")
+    parser.add_argument("--soak", metavar="DIR", help="replay the WAVs in DIR repeatedly and fail on memory growth")
+    parser.add_argument("--soak-hours", type=float, default=4, help="how long --soak runs (default: 4)")
+    parser.add_argument("--max-growth-mb", type=float, default=50,
+                        help="RSS growth past the first --soak pass that fails the run (default: 50)")
+    parser.add_argument("--min-accuracy", type=float, metavar="FRACTION",
+                        help="fail --soak if a pass matches fewer manifest files than this (default: the first pass)")
+    parser.add_argument("--soak-samples", metavar="OUT", help="append a resource sample per --soak pass to OUT (JSONL)")
+    parser.add_argument("--tracemalloc", type=int, metavar="N", default=int(os.environ.get("LCARS_TRACEMALLOC", "0")),
+                        help="report the N source lines with the most allocation growth (default: off)")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay_mode(args)
+        return
+    if args.soak:
+        soak_mode(args)
+        return
+    if args.transcribe_logs:
+        transcribe_logs_mode(args)
+        return
+
+    sys.stderr = open(os.devnull, "w")
+    p = pyaudio.PyAudio()
+
+    if audio_out:
+        try:
+            MIXER = audio_out.Mixer(p)
+            SFX_BANK = audio_out.SoundBank(SOUNDS_DIR, MIXER.rate)
+        except Exception as e:
+            print(f"Shared output stream unavailable, using aplay/pygame: {e}")
+            MIXER = None
+    if not MIXER:
+        pygame.mixer.init()
+
+    pool_mb = SETTINGS.get("voice_pool_mb", voice_pool.DEFAULT_BUDGET_MB)
+    if MIXER and voice_pool.available() and pool_mb:
+        # Loads while the recognizer model loads, so the first sentence is not a cold start.
+        VOICES = voice_pool.VoicePool(pool_mb, os.path.join(USER_DIR, "voice-cache"),
+                                      mmap=SETTINGS.get("voice_mmap", True))
+        VOICES.prewarm(voice_model_path(SETTINGS))
+
+    start_resource_monitor(args.tracemalloc)
+
+    MPRIS = mpris_client.connect()
+    CALENDAR = actions.CalendarWorker(SCRIPT_DIR)
+    CALENDAR.start()
+    ACTION_CTX = actions.ActionContext(speak, SCRIPT_DIR, mpris=MPRIS, calendar=CALENDAR, tracer=TRACER)
+
+    model = load_model()
+    rec = make_recognizer(model)
+    stream = open_input_stream(p)
+    AUDIO_BUS = audio_bus.AudioBus(stream, chunk_frames=PROFILE["chunk_frames"]).start()
+    recognizer_input = AUDIO_BUS.reader()
+    if SETTINGS.get("barge_in", True):
+        threading.Thread(target=barge_in_monitor, args=(model, AUDIO_BUS.reader()),
+                         name="barge-in", daemon=True).start()
+
+    threading.Thread(target=open_log_index, args=(logs_dir_setting(SETTINGS),),
+                     name="log-index", daemon=True).start()
+
+    wait_for_briefing()
+    print("<<VOICE_ACTIVE>>")
+    UI.send("state", state="active")
+    speak("Voice interface initialised")
+
+    listen(recognizer_input, rec)
 
-                rank = current_settings.get("user_rank") or "Captain"
-                name = current_settings.get("user_name") or "Bradly"
-                surname = current_settings.get("user_surname") or "User"
-
-                final_command = command.replace("{user_rank}", rank)\
-                                       .replace("{user_name}", name)\
-                                       .replace("{user_surname}", surname)\
-                                       .replace("{assistant_name}", assistant_name)\
-                                       .replace("{USER_RANK}", rank)\
-                                       .replace("{USER_NAME}", name)\
-                                       .replace("{USER_SURNAME}", surname)\
-                                       .replace("{ASSISTANT_NAME}", assistant_name)\
-                                       .replace("{base_dir}", f'"{BASE_DIR}"')\
-                                       .replace("{SYSTEM_NAME}", socket.gethostname())\
-                                       .replace("{system_name}", socket.gethostname())
-
-                if "play_playlist" in command:
-                     print(f"DEBUG: Final Command: {final_command}")
-
-                os.system(final_command)
-                break
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Piper voices kept loaded in the voice process, under a memory budget.
+
+Speaking used to start a piper process per sentence, so every sentence
+paid for loading its voice model, and switching personality made that
+worse. VoicePool keeps recently used voices loaded in-process (piper-tts
+on onnxruntime). When their memory passes `budget_mb`, the least recently
+used voice is dropped. prewarm() loads a voice in the background, e.g.
+right after a personality change, so the next sentence starts at once.
+
+Weights are memory-mapped where possible. onnxruntime reads a plain .onnx
+into process memory and then copies the weights again when it pre-packs
+them. If the `onnx` package is installed, each voice is rewritten once
+into `voice-cache/` with its weights in a separate external-data file.
+onnxruntime maps that file instead of copying it, and pre-packing is
+turned off so the weights stay in the mapping. A mapped voice costs a
+fraction of the private memory of a plain one, and its weight pages are
+shared with the page cache and can be dropped by the kernel under memory
+pressure.
+
+    voice_pool.py voices/fedcomp/en_US-fedcomp-medium.onnx ...   # load, memory and speed per voice
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import resource_monitor
+
+try:
+    import onnxruntime
+    from piper import PiperConfig, PiperVoice, SynthesisConfig
+except ImportError:
+    PiperVoice = None
+try:
+    import onnx
+except ImportError:
+    onnx = None
+
+DEFAULT_BUDGET_MB = 400
+WARMUP_TEXT = "Ready."
+
+
+def available():
+    return PiperVoice is not None
+
+
+def anon_mb():
+    """Private (anonymous) resident memory of this process, in MB."""
+    return int(resource_monitor.proc_status().get("RssAnon", "0 kB").split()[0]) / 1024
+
+
+def mapped_copy(model_path, cache_dir):
+    """(path to load, external data path) for model_path, converting it on first use.
+
+    Returns (model_path, None) when the model cannot be converted: no onnx
+    package, no cache directory, or a failed conversion.
+    """
+    if onnx is None or not cache_dir:
+        return model_path, None
+    st = os.stat(model_path)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    digest = hashlib.sha1(f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:10]
+    target = os.path.join(cache_dir, f"{stem}-{digest}.onnx")
+    data = target + ".data"
+    if os.path.exists(target) and os.path.exists(data):
+        return target, data
+
+    started = time.monotonic()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        copies = re.compile(re.escape(stem) + r"-[0-9a-f]{10}\.onnx(\.data|\.partial)?")
+        for name in os.listdir(cache_dir):
+            # Older versions of this voice, and leftovers of an interrupted conversion.
+            if copies.fullmatch(name):
+                os.remove(os.path.join(cache_dir, name))
+        model = onnx.load(model_path)
+        partial = target + ".partial"
+        # The .onnx is renamed into place last, so it only exists once its data is complete.
+        onnx.save_model(model, partial, save_as_external_data=True, all_tensors_to_one_file=True,
+                        location=os.path.basename(data))
+        os.replace(partial, target)
+    except Exception as e:
+        print(f"Voice pool: cannot map {os.path.basename(model_path)}, loading it whole: {e}")
+        return model_path, None
+    print(f"Voice pool: mapped copy of {os.path.basename(model_path)} written in {time.monotonic() - started:.1f}s")
+    return target, data
+
+
+class Voice:
+    """One loaded voice. `cost_mb` is what it counts against the pool budget.
+
+    The cost is approximate: onnxruntime does not report a session's own
+    allocations, so it is the growth of the whole process's private memory
+    while the voice loaded (plus its mapped weights). Memory other threads
+    allocate meanwhile is charged to the voice too.
+    """
+    def __init__(self, path, piper_voice, mapped_data=None):
+        self.path = path
+        self.piper = piper_voice
+        self.sample_rate = piper_voice.config.sample_rate
+        self.speakers = piper_voice.config.num_speakers
+        self.mapped_data = mapped_data
+        self.cost_mb = 0.0
+
+    def synthesize(self, text, speaker_id=None, volume=1.0):
+        """Yields one float32 sample array per sentence."""
+        config = SynthesisConfig(volume=volume)
+        if self.speakers > 1 and speaker_id not in (None, ""):
+            config.speaker_id = int(speaker_id)
+        for chunk in self.piper.synthesize(text, config):
+            yield chunk.audio_float_array.astype("float32", copy=False)
+
+
+def load_voice(path, cache_dir=None, mmap=True):
+    """Loads a Piper voice, memory-mapping its weights if possible."""
+    load_path, data = mapped_copy(path, cache_dir) if mmap else (path, None)
+    return open_voice(path, load_path, data)
+
+
+def open_voice(path, load_path, data=None):
+    """A Voice for `path` running the model at `load_path` (its mapped copy if `data` is set)."""
+    with open(path + ".json", encoding="utf-8") as f:
+        config = PiperConfig.from_dict(json.load(f))
+    options = onnxruntime.SessionOptions()
+    if data:
+        # Pre-packing would copy the mapped weights into private memory.
+        options.add_session_config_entry("session.disable_prepacking", "1")
+    session = onnxruntime.InferenceSession(load_path, sess_options=options, providers=["CPUExecutionProvider"])
+    return Voice(path, PiperVoice(config=config, session=session), data)
+
+
+class VoicePool:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, cache_dir=None, mmap=True):
+        self.budget_mb = budget_mb
+        self.cache_dir = cache_dir
+        self.mmap = mmap
+        self._voices = collections.OrderedDict()  # path -> Voice, least recently used first
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one load at a time bounds the peak while switching
+        self._prewarm = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice-prewarm")
+
+    def get(self, path, warm=False):
+        """The loaded voice for `path`, loading it (and evicting others) if needed."""
+        voice = self._lookup(path)
+        if voice:
+            return voice
+        with self._load_lock:
+            voice = self._lookup(path)  # a prewarm may have finished it meanwhile
+            if voice:
+                return voice
+            started = time.monotonic()
+            load_path, data = mapped_copy(path, self.cache_dir) if self.mmap else (path, None)
+            before = anon_mb()  # after the one-off conversion, whose memory is not the voice's
+            voice = open_voice(path, load_path, data)
+            if warm:
+                # Pages in the weights and sizes onnxruntime's buffers before anyone is waiting.
+                for _ in voice.synthesize(WARMUP_TEXT):
+                    pass
+            mapped_mb = os.path.getsize(voice.mapped_data) / 2**20 if voice.mapped_data else 0.0
+            # Process-wide, so approximate (see Voice).
+            voice.cost_mb = max(anon_mb() - before, 0.0) + mapped_mb
+            print(f"Voice pool: loaded {os.path.basename(path)} in {time.monotonic() - started:.2f}s "
+                  f"({voice.cost_mb:.0f} MB{', mapped' if voice.mapped_data else ''})")
+            with self._lock:
+                self._voices[path] = voice
+                self._evict()
+        return voice
+
+    def prewarm(self, path):
+        """Loads and warms `path` in the background. Returns a Future."""
+        return self._prewarm.submit(self._prewarm_one, path)
+
+    def _prewarm_one(self, path):
+        try:
+            self.get(path, warm=True)
+        except Exception as e:
+            print(f"Voice pool: cannot prewarm {os.path.basename(path)}: {e}")
+
+    def _lookup(self, path):
+        with self._lock:
+            voice = self._voices.get(path)
+            if voice:
+                self._voices.move_to_end(path)
+            return voice
+
+    def _evict(self):
+        """Drops least recently used voices while over budget, always keeping the newest."""
+        while len(self._voices) > 1 and self.total_mb() > self.budget_mb:
+            path, voice = self._voices.popitem(last=False)
+            # A sentence still being synthesized keeps its voice alive until it finishes.
+            print(f"Voice pool: evicted {os.path.basename(path)} ({voice.cost_mb:.0f} MB)")
+
+    def total_mb(self):
+        return sum(voice.cost_mb for voice in self._voices.values())
+
+    def loaded(self):
+        """[(model path, MB)], least recently used first."""
+        with self._lock:
+            return [(path, voice.cost_mb) for path, voice in self._voices.items()]
+
+
+# --- BENCHMARK ---
+
+def benchmark(paths, cache_dir, text):
+    for path in paths:
+        for mmap in (False, True):
+            before = anon_mb()
+            started = time.monotonic()
+            voice = load_voice(path, cache_dir, mmap)
+            loaded_s = time.monotonic() - started
+            started = time.monotonic()
+            samples = sum(len(chunk) for chunk in voice.synthesize(text))
+            first_s = time.monotonic() - started
+            started = time.monotonic()
+            for _ in voice.synthesize(text):
+                pass
+            warm_s = time.monotonic() - started
+            print(f"  {os.path.basename(path)} {'mapped' if voice.mapped_data else 'whole '}: "
+                  f"load {loaded_s * 1000:6.0f} ms, first sentence {first_s * 1000:5.0f} ms, "
+                  f"warm {warm_s * 1000:5.0f} ms ({samples / voice.sample_rate:.1f} s audio), "
+                  f"private memory +{anon_mb() - before:.0f} MB")
+            del voice
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare loading Piper voices whole and memory-mapped")
+    parser.add_argument("models", nargs="+", help=".onnx voice models (each with its .onnx.json)")
+    parser.add_argument("--cache", default=os.path.expanduser("~/.config/lcars-terminal/voice-cache"))
+    parser.add_argument("--text", default="All systems are functioning within normal parameters.")
+    args = parser.parse_args()
+    if not available():
+        parser.error("piper-tts is not installed")
+    benchmark(args.models, args.cache, args.text)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Shared Vosk recognition server and its client.
+
+The server loads the model once and serves any number of voice processes
+over a Unix socket; every connection gets its own recognizer (and grammar),
+so memory grows with sessions rather than with copies of the model. Point
+the voice assistant at it with "recognition_server": true (the default
+sockets) or a socket path in settings, or LCARS_VOSK_SOCKET in the
+environment.
+
+The socket carries microphone audio, so who may connect is checked:
+
+    vosk_server.py --model voiceassistant/vosk-model/model
+        Per user (e.g. a systemd user unit): the socket lives in
+        $XDG_RUNTIME_DIR (or a 0700 directory under /tmp), is created 0600,
+        and only this user's processes are served.
+
+    vosk_server.py --model ... --group lcars-voice
+        Once per boot for every seat (a system unit with its own user): the
+        socket is /run/lcars-vosk/lcars-vosk.sock, 0660 and owned by the
+        group, and a connection is served only if its peer (SO_PEERCRED) is
+        in that group.
+
+Clients only talk to a server running as their own uid, or as the owner
+of a socket directory nobody else can write to. A live socket is never
+replaced; a stale one left by a crash is.
+
+Wire format: 1-byte message type + 4-byte big-endian length + payload.
+
+    O  open      {"rate": 16000, "grammar": [...] | null}   -> K
+    S  setting   {"method": "SetWords", "args": [true]}     -> K / E
+    A  audio     raw 16-bit PCM                              -> R {"final": bool, "result": "<vosk json>"}
+    F  finalise  (empty)                                     -> R {"final": true, "result": ...}
+    Z  reset     (empty)                                     -> K
+"""
+import argparse
+import grp
+import json
+import os
+import pwd
+import socket
+import stat
+import struct
+import sys
+import threading
+
+SOCKET_NAME = "lcars-vosk.sock"
+SHARED_SOCKET = os.path.join("/run/lcars-vosk", SOCKET_NAME)
+CALL_TIMEOUT = 5.0  # seconds a recognizer call may take before the server counts as hung
+
+# Recognizer settings a client may change.
+SETTINGS_METHODS = {"SetWords", "SetPartialWords", "SetMaxAlternatives", "SetEndpointerMode", "SetEndpointerDelays"}
+
+
+def private_dir(path):
+    """Creates `path` 0700 if needed; raises PermissionError unless only we can use it."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory of this user")
+    return path
+
+
+def default_socket_path():
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, SOCKET_NAME)
+    return os.path.join(private_dir(f"/tmp/lcars-vosk-{os.getuid()}"), SOCKET_NAME)
+
+
+def shared_dir(path, gid):
+    """Creates `path` 0750 for group `gid` if needed; raises PermissionError unless only we can write it."""
+    os.makedirs(path, mode=0o750, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{path} is not a directory only this user can write to")
+    if st.st_gid != gid:
+        os.chown(path, -1, gid)
+    os.chmod(path, 0o750)
+    return path
+
+
+def peer_creds(sock):
+    """(pid, uid, gid) of the process at the other end of a Unix socket (SO_PEERCRED, Linux)."""
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)
+
+
+def peer_uid(sock):
+    return peer_creds(sock)[1]
+
+
+def in_group(uid, primary_gid, gid):
+    """Whether the user `uid` (whose process runs with `primary_gid`) belongs to group `gid`."""
+    if primary_gid == gid:
+        return True
+    try:
+        return gid in os.getgrouplist(pwd.getpwuid(uid).pw_name, primary_gid)
+    except KeyError:
+        return False  # no passwd entry: only the primary group counts
+
+
+def trusted_server_uids(socket_path):
+    """Our own uid, plus the owner of the socket's directory if nobody else can write to it."""
+    uids = {os.getuid()}
+    try:
+        st = os.stat(os.path.dirname(os.path.abspath(socket_path)))
+    except OSError:
+        return uids
+    if not st.st_mode & 0o022:
+        uids.add(st.st_uid)
+    return uids
+
+
+def connect(socket_path, timeout):
+    """Connects to a server we can trust (see trusted_server_uids); the socket keeps `timeout`."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        uid = peer_uid(sock)
+        if uid not in trusted_server_uids(socket_path):
+            raise PermissionError(f"{socket_path} is served by uid {uid}, which this user does not trust")
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def send_msg(sock, kind, payload=b""):
+    if isinstance(payload, (dict, list)):
+        payload = json.dumps(payload).encode()
+    sock.sendall(struct.pack("!cI", kind, len(payload)) + payload)
+
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_msg(sock):
+    kind, length = struct.unpack("!cI", recv_exact(sock, 5))
+    return kind, recv_exact(sock, length) if length else b""
+
+
+# --- SERVER ---
+
+class Session(threading.Thread):
+    def __init__(self, server, conn):
+        super().__init__(daemon=True)
+        self.server = server
+        self.conn = conn
+        self.rec = None
+
+    def run(self):
+        from vosk import KaldiRecognizer
+        self.server.sessions_changed(+1)
+        try:
+            while True:
+                kind, payload = recv_msg(self.conn)
+                if kind == b"O":
+                    opts = json.loads(payload)
+                    rate = opts.get("rate", 16000)
+                    if opts.get("grammar"):
+                        self.rec = KaldiRecognizer(self.server.model, rate, json.dumps(opts["grammar"]))
+                    else:
+                        self.rec = KaldiRecognizer(self.server.model, rate)
+                    send_msg(self.conn, b"K")
+                elif self.rec is None:
+                    send_msg(self.conn, b"E", {"error": "open a recognizer first"})
+                elif kind == b"A":
+                    final = self.rec.AcceptWaveform(payload)
+                    result = self.rec.Result() if final else self.rec.PartialResult()
+                    send_msg(self.conn, b"R", {"final": final, "result": result})
+                elif kind == b"F":
+                    send_msg(self.conn, b"R", {"final": True, "result": self.rec.FinalResult()})
+                elif kind == b"Z":
+                    self.rec.Reset()
+                    send_msg(self.conn, b"K")
+                elif kind == b"S":
+                    self.apply_setting(json.loads(payload))
+                else:
+                    send_msg(self.conn, b"E", {"error": f"unknown message {kind!r}"})
+        except (ConnectionError, OSError):
+            pass
+        except Exception as e:
+            print(f"Session error: {e}")
+        finally:
+            self.conn.close()
+            self.server.sessions_changed(-1)
+
+    def apply_setting(self, request):
+        method, args = request.get("method"), request.get("args", [])
+        if method not in SETTINGS_METHODS:
+            send_msg(self.conn, b"E", {"error": f"{method} not allowed"})
+            return
+        try:
+            if method == "SetEndpointerMode":
+                from vosk import EndpointerMode
+                args = [EndpointerMode[args[0]]]
+            getattr(self.rec, method)(*args)
+            send_msg(self.conn, b"K")
+        except Exception as e:
+            send_msg(self.conn, b"E", {"error": str(e)})
+
+
+class RecognitionServer:
+    def __init__(self, model_path, socket_path=None, group=None):
+        from vosk import Model
+        # With a group the server is shared by every member's sessions; otherwise it is ours alone.
+        self.gid = grp.getgrnam(group).gr_gid if group else None
+        self.socket_path = socket_path or (SHARED_SOCKET if group else default_socket_path())
+        if group:
+            shared_dir(os.path.dirname(self.socket_path), self.gid)
+        print(f"Loading Vosk model from {model_path}")
+        self.model = Model(model_path)
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def sessions_changed(self, delta):
+        with self._lock:
+            self.sessions += delta
+            print(f"Active sessions: {self.sessions}")
+
+    def allowed(self, conn):
+        _pid, uid, gid = peer_creds(conn)
+        if uid == os.getuid():
+            return True
+        return self.gid is not None and in_group(uid, gid, self.gid)
+
+    def serve_forever(self):
+        sock = listen(self.socket_path, self.gid)
+        print(f"Recognition server listening on {self.socket_path}")
+        try:
+            while True:
+                conn, _ = sock.accept()
+                if not self.allowed(conn):
+                    print(f"Refused a connection from uid {peer_uid(conn)}")
+                    conn.close()
+                    continue
+                Session(self, conn).start()
+        finally:
+            sock.close()
+            os.unlink(self.socket_path)
+
+
+def remove_stale_socket(path):
+    """Unlinks a leftover socket of ours at `path`; refuses anything still in use or not ours."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} exists and is not a socket of this user")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        probe.settimeout(1.0)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+            return
+    raise RuntimeError(f"a recognition server is already listening on {path}")
+
+
+def listen(path, gid=None):
+    """A listening socket at `path`, usable only by this user (and group `gid`, if given)."""
+    remove_stale_socket(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # no window in which the socket is open to others
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    if gid is not None:
+        os.chown(path, -1, gid)
+    os.chmod(path, 0o600 if gid is None else 0o660)
+    sock.listen()
+    return sock
+
+
+# --- CLIENT ---
+
+class RemoteModel:
+    """Stands in for vosk.Model: where to reach the server."""
+    def __init__(self, socket_path=None, timeout=2.0, call_timeout=CALL_TIMEOUT):
+        self.timeout = timeout
+        self.call_timeout = call_timeout
+        # Fail fast if nothing (or an untrusted server) is listening, so the caller can load the model locally.
+        # Without a path: our own server first, then the shared one.
+        error = None
+        for path in [socket_path] if socket_path else [None, SHARED_SOCKET]:
+            try:
+                path = path or default_socket_path()
+                connect(path, timeout).close()
+            except OSError as e:
+                error = e
+                continue
+            self.socket_path = path
+            return
+        raise error
+
+
+class RemoteRecognizer:
+    """The subset of vosk.KaldiRecognizer the voice process uses, served remotely.
+
+    Every call is bounded by the model's call_timeout; a hung or vanished
+    server raises ConnectionError (an OSError) and the recognizer is closed.
+    """
+    def __init__(self, model, rate, grammar=None):
+        self.sock = connect(model.socket_path, model.timeout)
+        self.sock.settimeout(model.call_timeout)
+        self._result = ""
+        self._partial = json.dumps({"partial": ""})
+        self._call(b"O", {"rate": rate, "grammar": json.loads(grammar) if isinstance(grammar, str) else grammar})
+
+    def _call(self, kind, payload=b""):
+        try:
+            send_msg(self.sock, kind, payload)
+            reply, body = recv_msg(self.sock)
+        except OSError as e:
+            # After a timeout the reply could still arrive later and desynchronise the stream.
+            self.sock.close()
+            raise ConnectionError(f"recognition server: {e or 'timed out'}") from e
+        if reply == b"E":
+            raise RuntimeError(json.loads(body).get("error"))
+        return json.loads(body) if body else None
+
+    def _set(self, method, *args):
+        self._call(b"S", {"method": method, "args": list(args)})
+
+    def SetWords(self, enabled):
+        self._set("SetWords", bool(enabled))
+
+    def SetPartialWords(self, enabled):
+        self._set("SetPartialWords", bool(enabled))
+
+    def SetMaxAlternatives(self, n):
+        self._set("SetMaxAlternatives", int(n))
+
+    def SetEndpointerMode(self, mode):
+        self._set("SetEndpointerMode", getattr(mode, "name", mode))
+
+    def SetEndpointerDelays(self, t_start_max, t_end, t_max):
+        self._set("SetEndpointerDelays", t_start_max, t_end, t_max)
+
+    def AcceptWaveform(self, data):
+        reply = self._call(b"A", bytes(data))
+        if reply["final"]:
+            self._result = reply["result"]
+        else:
+            self._partial = reply["result"]
+        return reply["final"]
+
+    def Result(self):
+        return self._result
+
+    def PartialResult(self):
+        return self._partial
+
+    def FinalResult(self):
+        return self._call(b"F")["result"]
+
+    def Reset(self):
+        self._partial = json.dumps({"partial": ""})
+        self._call(b"Z")
+
+    def close(self):
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        script_dir = os.path.dirname(sys.executable)
+    else:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Shared Vosk recognition server")
+    parser.add_argument("--model", default=os.path.join(script_dir, "vosk-model/model"))
+    parser.add_argument("--socket", default=os.environ.get("LCARS_VOSK_SOCKET"),
+                        help=f"socket path (default: $XDG_RUNTIME_DIR/{SOCKET_NAME}, or {SHARED_SOCKET} with --group)")
+    parser.add_argument("--group", help="serve every member of this group, not just this user")
+    args = parser.parse_args()
+
+    sys.stdout.reconfigure(line_buffering=True)
+    try:
+        RecognitionServer(args.model, args.socket, args.group).serve_forever()
+    except KeyError:
+        print(f"Recognition server not started: no group named {args.group}")
+        sys.exit(1)
+    except (PermissionError, RuntimeError) as e:
+        print(f"Recognition server not started: {e}")
+        sys.exit(1)